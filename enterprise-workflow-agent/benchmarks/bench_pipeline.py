@@ -0,0 +1,148 @@
+"""
+End-to-end throughput benchmark: ingest API -> Redis queue -> agent_graph -> audit.
+
+Runs entirely in-process (fakeredis, MemorySaver, a fake audit engine), so it
+works on a laptop with no services running:
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_pipeline --events 2000 --concurrency 64
+
+Reports overall throughput plus p50/p95/p99 latency per stage:
+  ingest      HTTP request through FastAPI until the event is queued
+  queue_wait  IngestEvent.timestamp until a worker picks the event up
+  workflow    process_event (graph run, checkpointing, audit buffering)
+  end_to_end  IngestEvent.timestamp until process_event returns
+  audit_flush one batched audit write (simulated commit latency)
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime
+from typing import Dict, List
+
+# Must be set before src.agent.graph builds its checkpointer
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-benchmark")
+os.environ.setdefault("QUEUE_BLOCK_TIMEOUT_SECONDS", "0.05")
+
+import httpx
+
+from benchmarks.fakes import install_fakes
+
+# Synthetic Slack traffic mix: (text, weight)
+EVENT_MIX = [
+    ("query data and analyze the results", 4),
+    ("query the user data", 3),
+    ("please write up the weekly notes", 2),
+    ("message slack with the status", 1),  # parks at the approval interrupt
+]
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+def summarize(name: str, samples: List[float]) -> str:
+    return (
+        f"{name:<12} n={len(samples):<6} "
+        f"p50={percentile(samples, 0.50) * 1000:8.2f}ms "
+        f"p95={percentile(samples, 0.95) * 1000:8.2f}ms "
+        f"p99={percentile(samples, 0.99) * 1000:8.2f}ms"
+    )
+
+def synthetic_payloads(count: int, seed: int, channels: int = 50) -> List[Dict]:
+    rng = random.Random(seed)
+    texts = [text for text, weight in EVENT_MIX for _ in range(weight)]
+    return [
+        {
+            "type": "event_callback",
+            "event_id": f"EvBench{seed}-{i}",
+            "channel": f"CBENCH{rng.randrange(channels)}",
+            "text": rng.choice(texts),
+        }
+        for i in range(count)
+    ]
+
+async def run_benchmark(events: int, concurrency: int, worker_concurrency: int, db_latency_ms: float, seed: int):
+    _, audit_engine = install_fakes(db_commit_latency=db_latency_ms / 1000)
+
+    from src.api.main import app
+    from src.services import worker as worker_module
+    from src.services.audit import audit_service
+
+    stages: Dict[str, List[float]] = {"ingest": [], "queue_wait": [], "workflow": [], "end_to_end": []}
+    done = asyncio.Event()
+    completed = 0
+
+    original_process_event = worker_module.process_event
+
+    async def timed_process_event(event):
+        nonlocal completed
+        picked_up = datetime.now()
+        stages["queue_wait"].append((picked_up - event.timestamp).total_seconds())
+        start = time.perf_counter()
+        try:
+            await original_process_event(event)
+        finally:
+            # Failed workflows go to the retry set; count them so the run still ends
+            stages["workflow"].append(time.perf_counter() - start)
+            stages["end_to_end"].append((datetime.now() - event.timestamp).total_seconds())
+            completed += 1
+            if completed >= events:
+                done.set()
+
+    worker_module.process_event = timed_process_event
+    worker = worker_module.WorkflowWorker(max_concurrency=worker_concurrency)
+
+    payloads = synthetic_payloads(events, seed)
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def send(client: httpx.AsyncClient, payload: Dict):
+        async with limiter:
+            start = time.perf_counter()
+            response = await client.post("/api/v1/ingest/slack", json=payload)
+            stages["ingest"].append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    # Logging isn't configured here, so only warnings and errors reach stderr
+    worker_task = asyncio.create_task(worker.run())
+    started = time.perf_counter()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await asyncio.gather(*[send(client, payload) for payload in payloads])
+    ingest_elapsed = time.perf_counter() - started
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    worker.stop()
+    await worker_task
+    await audit_service.close()
+
+    worker_module.process_event = original_process_event
+
+    print(f"events={events} client_concurrency={concurrency} worker_concurrency={worker_concurrency} "
+          f"db_latency={db_latency_ms}ms")
+    print(f"ingest throughput   {events / ingest_elapsed:10.1f} events/s")
+    print(f"pipeline throughput {events / elapsed:10.1f} events/s ({elapsed:.2f}s total)")
+    for name, samples in stages.items():
+        print(summarize(name, samples))
+    print(summarize("audit_flush", audit_engine.batch_latencies))
+    if audit_engine.batch_sizes:
+        print(f"audit rows={audit_engine.rows_written} batches={len(audit_engine.batch_sizes)} "
+              f"avg_batch={audit_engine.rows_written / len(audit_engine.batch_sizes):.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent ingest requests")
+    parser.add_argument("--worker-concurrency", type=int, default=32, help="max in-flight workflows")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0, help="simulated audit commit latency")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.events, args.concurrency, args.worker_concurrency, args.db_latency_ms, args.seed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+In-process stand-ins for Redis and Postgres so the pipeline can be
+benchmarked on a laptop with no external services.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import List
+
+import fakeredis
+
+class FakeAuditEngine:
+    """
+    Minimal async engine for AuditService: accepts batched INSERTs and
+    simulates a fixed commit latency per batch.
+    """
+
+    def __init__(self, commit_latency: float = 0.001):
+        self.commit_latency = commit_latency
+        self.rows_written = 0
+        self.batch_sizes: List[int] = []
+        self.batch_latencies: List[float] = []
+
+    @asynccontextmanager
+    async def begin(self):
+        start = time.perf_counter()
+        yield self
+        await asyncio.sleep(self.commit_latency)
+        self.batch_latencies.append(time.perf_counter() - start)
+
+    async def execute(self, statement, rows=None):
+        rows = rows or []
+        self.rows_written += len(rows)
+        self.batch_sizes.append(len(rows))
+
+def install_fakes(db_commit_latency: float = 0.001):
+    """
+    Point the queue, dedup and audit services at in-process fakes.
+    CHECKPOINT_BACKEND must already be "memory" when src.agent.graph is imported.
+    """
+    from src.services.queue import queue_service
+    from src.services.dedup import event_deduplicator
+    from src.services.audit import audit_service
+    from src.services.retry import retry_service
+    from src.services.approvals import approval_service
+
+    redis = fakeredis.FakeAsyncRedis()
+    queue_service.redis = redis
+    event_deduplicator.redis = redis
+    retry_service.redis = redis
+    approval_service.redis = redis
+
+    audit_engine = FakeAuditEngine(db_commit_latency)
+    audit_service.engine = audit_engine
+    return redis, audit_engine
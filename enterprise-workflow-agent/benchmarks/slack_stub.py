@@ -0,0 +1,78 @@
+"""
+Local stand-in for the Slack Web API, for exercising SlackClient without a
+workspace. It accepts chat.postMessage, enforces a per-channel rate limit
+with 429 + Retry-After like Slack does, and keeps what it received:
+
+    python -m benchmarks.slack_stub --port 8099 --channel-rate 1
+    SLACK_API_URL=http://localhost:8099/api SLACK_BOT_TOKEN=xoxb-test python -m src.services.worker
+
+GET /stats shows the counts, GET /messages?channel=... the messages.
+"""
+import argparse
+import asyncio
+import math
+import time
+from typing import Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from src.core.rate_limit import TokenBucket
+
+def create_app(channel_rate: float = 1.0, burst: float = 3.0, latency_ms: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Slack API stub")
+    app.state.messages = {}
+    app.state.calls = 0
+    app.state.rate_limited = 0
+    buckets: Dict[str, TokenBucket] = {}
+
+    @app.post("/api/chat.postMessage")
+    async def post_message(request: Request):
+        app.state.calls += 1
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            return {"ok": False, "error": "not_authed"}
+        body = await request.json()
+        channel = body.get("channel")
+        if not channel:
+            return {"ok": False, "error": "channel_not_found"}
+        if not body.get("text"):
+            return {"ok": False, "error": "no_text"}
+        bucket = buckets.setdefault(channel, TokenBucket(channel_rate, burst))
+        wait = bucket.take()
+        if wait:
+            app.state.rate_limited += 1
+            return JSONResponse({"ok": False, "error": "ratelimited"}, status_code=429,
+                                headers={"Retry-After": str(math.ceil(wait))})
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        ts = f"{time.time():.6f}"
+        app.state.messages.setdefault(channel, []).append({"ts": ts, "text": body["text"]})
+        return {"ok": True, "channel": channel, "ts": ts, "message": {"text": body["text"]}}
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "calls": app.state.calls,
+            "rate_limited": app.state.rate_limited,
+            "messages": {channel: len(items) for channel, items in app.state.messages.items()},
+        }
+
+    @app.get("/messages")
+    async def messages(channel: str):
+        return app.state.messages.get(channel, [])
+
+    return app
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--channel-rate", type=float, default=1.0, help="messages/second per channel")
+    parser.add_argument("--burst", type=float, default=3.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.channel_rate, args.burst, args.latency_ms), port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
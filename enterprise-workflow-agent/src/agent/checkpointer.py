@@ -0,0 +1,375 @@
+import random
+import zlib
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_serializable_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from sqlalchemy import and_, delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.config import settings
+from src.core.database import engine as default_engine
+from src.core.models import checkpoints_table, checkpoint_blobs_table, checkpoint_writes_table
+
+_ZLIB_SUFFIX = "+zlib"
+
+# State types that may be restored from a checkpoint
+_STATE_TYPES = [
+    ("src.schemas.events", "EventSource"),
+    ("src.schemas.events", "WorkflowStatus"),
+]
+
+class PostgresCheckpointer(BaseCheckpointSaver[str]):
+    """
+    Durable LangGraph checkpointer on the shared async SQLAlchemy engine.
+
+    - Channel values are stored once per (channel, version) in `checkpoint_blobs`,
+      so each step only writes the channels it actually changed.
+    - Serialized payloads above CHECKPOINT_COMPRESS_MIN_BYTES are zlib-compressed.
+    - `aprune()` drops all but the latest checkpoint of a finished workflow,
+      together with its orphaned writes and blobs.
+
+    Async-only: the graph is driven with `ainvoke`, so the sync API is not implemented.
+    """
+
+    def __init__(self, engine: AsyncEngine = None, compress_min_bytes: int = None, **kwargs):
+        super().__init__(**kwargs)
+        self.engine = engine or default_engine
+        self.compress_min_bytes = (
+            settings.CHECKPOINT_COMPRESS_MIN_BYTES if compress_min_bytes is None else compress_min_bytes
+        )
+
+    async def setup(self):
+        """Create the checkpoint tables if they don't exist."""
+        async with self.engine.begin() as conn:
+            await conn.run_sync(
+                lambda sync_conn: checkpoints_table.metadata.create_all(
+                    sync_conn,
+                    tables=[checkpoints_table, checkpoint_blobs_table, checkpoint_writes_table],
+                )
+            )
+
+    # --- serialization ---------------------------------------------------
+
+    def _dump(self, value: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) >= self.compress_min_bytes:
+            return type_ + _ZLIB_SUFFIX, zlib.compress(data, 1)
+        return type_, data
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        if type_.endswith(_ZLIB_SUFFIX):
+            type_, data = type_[: -len(_ZLIB_SUFFIX)], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same scheme as MemorySaver: zero-padded counter plus a random tiebreak
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # --- reads -----------------------------------------------------------
+
+    async def _hydrate(self, conn, row) -> CheckpointTuple:
+        checkpoint: Checkpoint = self._load(row.type, row.checkpoint)
+        versions = checkpoint.get("channel_versions", {})
+
+        channel_values = {}
+        if versions:
+            blobs = await conn.execute(
+                select(checkpoint_blobs_table).where(
+                    checkpoint_blobs_table.c.thread_id == row.thread_id,
+                    checkpoint_blobs_table.c.checkpoint_ns == row.checkpoint_ns,
+                    tuple_(checkpoint_blobs_table.c.channel, checkpoint_blobs_table.c.version).in_(
+                        [(k, str(v)) for k, v in versions.items()]
+                    ),
+                )
+            )
+            for blob in blobs:
+                if blob.type != "empty":
+                    channel_values[blob.channel] = self._load(blob.type, blob.blob)
+
+        writes = await conn.execute(
+            select(checkpoint_writes_table)
+            .where(
+                checkpoint_writes_table.c.thread_id == row.thread_id,
+                checkpoint_writes_table.c.checkpoint_ns == row.checkpoint_ns,
+                checkpoint_writes_table.c.checkpoint_id == row.checkpoint_id,
+            )
+            .order_by(
+                checkpoint_writes_table.c.task_path,
+                checkpoint_writes_table.c.task_id,
+                checkpoint_writes_table.c.idx,
+            )
+        )
+
+        def _config(checkpoint_id):
+            return {
+                "configurable": {
+                    "thread_id": row.thread_id,
+                    "checkpoint_ns": row.checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            }
+
+        return CheckpointTuple(
+            config=_config(row.checkpoint_id),
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self._load(row.metadata_type, row.metadata),
+            parent_config=_config(row.parent_checkpoint_id) if row.parent_checkpoint_id else None,
+            pending_writes=[(w.task_id, w.channel, self._load(w.type, w.blob)) for w in writes],
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = select(checkpoints_table).where(
+            checkpoints_table.c.thread_id == thread_id,
+            checkpoints_table.c.checkpoint_ns == checkpoint_ns,
+        )
+        if checkpoint_id := get_checkpoint_id(config):
+            query = query.where(checkpoints_table.c.checkpoint_id == checkpoint_id)
+        else:
+            # Checkpoint ids are time-ordered, so the max id is the latest
+            query = query.order_by(checkpoints_table.c.checkpoint_id.desc()).limit(1)
+
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(query)).first()
+            if row is None:
+                return None
+            return await self._hydrate(conn, row)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        query = select(checkpoints_table).order_by(checkpoints_table.c.checkpoint_id.desc())
+        if config:
+            query = query.where(checkpoints_table.c.thread_id == config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query = query.where(checkpoints_table.c.checkpoint_ns == checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query = query.where(checkpoints_table.c.checkpoint_id == checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query = query.where(checkpoints_table.c.checkpoint_id < before_id)
+        if limit is not None and not filter:
+            query = query.limit(limit)
+
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(query)).all()
+            for row in rows:
+                if filter:
+                    metadata = self._load(row.metadata_type, row.metadata)
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                if limit is not None:
+                    if limit <= 0:
+                        break
+                    limit -= 1
+                yield await self._hydrate(conn, row)
+
+    # --- writes ----------------------------------------------------------
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+
+        checkpoint_copy = checkpoint.copy()
+        values: Dict[str, Any] = checkpoint_copy.pop("channel_values")
+
+        # Only channels with a new version are written: this is the per-step delta
+        blob_rows = []
+        for channel, version in new_versions.items():
+            if channel in values:
+                type_, blob = self._dump(values[channel])
+            else:
+                type_, blob = "empty", None
+            blob_rows.append({
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "channel": channel,
+                "version": str(version),
+                "type": type_,
+                "blob": blob,
+            })
+
+        checkpoint_type, checkpoint_blob = self._dump(checkpoint_copy)
+        metadata_type, metadata_blob = self._dump(get_serializable_checkpoint_metadata(config, metadata))
+        checkpoint_row = {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+            "parent_checkpoint_id": parent_checkpoint_id,
+            "type": checkpoint_type,
+            "checkpoint": checkpoint_blob,
+            "metadata_type": metadata_type,
+            "metadata": metadata_blob,
+        }
+
+        async with self.engine.begin() as conn:
+            if blob_rows:
+                await conn.execute(insert(checkpoint_blobs_table).values(blob_rows).on_conflict_do_nothing())
+            stmt = insert(checkpoints_table).values(checkpoint_row)
+            await conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["thread_id", "checkpoint_ns", "checkpoint_id"],
+                    set_={
+                        "type": stmt.excluded.type,
+                        "checkpoint": stmt.excluded.checkpoint,
+                        "metadata_type": stmt.excluded.metadata_type,
+                        "metadata": stmt.excluded.metadata,
+                    },
+                )
+            )
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        if not writes:
+            return
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self._dump(value)
+            rows.append({
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+                "task_id": task_id,
+                "idx": WRITES_IDX_MAP.get(channel, idx),
+                "channel": channel,
+                "type": type_,
+                "blob": blob,
+                "task_path": task_path,
+            })
+
+        stmt = insert(checkpoint_writes_table).values(rows)
+        if all(channel in WRITES_IDX_MAP for channel, _ in writes):
+            # Special writes (errors, interrupts, resumes) replace earlier ones
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx"],
+                set_={
+                    "channel": stmt.excluded.channel,
+                    "type": stmt.excluded.type,
+                    "blob": stmt.excluded.blob,
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing()
+
+        async with self.engine.begin() as conn:
+            await conn.execute(stmt)
+
+    # --- retention -------------------------------------------------------
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        async with self.engine.begin() as conn:
+            for table in (checkpoints_table, checkpoint_blobs_table, checkpoint_writes_table):
+                await conn.execute(delete(table).where(table.c.thread_id == thread_id))
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        """
+        Prune checkpoints of finished workflows.
+
+        "keep_latest" keeps the newest checkpoint per namespace (so the final
+        state stays inspectable) and deletes everything it doesn't reference;
+        "delete" removes the threads entirely. Safe here because the workflow
+        graph has no DeltaChannel channels.
+        """
+        if strategy == "delete":
+            for thread_id in thread_ids:
+                await self.adelete_thread(thread_id)
+            return
+        if strategy != "keep_latest":
+            raise ValueError(f"Unknown prune strategy: {strategy}")
+
+        async with self.engine.begin() as conn:
+            for thread_id in thread_ids:
+                latest_rows = await conn.execute(
+                    select(checkpoints_table)
+                    .where(checkpoints_table.c.thread_id == thread_id)
+                    .order_by(checkpoints_table.c.checkpoint_ns, checkpoints_table.c.checkpoint_id.desc())
+                    .distinct(checkpoints_table.c.checkpoint_ns)
+                )
+                for row in latest_rows.all():
+                    await self._prune_namespace(conn, row)
+
+    async def _prune_namespace(self, conn, latest_row):
+        thread_id, checkpoint_ns = latest_row.thread_id, latest_row.checkpoint_ns
+        in_namespace = lambda table: and_(table.c.thread_id == thread_id, table.c.checkpoint_ns == checkpoint_ns)
+
+        await conn.execute(
+            delete(checkpoints_table).where(
+                in_namespace(checkpoints_table),
+                checkpoints_table.c.checkpoint_id != latest_row.checkpoint_id,
+            )
+        )
+        await conn.execute(
+            delete(checkpoint_writes_table).where(
+                in_namespace(checkpoint_writes_table),
+                checkpoint_writes_table.c.checkpoint_id != latest_row.checkpoint_id,
+            )
+        )
+
+        versions = self._load(latest_row.type, latest_row.checkpoint).get("channel_versions", {})
+        orphaned = delete(checkpoint_blobs_table).where(in_namespace(checkpoint_blobs_table))
+        if versions:
+            orphaned = orphaned.where(
+                tuple_(checkpoint_blobs_table.c.channel, checkpoint_blobs_table.c.version).not_in(
+                    [(k, str(v)) for k, v in versions.items()]
+                )
+            )
+        await conn.execute(orphaned)
+
+def build_serde() -> JsonPlusSerializer:
+    """Serializer for workflow state; also used for values offloaded to the blob store."""
+    return JsonPlusSerializer(allowed_msgpack_modules=_STATE_TYPES)
+
+def build_checkpointer() -> BaseCheckpointSaver:
+    """Pick the checkpointer for CHECKPOINT_BACKEND ("postgres" or "memory")."""
+    serde = build_serde()
+    if settings.CHECKPOINT_BACKEND == "memory":
+        return MemorySaver(serde=serde)
+    return PostgresCheckpointer(serde=serde)
@@ -1,7 +1,8 @@
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 from src.agent.state import WorkflowState
-from src.agent.nodes.supervisor import supervisor_node, router
+from src.agent.checkpointer import build_checkpointer
+from src.core.metrics import timed_node
+from src.agent.nodes.supervisor import APPROVAL_STEPS, supervisor_node, router
 from src.agent.nodes.workers import (
     communication_node,
     data_node,
@@ -13,11 +14,11 @@ from src.agent.nodes.workers import (
 workflow = StateGraph(WorkflowState)
 
 # Add nodes
-workflow.add_node("supervisor", supervisor_node)
-workflow.add_node("communication_node", communication_node)
-workflow.add_node("data_node", data_node)
-workflow.add_node("analysis_node", analysis_node)
-workflow.add_node("documentation_node", documentation_node)
+workflow.add_node("supervisor", timed_node("supervisor_node", supervisor_node))
+workflow.add_node("communication_node", timed_node("communication_node", communication_node))
+workflow.add_node("data_node", timed_node("data_node", data_node))
+workflow.add_node("analysis_node", timed_node("analysis_node", analysis_node))
+workflow.add_node("documentation_node", timed_node("documentation_node", documentation_node))
 
 # Add edges
 workflow.set_entry_point("supervisor")
@@ -42,10 +43,10 @@ workflow.add_edge("analysis_node", "supervisor")
 workflow.add_edge("documentation_node", "supervisor")
 
 # Initialize checkpointer
-checkpointer = MemorySaver()
+checkpointer = build_checkpointer()
 
 # Compile the graph with checkpointer and interrupt
 agent_graph = workflow.compile(
     checkpointer=checkpointer,
-    interrupt_before=["communication_node"] # Human approval required before sending messages
+    interrupt_before=sorted(APPROVAL_STEPS) # Human approval required before sending messages
 )
@@ -1,5 +1,32 @@
 from src.agent.state import WorkflowState, WorkflowStatus
-from typing import Literal
+from typing import Dict, List, Literal, Union
+
+# A step only waits for the steps it actually consumes output from
+STEP_DEPENDENCIES: Dict[str, List[str]] = {
+    "analysis_node": ["data_node"],
+    "documentation_node": ["analysis_node"],
+}
+
+# Steps that need human approval; the graph interrupts before them (see graph.py)
+APPROVAL_STEPS = {"communication_node"}
+
+def ready_steps(state: WorkflowState) -> List[str]:
+    """
+    Steps whose dependencies are all completed, in plan order.
+
+    Approval-gated steps are held back while any other step is ready: an
+    interrupt parks the whole superstep, so scheduling them together would
+    make independent work wait for the approver. They run in a later
+    superstep of their own, once the rest of the work that can run has.
+    """
+    completed = set(state.get("completed_steps", []))
+    dependencies = state.get("dependencies", {})
+    ready = [
+        step for step in state["plan"]
+        if step not in completed and all(dep in completed for dep in dependencies.get(step, []))
+    ]
+    ungated = [step for step in ready if step not in APPROVAL_STEPS]
+    return ungated or ready
 
 async def supervisor_node(state: WorkflowState):
     """
@@ -22,30 +49,45 @@ async def supervisor_node(state: WorkflowState):
         # Default fallback
         if not plan:
             plan.append("documentation_node")
-            
+
+        # Keep only dependencies on steps that are actually part of this plan
+        dependencies = {
+            step: [dep for dep in STEP_DEPENDENCIES.get(step, []) if dep in plan]
+            for step in plan
+        }
+
         return {
             "plan": plan,
+            "dependencies": dependencies,
             "status": WorkflowStatus.PLANNING,
-            "current_step_index": 0
+            "next_nodes": ready_steps({"plan": plan, "dependencies": dependencies, "completed_steps": []})
         }
     
     # Check if workflow is complete
-    if state["current_step_index"] >= len(state["plan"]):
+    if set(state["plan"]) <= set(state.get("completed_steps", [])):
         return {
             "status": WorkflowStatus.COMPLETED,
-            "next_node": "end"
+            "next_nodes": []
         }
     
-    # Determine next node from plan
-    next_step = state["plan"][state["current_step_index"]]
+    # Fan out to every step whose dependencies are satisfied
+    next_steps = ready_steps(state)
+    if not next_steps:
+        return {
+            "status": WorkflowStatus.FAILED,
+            "errors": state.get("errors", []) + ["Plan has unsatisfiable step dependencies"],
+            "next_nodes": []
+        }
     return {
         "status": WorkflowStatus.RUNNING,
-        "next_node": next_step
+        "next_nodes": next_steps
     }
 
-def router(state: WorkflowState) -> Literal["communication_node", "data_node", "analysis_node", "documentation_node", "end"]:
-    """Conditional edge router"""
-    if state["status"] == WorkflowStatus.COMPLETED:
+NodeName = Literal["communication_node", "data_node", "analysis_node", "documentation_node", "end"]
+
+def router(state: WorkflowState) -> Union[NodeName, List[NodeName]]:
+    """Conditional edge router; returning several nodes runs them concurrently"""
+    if state["status"] in (WorkflowStatus.COMPLETED, WorkflowStatus.FAILED) or not state["next_nodes"]:
         return "end"
         
-    return state["next_node"]
+    return state["next_nodes"]
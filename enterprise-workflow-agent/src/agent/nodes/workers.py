@@ -1,18 +1,28 @@
+import asyncio
 from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
 from src.agent.state import WorkflowState, WorkflowStatus
 from src.schemas.events import AgentAction, AuditLogEntry
 from src.agent.tools.slack import slack_tool
 from src.agent.tools.db_query import db_query_tool
+from src.agent.tools.analysis import analysis_engine
+from src.services.audit import audit_service
+from src.core.log import get_logger
+from src.services.blob_store import blob_store, is_blob_ref
 from datetime import datetime
 
-async def communication_node(state: WorkflowState):
-    """Worker node for communication tasks"""
-    current_task = state['plan'][state['current_step_index']]
-    print(f"Executing Communication Task: {current_task}")
+logger = get_logger(__name__)
+
+async def communication_node(state: WorkflowState, config: RunnableConfig):
+    """Worker node for communication tasks (runs only after approval)"""
+    current_task = "communication_node"
+    logger.debug("Executing task", extra={"node": current_task})
     
     # Mock extracting channel and message from context or task description
     channel = "#general"
-    message = f"Executing task: {current_task}. Context: {state.get('context', {})}"
+    # Offloaded values (query results) are left out; a blob reference means nothing to a reader
+    context = {key: value for key, value in state.get("context", {}).items() if not is_blob_ref(value)}
+    message = f"Executing task: {current_task}. Context: {context}"
     
     result = await slack_tool.send_message(channel, message)
     
@@ -28,26 +38,33 @@ async def communication_node(state: WorkflowState):
         workflow_id=state['workflow_id'],
         action=action,
         outcome=result.get("status", "unknown"),
-        authorized_by=None
+        authorized_by=config.get("configurable", {}).get("approved_by")
     )
+    await audit_service.log_entry(audit_entry)
     
     return {
-        "audit_trail": [audit_entry],
-        "current_step_index": state["current_step_index"] + 1
+        "audit_count": 1,
+        "completed_steps": [current_task]
     }
 
 async def data_node(state: WorkflowState):
     """Worker node for data tasks"""
-    current_task = state['plan'][state['current_step_index']]
-    print(f"Executing Data Task: {current_task}")
+    current_task = "data_node"
+    logger.debug("Executing task", extra={"node": current_task})
     
     # Mock query execution
     query = "SELECT * FROM users LIMIT 5" # In reality, extracted from task/LLM
     
     # We catch errors here to prevent crashing the worker
     try:
-        # data = await db_query_tool.execute_query(query)
-        data = [{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}] # Mock data
+        # Columnar results convert to arrays for analysis_node without a per-row pass
+        # data = await db_query_tool.execute_query_columnar(query)
+        data = {  # Mock data
+            "columns": ["id", "name"],
+            "data": {"id": [1, 2], "name": ["Alice", "Bob"]},
+            "row_count": 2,
+            "truncated": False,
+        }
         outcome = "success"
     except Exception as e:
         data = {"error": str(e)}
@@ -66,52 +83,59 @@ async def data_node(state: WorkflowState):
         outcome=outcome,
         authorized_by=None
     )
+    await audit_service.log_entry(audit_entry)
     
-    # Update context with data
-    new_context = state.get("context", {}).copy()
-    new_context["data_result"] = data
-    
+    # Only the new key is returned; the context reducer merges it. Large
+    # results go to the blob store so the checkpoint only holds a reference.
     return {
-        "context": new_context,
-        "audit_trail": [audit_entry],
-        "current_step_index": state["current_step_index"] + 1
+        "context": {"data_result": await blob_store.offload(data)},
+        "audit_count": 1,
+        "completed_steps": [current_task]
     }
 
 async def analysis_node(state: WorkflowState):
     """Worker node for analysis tasks"""
-    current_task = state['plan'][state['current_step_index']]
-    print(f"Executing Analysis Task: {current_task}")
+    current_task = "analysis_node"
+    logger.debug("Executing task", extra={"node": current_task})
     
-    data_to_analyze = state.get("context", {}).get("data_result", [])
-    analysis_result = f"Analyzed {len(data_to_analyze)} records. Found patterns X, Y, Z."
+    data_to_analyze = await blob_store.resolve(state.get("context", {}).get("data_result", []))
+    summary = None
+    try:
+        if isinstance(data_to_analyze, dict) and "error" in data_to_analyze:
+            raise ValueError(f"Query failed: {data_to_analyze['error']}")
+        # NumPy work runs off the event loop
+        summary = await asyncio.to_thread(analysis_engine.analyze, data_to_analyze)
+        analysis_result = analysis_engine.summarize(summary)
+        outcome = "success"
+    except Exception as e:
+        analysis_result = f"Analysis failed: {e}"
+        outcome = "failed"
     
     action = AgentAction(
         agent_name="AnalysisAgent",
         tool_name="analyze_data",
-        tool_input={"data_summary": f"{len(data_to_analyze)} records"},
+        tool_input={"data_summary": f"{summary['row_count'] if summary else 0} records"},
         timestamp=datetime.now()
     )
     
     audit_entry = AuditLogEntry(
         workflow_id=state['workflow_id'],
         action=action,
-        outcome="success",
+        outcome=outcome,
         authorized_by=None
     )
-    
-    new_context = state.get("context", {}).copy()
-    new_context["analysis_result"] = analysis_result
+    await audit_service.log_entry(audit_entry)
     
     return {
-        "context": new_context,
-        "audit_trail": [audit_entry],
-        "current_step_index": state["current_step_index"] + 1
+        "context": {"analysis_result": analysis_result, "analysis_summary": await blob_store.offload(summary)},
+        "audit_count": 1,
+        "completed_steps": [current_task]
     }
 
 async def documentation_node(state: WorkflowState):
     """Worker node for documentation tasks"""
-    current_task = state['plan'][state['current_step_index']]
-    print(f"Executing Documentation Task: {current_task}")
+    current_task = "documentation_node"
+    logger.debug("Executing task", extra={"node": current_task})
     
     # Mock documentation
     doc_content = f"Workflow Report:\nAnalysis: {state.get('context', {}).get('analysis_result', 'N/A')}"
@@ -129,8 +153,9 @@ async def documentation_node(state: WorkflowState):
         outcome="success",
         authorized_by=None
     )
+    await audit_service.log_entry(audit_entry)
     
     return {
-        "audit_trail": [audit_entry],
-        "current_step_index": state["current_step_index"] + 1
+        "audit_count": 1,
+        "completed_steps": [current_task]
     }
@@ -1,6 +1,17 @@
-from typing import TypedDict, List, Dict, Any, Annotated, Optional
+from typing import TypedDict, List, Dict, Any, Annotated
 import operator
-from src.schemas.events import EventSource, WorkflowStatus, AgentAction, AuditLogEntry
+from src.schemas.events import EventSource, WorkflowStatus
+
+def merge_context(current: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reducer for `context`: nodes return only the keys they produce.
+
+    Parallel nodes in the same step are applied in LangGraph's deterministic
+    task order, so the merged result doesn't depend on which finished first.
+    """
+    if not update:
+        return current
+    return {**(current or {}), **update}
 
 class WorkflowState(TypedDict):
     """Core state object passed through LangGraph"""
@@ -8,11 +19,15 @@ class WorkflowState(TypedDict):
     source: EventSource
     original_request: str
     plan: List[str]
-    current_step_index: int
-    context: Dict[str, Any]
+    # step -> steps it must wait for; steps with no pending dependencies run in parallel
+    dependencies: Dict[str, List[str]]
+    completed_steps: Annotated[List[str], operator.add]
+    context: Annotated[Dict[str, Any], merge_context]
     status: WorkflowStatus
     errors: List[str]
-    audit_trail: Annotated[List[AuditLogEntry], operator.add]
+    # Audit entries are streamed to the audit log (see AuditService.get_trail);
+    # only the running count is checkpointed.
+    audit_count: Annotated[int, operator.add]
     
-    # Internal state for the graph
-    next_node: Optional[str]
+    # Internal state for the graph: steps to run in the next superstep
+    next_nodes: List[str]
@@ -0,0 +1,254 @@
+"""
+Vectorized analysis of query results.
+
+A result is converted once into NumPy column arrays (a `Frame`): numeric
+columns become float64 with NaN for NULLs, everything else becomes integer
+codes into a table of distinct values. Every analysis then works on whole
+columns, so a step costs a few array passes instead of a Python loop over
+row dicts.
+"""
+import numbers
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from src.core.config import settings
+
+class Column:
+    """Numeric `values` (float64, NaN = NULL), or categorical `codes` (-1 = NULL) into `categories`."""
+
+    def __init__(self, name: str, values: np.ndarray = None, codes: np.ndarray = None, categories: np.ndarray = None):
+        self.name = name
+        self.values = values
+        self.codes = codes
+        self.categories = categories
+
+    @property
+    def numeric(self) -> bool:
+        return self.values is not None
+
+    def __len__(self) -> int:
+        return len(self.values if self.numeric else self.codes)
+
+# Values that make a column numeric; strings never do, even "00123" (zip codes, ids)
+_NUMERIC_TYPES = (numbers.Real, Decimal, np.bool_)
+
+def _to_column(name: str, values: Sequence[Any]) -> Column:
+    if all(v is None or isinstance(v, _NUMERIC_TYPES) for v in values):
+        return Column(name, values=np.asarray([np.nan if v is None else v for v in values], dtype=np.float64))
+    is_null = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    strings = np.asarray([str(v) for v in values if v is not None], dtype=str)
+    categories, inverse = np.unique(strings, return_inverse=True)
+    codes = np.full(len(values), -1, dtype=np.int64)
+    codes[~is_null] = inverse
+    return Column(name, codes=codes, categories=categories)
+
+def _number(value) -> Optional[float]:
+    """Plain float for checkpoints and JSON; None instead of NaN."""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+def _is_identifier(name: str) -> bool:
+    # Surrogate keys are unique by construction; outliers/correlations on them are noise
+    return name == "id" or name.endswith("_id")
+
+class Frame:
+    """A query result as named, equally long NumPy columns."""
+
+    def __init__(self, columns: Dict[str, Column], row_count: int):
+        self.columns = columns
+        self.row_count = row_count
+
+    @classmethod
+    def from_result(cls, data: Any) -> "Frame":
+        """
+        Build a frame from `execute_query_columnar` output, a `{column: values}`
+        dict, or a list of row dicts (the slowest input: one pass per column).
+        """
+        # Only the execute_query_columnar envelope; a plain column named "data" stays a column
+        if isinstance(data, dict) and "data" in data and "columns" in data:
+            data = data["data"]
+        if isinstance(data, dict):
+            raw = data
+        else:
+            rows = list(data)
+            for i, row in enumerate(rows):
+                if not isinstance(row, dict):
+                    raise ValueError(f"Expected a list of row dicts, got {type(row).__name__} at row {i}")
+            names = list(rows[0].keys()) if rows else []
+            raw = {name: [row.get(name) for row in rows] for name in names}
+        columns = {name: _to_column(name, list(values)) for name, values in raw.items()}
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        return cls(columns, lengths.pop() if lengths else 0)
+
+    def numeric(self) -> List[Column]:
+        return [column for column in self.columns.values() if column.numeric]
+
+    def categorical(self) -> List[Column]:
+        return [column for column in self.columns.values() if not column.numeric]
+
+class AnalysisEngine:
+    """Aggregations and anomaly checks over a `Frame`; `analyze` runs the standard set."""
+
+    def __init__(self, outlier_threshold: float = None, top_k: int = None, max_groups: int = None):
+        self.outlier_threshold = settings.ANALYSIS_OUTLIER_THRESHOLD if outlier_threshold is None else outlier_threshold
+        self.top_k = settings.ANALYSIS_TOP_K if top_k is None else top_k
+        self.max_groups = settings.ANALYSIS_MAX_GROUPS if max_groups is None else max_groups
+
+    def describe(self, column: Column) -> Dict[str, Any]:
+        """Count, nulls and distribution (numeric) or most common values (categorical)."""
+        if column.numeric:
+            present = column.values[~np.isnan(column.values)]
+            stats = {"count": int(present.size), "nulls": int(len(column) - present.size)}
+            if present.size:
+                low, p50, p95, high = np.percentile(present, [0, 50, 95, 100])
+                stats.update(
+                    mean=_number(present.mean()), std=_number(present.std()),
+                    min=_number(low), p50=_number(p50), p95=_number(p95), max=_number(high),
+                )
+            return stats
+        present = column.codes[column.codes >= 0]
+        counts = np.bincount(present, minlength=len(column.categories))
+        top = np.argsort(-counts, kind="stable")[:self.top_k]
+        return {
+            "count": int(present.size),
+            "nulls": int(len(column) - present.size),
+            "distinct": int(np.count_nonzero(counts)),
+            "top": [{"value": str(column.categories[i]), "count": int(counts[i])} for i in top if counts[i]],
+        }
+
+    def group_by(self, frame: Frame, key: str, value: str = None) -> List[Dict[str, Any]]:
+        """
+        Per-group count (and sum/mean/min/max of the numeric `value` column),
+        largest groups first, at most ANALYSIS_MAX_GROUPS of them.
+        """
+        key_column = frame.columns[key]
+        if key_column.numeric:
+            valid = ~np.isnan(key_column.values)
+            labels, inverse = np.unique(key_column.values[valid], return_inverse=True)
+            codes = np.full(frame.row_count, -1, dtype=np.int64)
+            codes[valid] = inverse
+        else:
+            codes, labels = key_column.codes, key_column.categories
+
+        valid = codes >= 0
+        values = None
+        if value is not None:
+            values = frame.columns[value].values
+            if values is None:
+                raise ValueError(f"Column {value!r} is not numeric")
+            valid &= ~np.isnan(values)
+            values = values[valid]
+        codes = codes[valid]
+        counts = np.bincount(codes, minlength=len(labels))
+        order = np.argsort(-counts, kind="stable")[:self.max_groups]
+
+        groups = [{"key": labels[i].item() if key_column.numeric else str(labels[i]), "count": int(counts[i])}
+                  for i in order if counts[i]]
+        if values is None or not groups:
+            return groups
+
+        sums = np.bincount(codes, weights=values, minlength=len(labels))
+        # Min/max per group: sort by group once and reduce each run
+        by_group = np.argsort(codes, kind="stable")
+        sorted_codes = codes[by_group]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        mins = np.full(len(labels), np.nan)
+        maxs = np.full(len(labels), np.nan)
+        mins[sorted_codes[starts]] = np.minimum.reduceat(values[by_group], starts)
+        maxs[sorted_codes[starts]] = np.maximum.reduceat(values[by_group], starts)
+        for group, i in zip(groups, order):
+            group.update(sum=_number(sums[i]), mean=_number(sums[i] / counts[i]),
+                         min=_number(mins[i]), max=_number(maxs[i]))
+        return groups
+
+    def outliers(self, column: Column, threshold: float = None) -> Dict[str, Any]:
+        """
+        Values far from the median by robust z-score (MAD). Falls back to the
+        standard z-score when more than half the values are identical.
+        """
+        threshold = self.outlier_threshold if threshold is None else threshold
+        values = column.values
+        present = ~np.isnan(values)
+        if not present.any():
+            return {"count": 0, "method": "mad", "threshold": threshold, "examples": []}
+        median = np.median(values[present])
+        deviation = np.abs(values - median)
+        mad = np.median(deviation[present])
+        method = "mad"
+        if mad > 0:
+            scores = deviation / (1.4826 * mad)
+        else:
+            method = "zscore"
+            std = values[present].std()
+            scores = deviation / std if std > 0 else np.zeros_like(values)
+        flagged = np.flatnonzero(present & (scores > threshold))
+        worst = flagged[np.argsort(-scores[flagged], kind="stable")[:self.top_k]]
+        return {
+            "count": int(flagged.size),
+            "method": method,
+            "threshold": threshold,
+            "examples": [{"row": int(i), "value": _number(values[i]), "score": _number(scores[i])} for i in worst],
+        }
+
+    def correlations(self, frame: Frame, min_abs: float = None) -> List[Dict[str, Any]]:
+        """Pairs of numeric columns with |Pearson r| >= `min_abs`, over rows where both are set."""
+        min_abs = settings.ANALYSIS_MIN_CORRELATION if min_abs is None else min_abs
+        columns = [c for c in frame.numeric() if not _is_identifier(c.name)]
+        if len(columns) < 2:
+            return []
+        valid = np.ones(frame.row_count, dtype=bool)
+        for column in columns:
+            valid &= ~np.isnan(column.values)
+        count = int(valid.sum())
+        if count < 3:
+            return []
+        # Standardize each column once; r for a pair is then one dot product
+        standardized = []
+        for column in columns:
+            values = column.values if count == frame.row_count else column.values[valid]
+            std = values.std()
+            standardized.append((values - values.mean()) / std if std > 0 else None)
+        pairs = []
+        for i in range(len(columns)):
+            for j in range(i + 1, len(columns)):
+                if standardized[i] is None or standardized[j] is None:
+                    continue
+                r = float(np.dot(standardized[i], standardized[j])) / count
+                if abs(r) >= min_abs:
+                    pairs.append({"columns": [columns[i].name, columns[j].name], "r": min(max(r, -1.0), 1.0)})
+        return pairs
+
+    def analyze(self, data: Any) -> Dict[str, Any]:
+        """Profile every column, flag outliers and report strong correlations."""
+        frame = data if isinstance(data, Frame) else Frame.from_result(data)
+        anomalies = {}
+        for column in frame.numeric():
+            if _is_identifier(column.name):
+                continue
+            found = self.outliers(column)
+            if found["count"]:
+                anomalies[column.name] = found
+        return {
+            "row_count": frame.row_count,
+            "columns": {name: self.describe(column) for name, column in frame.columns.items()},
+            "anomalies": anomalies,
+            "correlations": self.correlations(frame),
+        }
+
+    @staticmethod
+    def summarize(result: Dict[str, Any]) -> str:
+        """One-paragraph text version of an `analyze` result."""
+        parts = [f"Analyzed {result['row_count']} records across {len(result['columns'])} columns."]
+        if result["anomalies"]:
+            parts.append("Outliers: " + ", ".join(
+                f"{name} ({found['count']})" for name, found in result["anomalies"].items()) + ".")
+        else:
+            parts.append("No outliers found.")
+        if result["correlations"]:
+            parts.append("Strong correlations: " + ", ".join(
+                f"{a}~{b} (r={pair['r']:.2f})" for pair in result["correlations"] for a, b in [pair["columns"]]) + ".")
+        return " ".join(parts)
+
+analysis_engine = AnalysisEngine()
@@ -1,22 +1,167 @@
+import asyncio
 from sqlalchemy import text
-from src.core.database import AsyncSessionLocal
-from typing import List, Dict, Any
+from src.core.config import settings
+from src.core.database import ReadSessionLocal
+from src.core.metrics import timed_tool
+from src.agent.tools.query_cache import QueryCache, normalize_sql, referenced_tables
+from src.agent.tools.query_guard import QueryGuard, QueryRejected
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+def _estimate_size(value: Any) -> int:
+    """Cheap approximation of a value's in-memory footprint, for the byte cap."""
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (int, float, bool)):
+        return 8
+    return len(str(value))
+
+class QueryLimitExceeded(Exception):
+    pass
 
 class DBQueryTool:
-    async def execute_query(self, query: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    def __init__(self, cache: QueryCache = None, guard: QueryGuard = None):
+        self.cache = cache or QueryCache()
+        self.guard = guard or QueryGuard()
+        # Concurrent identical misses share one database round trip
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+
+    async def stream_query(
+        self,
+        query: str,
+        params: Dict[str, Any] = None,
+        max_rows: int = None,
+        max_bytes: int = None,
+    ) -> AsyncIterator[Tuple[List[str], List[tuple]]]:
+        """
+        Streams a read-only query from a server-side cursor.
+
+        Yields `(columns, rows)` batches of DB_QUERY_FETCH_SIZE row tuples and
+        stops at `max_rows` / `max_bytes`, raising QueryLimitExceeded after the
+        last batch that fit so callers know the result was cut short.
+        """
+        max_rows = max_rows or settings.DB_QUERY_MAX_ROWS
+        max_bytes = max_bytes or settings.DB_QUERY_MAX_BYTES
+        # One extra row lets us tell "exactly max_rows" from "truncated"
+        sql = self.guard.rewrite(query, limit=max_rows + 1)
+
+        async with ReadSessionLocal() as session:
+            await session.execute(text(f"SET LOCAL statement_timeout = {int(settings.DB_QUERY_STATEMENT_TIMEOUT_MS)}"))
+            await self.guard.check_plan(session, sql, params)
+            result = await session.stream(text(sql), params or {})
+            columns = list(result.keys())
+            row_count = 0
+            byte_count = 0
+            async for partition in result.partitions(settings.DB_QUERY_FETCH_SIZE):
+                batch = []
+                for row in partition:
+                    row_count += 1
+                    byte_count += sum(_estimate_size(v) for v in row)
+                    if row_count > max_rows or byte_count > max_bytes:
+                        if batch:
+                            yield columns, batch
+                        await result.close()
+                        raise QueryLimitExceeded(
+                            f"Result exceeds limit of {max_rows} rows / {max_bytes} bytes"
+                        )
+                    batch.append(tuple(row))
+                yield columns, batch
+            if row_count == 0:
+                # Still report the column names for empty results
+                yield columns, []
+
+    async def _fetch(self, query, params, max_rows, max_bytes) -> Tuple[List[str], List[tuple], bool]:
+        columns: List[str] = []
+        rows: List[tuple] = []
+        truncated = False
+        try:
+            async for columns, batch in self.stream_query(query, params, max_rows, max_bytes):
+                rows.extend(batch)
+        except QueryLimitExceeded:
+            truncated = True
+        return columns, rows, truncated
+
+    async def _collect(self, query, params, max_rows, max_bytes) -> Tuple[List[str], List[tuple], bool]:
+        """Fetch through the result cache. Rows are tuples, so cached results can't be mutated in place."""
+        if not self.cache.enabled:
+            return await self._fetch(query, params, max_rows, max_bytes)
+
+        normalized = normalize_sql(query)
+        key = self.cache.make_key(normalized, params, max_rows, max_bytes)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._fetch(query, params, max_rows, max_bytes)
+            size = sum(_estimate_size(v) for row in result[1] for v in row)
+            self.cache.put(key, result, referenced_tables(normalized), size)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure isn't logged as never retrieved
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def invalidate_tables(self, *tables: str) -> int:
+        """Drop cached results that read any of `tables`; call after writing to them."""
+        return self.cache.invalidate_tables(tables)
+
+    @timed_tool("execute_query")
+    async def execute_query(
+        self,
+        query: str,
+        params: Dict[str, Any] = None,
+        max_rows: int = None,
+        max_bytes: int = None,
+    ) -> List[Dict[str, Any]]:
         """
         Executes a read-only SQL query.
+
+        Rows beyond the row/byte caps are not fetched; use
+        `execute_query_columnar` to find out whether that happened.
+        """
+        try:
+            columns, rows, _ = await self._collect(query, params, max_rows, max_bytes)
+            # Convert rows to dicts
+            return [dict(zip(columns, row)) for row in rows]
+        except QueryRejected:
+            raise
+        except Exception as e:
+            return [{"error": str(e)}]
+
+    @timed_tool("execute_query_columnar")
+    async def execute_query_columnar(
+        self,
+        query: str,
+        params: Dict[str, Any] = None,
+        max_rows: int = None,
+        max_bytes: int = None,
+    ) -> Dict[str, Any]:
+        """
+        Executes a read-only SQL query and returns column arrays instead of
+        one dict per row: {"columns", "data": {column: [values]}, "row_count", "truncated"}.
         """
-        # Security check: simplistic prevention of write operations
-        if not query.strip().lower().startswith("select"):
-            raise ValueError("Only SELECT queries are allowed.")
-            
-        async with AsyncSessionLocal() as session:
-            try:
-                result = await session.execute(text(query), params or {})
-                # Convert rows to dicts
-                return [dict(row._mapping) for row in result]
-            except Exception as e:
-                return [{"error": str(e)}]
+        try:
+            columns, rows, truncated = await self._collect(query, params, max_rows, max_bytes)
+        except QueryRejected:
+            raise
+        except Exception as e:
+            return {"error": str(e)}
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        return {
+            "columns": columns,
+            "data": {column: list(column_values) for column, column_values in zip(columns, values)},
+            "row_count": len(rows),
+            "truncated": truncated,
+        }
 
 db_query_tool = DBQueryTool()
@@ -0,0 +1,162 @@
+import json
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+import sqlglot
+from sqlglot import exp
+from src.core.config import settings
+
+# String literals and double-quoted identifiers, which are kept verbatim
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+
+def normalize_sql(query: str) -> str:
+    """
+    Lowercase and collapse whitespace outside string literals and quoted
+    identifiers, drop a trailing ';'. `"Users"` and `users` are different
+    tables in Postgres, so quoted names keep their case.
+    """
+    parts = _QUOTED.split(query.strip().rstrip(";"))
+    # Odd indices are the quoted parts
+    return "".join(
+        part if i % 2 else " ".join(part.lower().split()) for i, part in enumerate(parts)
+    )
+
+def table_key(name: str) -> str:
+    """
+    Invalidation key for a table name as written in SQL: unqualified,
+    lowercased unless double-quoted (`public."Users"` -> `Users`).
+    """
+    name = name.strip()
+    if name.endswith('"'):
+        return name[name.rindex('"', 0, -1) + 1:-1].replace('""', '"')
+    return name.split(".")[-1].lower()
+
+def referenced_tables(query: str) -> Set[str]:
+    """
+    Tables a query reads, from the parsed statement (the same sqlglot parse
+    the query guard does), so quoted names, schemas and joins of any shape
+    are covered. CTE names are not tables and are left out.
+    """
+    try:
+        statements = [s for s in sqlglot.parse(query, read="postgres") if s is not None]
+    except sqlglot.errors.ParseError:
+        # The guard rejects unparsable queries, so nothing gets cached for them
+        return set()
+    tables = set()
+    for tree in statements:
+        ctes = {cte.alias_or_name for cte in tree.find_all(exp.CTE)}
+        for table in tree.find_all(exp.Table):
+            identifier = table.this
+            if not isinstance(identifier, exp.Identifier) or (not table.db and identifier.name in ctes):
+                continue
+            tables.add(identifier.name if identifier.quoted else identifier.name.lower())
+    return tables
+
+@dataclass
+class _Entry:
+    value: Any
+    tables: Set[str]
+    size: int
+    expires_at: float
+
+class QueryCache:
+    """
+    TTL + LRU cache of query results, bounded by an approximate byte budget.
+
+    Entries are indexed by the tables they read, so writers can drop every
+    cached result that depends on a table with `invalidate_tables()`.
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, ttl: float = None, max_bytes: int = None):
+        self.ttl = settings.DB_QUERY_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.max_bytes = max_bytes or settings.DB_QUERY_CACHE_MAX_BYTES
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._by_table: Dict[str, Set[Tuple]] = {}
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @staticmethod
+    def make_key(normalized_query: str, params: Optional[Dict[str, Any]], *variant: Any) -> Tuple:
+        return (normalized_query, json.dumps(params or {}, sort_keys=True, default=str), *variant)
+
+    def get(self, key: Tuple) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def put(self, key: Tuple, value: Any, tables: Set[str], size: int):
+        if not self.enabled or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, tables, size, time.monotonic() + self.ttl)
+        self.size += size
+        for table in tables:
+            self._by_table.setdefault(table, set()).add(key)
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Tuple):
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def invalidate_tables(self, tables: Iterable[str]) -> int:
+        """
+        Drop every cached result that reads one of `tables` (named as in SQL,
+        so `users` and `"Users"` differ). Returns how many were dropped.
+        """
+        dropped = 0
+        for table in tables:
+            for key in list(self._by_table.get(table_key(table), ())):
+                self._remove(key)
+                dropped += 1
+        self.invalidations += dropped
+        return dropped
+
+    def clear(self):
+        self._entries.clear()
+        self._by_table.clear()
+        self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
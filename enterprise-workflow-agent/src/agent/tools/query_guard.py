@@ -0,0 +1,121 @@
+import json
+from typing import Any, Dict
+import sqlglot
+from sqlglot import exp
+from sqlalchemy import text
+from src.core.config import settings
+
+class QueryRejected(ValueError):
+    """Raised when agent SQL is not a safe, bounded read."""
+
+# Nodes that write, change schema or run arbitrary commands, anywhere in the tree
+# (this is what catches `WITH x AS (DELETE ... RETURNING *) SELECT ...`)
+_FORBIDDEN_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge,
+    exp.Create, exp.Drop, exp.Alter, exp.Command,
+    exp.Into, exp.Lock,
+)
+
+# Functions that sleep, touch the server filesystem or other sessions
+_FORBIDDEN_FUNCTIONS = {
+    "pg_sleep", "pg_sleep_for", "pg_sleep_until",
+    "pg_terminate_backend", "pg_cancel_backend", "pg_reload_conf",
+    "pg_read_file", "pg_read_binary_file", "pg_ls_dir", "pg_stat_file",
+    "lo_import", "lo_export", "dblink", "dblink_exec", "set_config",
+    "pg_advisory_lock", "pg_advisory_xact_lock",
+}
+
+class QueryGuard:
+    """
+    Cost-bounds agent-generated SQL before it reaches the shared database.
+
+    1. Parse: exactly one read-only SELECT/UNION; no DML/DDL (also inside CTEs),
+       no row locks, no SELECT INTO, no cartesian joins, no dangerous functions.
+    2. Bound: the query is wrapped in an outer LIMIT unless it already has a
+       literal LIMIT within bounds. The original text is kept verbatim so
+       `:name` bind parameters keep working.
+    3. EXPLAIN: plans above DB_QUERY_MAX_PLAN_COST or DB_QUERY_MAX_PLAN_ROWS
+       are rejected without executing the query.
+    """
+
+    def __init__(self, max_cost: float = None, max_plan_rows: int = None, explain: bool = None):
+        self.max_cost = max_cost or settings.DB_QUERY_MAX_PLAN_COST
+        self.max_plan_rows = max_plan_rows or settings.DB_QUERY_MAX_PLAN_ROWS
+        self.explain = settings.DB_QUERY_EXPLAIN_CHECK if explain is None else explain
+
+    def rewrite(self, query: str, limit: int) -> str:
+        """Validate `query` and return it with a LIMIT of at most `limit`."""
+        sql = query.strip().rstrip(";").strip()
+        try:
+            statements = [s for s in sqlglot.parse(sql, read="postgres") if s is not None]
+        except sqlglot.errors.ParseError as e:
+            raise QueryRejected(f"Could not parse query: {e}")
+
+        if len(statements) != 1:
+            raise QueryRejected("Exactly one statement is allowed.")
+        tree = statements[0]
+        if not isinstance(tree, (exp.Select, exp.SetOperation)):
+            raise QueryRejected("Only SELECT queries are allowed.")
+
+        for node in tree.walk():
+            if isinstance(node, _FORBIDDEN_NODES):
+                raise QueryRejected(f"{node.key.upper()} is not allowed in agent queries.")
+            if isinstance(node, exp.Join) and self._is_cartesian(node):
+                raise QueryRejected("Joins must have an ON or USING condition.")
+            if isinstance(node, exp.Func):
+                name = (node.name if isinstance(node, exp.Anonymous) else node.sql_name()).lower()
+                if name in _FORBIDDEN_FUNCTIONS:
+                    raise QueryRejected(f"Function {name}() is not allowed in agent queries.")
+
+        if self._literal_limit(tree) is not None and self._literal_limit(tree) <= limit:
+            return sql
+        # Newlines keep a trailing `--` comment from swallowing the closing paren
+        return f"SELECT * FROM (\n{sql}\n) AS guarded_query LIMIT {int(limit)}"
+
+    @staticmethod
+    def _is_cartesian(join: exp.Join) -> bool:
+        if join.args.get("kind", "").upper() == "CROSS":
+            return True
+        if join.args.get("on") is not None or join.args.get("using"):
+            return False
+        # `LATERAL` and `NATURAL` joins carry their own correlation
+        return not isinstance(join.this, exp.Lateral) and join.args.get("method", "").upper() != "NATURAL"
+
+    @staticmethod
+    def _literal_limit(tree: exp.Expression):
+        limit = tree.args.get("limit")
+        if limit is None:
+            return None
+        value = limit.expression
+        if isinstance(value, exp.Literal) and value.is_int:
+            return int(value.this)
+        return None
+
+    @staticmethod
+    def _plan_nodes(plan: Dict[str, Any]):
+        yield plan
+        for child in plan.get("Plans", ()):
+            yield from QueryGuard._plan_nodes(child)
+
+    async def check_plan(self, session, sql: str, params: Dict[str, Any] = None):
+        """
+        Run EXPLAIN and reject plans above the cost / row-estimate budget.
+
+        The SQL is usually LIMIT-wrapped, and a Limit node caps Plan Rows and
+        scales down Total Cost. So the budget applies to the largest estimate
+        of any node: a sort or aggregate over millions of rows is rejected
+        even if only a few rows come out.
+        """
+        if not self.explain:
+            return
+        result = await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params or {})
+        plan_doc = result.scalar()
+        if isinstance(plan_doc, str):
+            plan_doc = json.loads(plan_doc)
+        nodes = list(self._plan_nodes(plan_doc[0]["Plan"]))
+        cost = max(node.get("Total Cost", 0) for node in nodes)
+        rows = max(node.get("Plan Rows", 0) for node in nodes)
+        if cost > self.max_cost:
+            raise QueryRejected(f"Estimated cost {cost:.0f} exceeds limit {self.max_cost:.0f}.")
+        if rows > self.max_plan_rows:
+            raise QueryRejected(f"Estimated {rows} rows exceeds limit {self.max_plan_rows}.")
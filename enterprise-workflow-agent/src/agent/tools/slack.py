@@ -1,27 +1,28 @@
-from typing import Optional
-# In a real app, we would import slack_sdk
-# from slack_sdk import WebClient
-# from slack_sdk.errors import SlackApiError
 from src.core.config import settings
+from src.core.metrics import timed_tool
+from src.agent.tools.slack_client import SlackClient
 
 class SlackTool:
-    def __init__(self):
+    def __init__(self, client: SlackClient = None):
         self.token = settings.SLACK_BOT_TOKEN
-        # self.client = WebClient(token=self.token) if self.token else None
+        self.client = client or SlackClient(token=self.token)
 
+    @timed_tool("send_message")
     async def send_message(self, channel: str, text: str) -> dict:
         """
         Sends a message to a Slack channel.
+        Waits for the client's rate limiters rather than failing on bursts.
         """
-        if not self.token:
+        if not self.client.token:
             return {"error": "Slack token not configured", "status": "failed"}
-            
+
         try:
-            # response = self.client.chat_postMessage(channel=channel, text=text)
-            # return {"status": "success", "ts": response["ts"]}
-            print(f"[MOCK SLACK] Sending to {channel}: {text}")
-            return {"status": "success", "ts": "1234567890.123456"}
+            response = await self.client.post_message(channel, text)
+            return {"status": "success", "ts": response.get("ts")}
         except Exception as e:
             return {"error": str(e), "status": "failed"}
 
+    async def close(self):
+        await self.client.close()
+
 slack_tool = SlackTool()
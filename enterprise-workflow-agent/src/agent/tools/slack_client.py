@@ -0,0 +1,218 @@
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional, Set, Tuple
+import httpx
+from src.core.config import settings
+from src.core import metrics
+from src.core.rate_limit import TokenBucket
+
+# Methods that must not run twice: after a 5xx or a dropped connection Slack
+# may already have posted, so only 429s and failures to connect are retried
+_NOT_IDEMPOTENT = {"chat.postMessage"}
+# Raised before any byte of the request went out
+_NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+class SlackApiError(Exception):
+    """Slack answered `ok: false`, or the call failed after all retries."""
+
+    def __init__(self, method: str, error: str):
+        super().__init__(f"{method}: {error}")
+        self.method = method
+        self.error = error
+
+class SlackClient:
+    """
+    Async Slack Web API transport shared by all workflows in a process.
+
+    - one pooled httpx client (keep-alive, SLACK_MAX_CONNECTIONS)
+    - token buckets per method and per channel, so bursts wait locally
+      instead of running into Slack's rate tiers
+    - a 429 pauses the method (or, for channel calls, the channel) for
+      Retry-After seconds before the call is retried; 5xx and network errors
+      are retried with exponential backoff, except for chat.postMessage,
+      which is only retried when the request never reached Slack
+    - optional coalescing: messages for one channel that arrive within
+      SLACK_COALESCE_WINDOW_MS are joined into a single chat.postMessage
+    """
+
+    def __init__(self, token: str = None, base_url: str = None, transport: httpx.AsyncBaseTransport = None):
+        self.token = token or settings.SLACK_BOT_TOKEN
+        self.base_url = (base_url or settings.SLACK_API_URL).rstrip("/")
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._method_buckets: Dict[str, TokenBucket] = {}
+        self._channel_buckets: Dict[str, TokenBucket] = {}
+        # Method name or "channel:<id>" -> monotonic time a 429 told us to wait until
+        self._paused_until: Dict[str, float] = {}
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._flushers: Set[asyncio.Task] = set()
+        # Held while a channel's batch is posted, so batches go out one at a time, in order
+        self._flush_locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.token}"},
+                timeout=settings.SLACK_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.SLACK_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.SLACK_MAX_CONNECTIONS,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def close(self):
+        """Send any coalesced messages still waiting, then close the connection pool."""
+        if self._flushers:
+            await asyncio.gather(*self._flushers, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _method_bucket(self, method: str) -> TokenBucket:
+        if method not in self._method_buckets:
+            rate = settings.SLACK_METHOD_RATES.get(method, settings.SLACK_DEFAULT_METHOD_RATE)
+            self._method_buckets[method] = TokenBucket(rate, rate * settings.SLACK_BURST_SECONDS)
+        return self._method_buckets[method]
+
+    def _channel_bucket(self, channel: str) -> TokenBucket:
+        if channel not in self._channel_buckets:
+            rate = settings.SLACK_CHANNEL_RATE
+            self._channel_buckets[channel] = TokenBucket(rate, rate * settings.SLACK_BURST_SECONDS)
+        return self._channel_buckets[channel]
+
+    def _pause_remaining(self, method: str, channel: Optional[str]) -> float:
+        now = time.monotonic()
+        until = self._paused_until.get(method, 0.0)
+        if channel:
+            until = max(until, self._paused_until.get(f"channel:{channel}", 0.0))
+        return until - now
+
+    def _try_acquire(self, method: str, channel: Optional[str]) -> float:
+        """Take a token from every limiter that applies; returns 0, or how long to wait."""
+        wait = self._pause_remaining(method, channel)
+        if wait > 0:
+            return wait
+        channel_bucket = self._channel_bucket(channel) if channel else None
+        if channel_bucket is not None:
+            wait = channel_bucket.take()
+            if wait:
+                return wait
+        wait = self._method_bucket(method).take()
+        if wait and channel_bucket is not None:
+            channel_bucket.refund()
+        return wait
+
+    async def _wait_turn(self, method: str, channel: Optional[str]):
+        start = time.perf_counter()
+        while True:
+            wait = self._try_acquire(method, channel)
+            if not wait:
+                break
+            await asyncio.sleep(wait)
+        metrics.SLACK_THROTTLE_WAIT.labels(method=method).observe(time.perf_counter() - start)
+
+    def _pause(self, method: str, channel: Optional[str], seconds: float):
+        # Channel calls are usually limited per channel; don't stall other channels
+        key = f"channel:{channel}" if channel else method
+        self._paused_until[key] = max(self._paused_until.get(key, 0.0), time.monotonic() + seconds)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> float:
+        try:
+            return max(float(response.headers.get("Retry-After", 1)), 0.0)
+        except ValueError:
+            return 1.0
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def api_call(self, method: str, channel: str = None, **params) -> dict:
+        """
+        Call a Web API method with a JSON body and return Slack's response.
+        `channel` is both sent and used for the per-channel limit.
+        """
+        if channel is not None:
+            params["channel"] = channel
+        for attempt in range(settings.SLACK_MAX_RETRIES + 1):
+            await self._wait_turn(method, channel)
+            try:
+                response = await self.client.post(f"/{method}", json=params)
+            except httpx.TransportError as e:
+                error, delay = f"{type(e).__name__}: {e}", self._backoff(attempt)
+                if method in _NOT_IDEMPOTENT and not isinstance(e, _NOT_SENT):
+                    raise SlackApiError(method, error) from e
+            else:
+                if response.status_code == 429:
+                    delay = self._retry_after(response)
+                    self._pause(method, channel, delay)
+                    metrics.SLACK_RATE_LIMITED.labels(method=method).inc()
+                    error = "ratelimited"
+                elif response.status_code >= 500:
+                    error, delay = f"HTTP {response.status_code}", self._backoff(attempt)
+                    if method in _NOT_IDEMPOTENT:
+                        raise SlackApiError(method, error)
+                else:
+                    response.raise_for_status()
+                    data = response.json()
+                    if not data.get("ok"):
+                        raise SlackApiError(method, data.get("error", "unknown_error"))
+                    return data
+            if attempt < settings.SLACK_MAX_RETRIES:
+                await asyncio.sleep(delay)
+        raise SlackApiError(method, error)
+
+    async def post_message(self, channel: str, text: str) -> dict:
+        """chat.postMessage, coalesced with other messages for the channel if enabled."""
+        if settings.SLACK_COALESCE_WINDOW_MS <= 0:
+            return await self.api_call("chat.postMessage", channel=channel, text=text)
+        future = asyncio.get_running_loop().create_future()
+        if channel not in self._pending:
+            self._pending[channel] = []
+            task = asyncio.create_task(self._flush_channel(channel))
+            self._flushers.add(task)
+            task.add_done_callback(self._flushers.discard)
+        self._pending[channel].append((text, future))
+        return await future
+
+    @staticmethod
+    def _chunks(batch: List[Tuple[str, asyncio.Future]]) -> List[List[Tuple[str, asyncio.Future]]]:
+        """Split a batch so each joined post stays under SLACK_COALESCE_MAX_CHARS."""
+        chunks, current, size = [], [], 0
+        for text, future in batch:
+            if current and size + len(text) + 1 > settings.SLACK_COALESCE_MAX_CHARS:
+                chunks.append(current)
+                current, size = [], 0
+            current.append((text, future))
+            size += len(text) + 1
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _flush_channel(self, channel: str):
+        await asyncio.sleep(settings.SLACK_COALESCE_WINDOW_MS / 1000)
+        # A previous batch may still be posting (throttled or retrying). Wait
+        # for it before taking the pending messages, which keep coalescing
+        # meanwhile; asyncio.Lock wakes waiters in order.
+        async with self._flush_locks.setdefault(channel, asyncio.Lock()):
+            batch = self._pending.pop(channel)
+            # Chunks go out one after another so the channel sees messages in order
+            for chunk in self._chunks(batch):
+                await self._post_chunk(channel, chunk)
+
+    async def _post_chunk(self, channel: str, chunk: List[Tuple[str, asyncio.Future]]):
+        try:
+            result = await self.api_call("chat.postMessage", channel=channel, text="\n".join(t for t, _ in chunk))
+        except Exception as e:
+            for _, future in chunk:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _, future in chunk:
+                if not future.done():
+                    future.set_result(result)
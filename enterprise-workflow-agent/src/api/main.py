@@ -1,15 +1,41 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from src.core.config import settings
-from src.api.routes import ingest
+from src.core import metrics
+from src.core.log import configure_logging, get_logger, shutdown_logging
+from src.services.queue import queue_service
+from src.api.routes import ingest, approvals
+from src.services.group_commit import group_committer
+
+logger = get_logger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    yield
+    # Push events still waiting in a group-commit window
+    await group_committer.close()
+    shutdown_logging()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 app.include_router(ingest.router, prefix=f"{settings.API_V1_STR}/ingest", tags=["ingest"])
+app.include_router(approvals.router, prefix=f"{settings.API_V1_STR}/approvals", tags=["approvals"])
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    try:
+        metrics.QUEUE_DEPTH.set(await queue_service.depth())
+    except Exception as e:
+        logger.warning("Queue depth check failed", extra={"error": str(e)})
+    return Response(content=metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
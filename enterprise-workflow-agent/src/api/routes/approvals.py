@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Query
+from src.schemas.events import ApprovalDecision
+from src.services.approvals import approval_service
+
+router = APIRouter()
+
+@router.get("")
+async def list_pending_approvals(offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    """Workflows waiting for approval, soonest to expire first."""
+    return {
+        "total": await approval_service.count(),
+        "pending": await approval_service.list_pending(offset, limit),
+    }
+
+@router.get("/{workflow_id}")
+async def get_pending_approval(workflow_id: str):
+    approval = await approval_service.get(workflow_id)
+    if approval is None:
+        raise HTTPException(status_code=404, detail="No pending approval for this workflow")
+    return approval
+
+@router.post("/{workflow_id}", status_code=202)
+async def decide_approval(workflow_id: str, decision: ApprovalDecision):
+    """
+    Approve or reject a parked workflow.
+    An approved workflow resumes from its checkpoint on the next free worker.
+    """
+    try:
+        approval = await approval_service.decide(workflow_id, decision.approved, decision.approver, decision.comment)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Failed to queue decision: {e}")
+    if approval is None:
+        raise HTTPException(status_code=404, detail="No pending approval for this workflow (already decided or expired)")
+    return {
+        "status": "approved" if decision.approved else "rejected",
+        "workflow_id": workflow_id,
+        "message": "Decision queued"
+    }
@@ -1,12 +1,59 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException
+from src.core.config import settings
+from src.core.log import get_logger
 from src.schemas.events import IngestEvent, EventSource
-from src.services.queue import queue_service
-from typing import Dict, Any
+from src.services.dedup import dedup_key, event_deduplicator
+from src.services.group_commit import group_committer
+from src.services.admission import admission_controller, AdmissionRejected
+from typing import Dict, Any, List
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
+def _slack_event(payload: Dict[str, Any], priority: str = "normal") -> IngestEvent:
+    """Create a standardized event from a Slack payload"""
+    return IngestEvent(
+        source=EventSource.SLACK,
+        event_type=payload.get("type", "unknown"),
+        payload=payload,
+        request_id=dedup_key(payload),
+        priority=priority
+    )
+
+async def _claim(events: List[IngestEvent]) -> List[IngestEvent]:
+    """Drop events whose id was already accepted. Fails open if Redis is unavailable."""
+    keyed = [event for event in events if event.request_id]
+    if not keyed:
+        return events
+    try:
+        claimed = await event_deduplicator.claim_many([event.request_id for event in keyed])
+    except Exception as e:
+        logger.warning("Dedup check failed, accepting events", extra={"error": str(e)})
+        return events
+    duplicates = {id(event) for event, is_new in zip(keyed, claimed) if not is_new}
+    return [event for event in events if id(event) not in duplicates]
+
+async def _admit(event: IngestEvent, count: int = 1):
+    """429 with Retry-After when the workers are too far behind or the source is over its rate."""
+    try:
+        await admission_controller.admit(event, count)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Event rejected: {e.reason}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def _release(events: List[IngestEvent]):
+    """Un-claim events that failed to queue so Slack's retry is accepted."""
+    try:
+        await event_deduplicator.release([event.request_id for event in events if event.request_id])
+    except Exception as e:
+        logger.warning("Failed to release dedup keys", extra={"error": str(e)})
+
 @router.post("/slack")
-async def ingest_slack_event(payload: Dict[str, Any], background_tasks: BackgroundTasks):
+async def ingest_slack_event(payload: Dict[str, Any]):
     """
     Webhook endpoint for Slack events.
     Verifies the request and pushes it to the event queue.
@@ -17,14 +64,48 @@ async def ingest_slack_event(payload: Dict[str, Any], background_tasks: Backgrou
     if "type" in payload and payload["type"] == "url_verification":
         return {"challenge": payload["challenge"]}
 
-    # Create a standardized event
-    event = IngestEvent(
-        source=EventSource.SLACK,
-        event_type=payload.get("type", "unknown"),
-        payload=payload
-    )
+    event = _slack_event(payload)
+
+    # Before the dedup claim, so a rejected event's retry isn't taken for a duplicate
+    await _admit(event)
+
+    # Slack re-delivers on slow acks; acknowledge duplicates without queueing them
+    if not await _claim([event]):
+        return {"status": "duplicate", "message": "Event already accepted"}
     
-    # Push to queue in background to keep response fast
-    background_tasks.add_task(queue_service.push_event, event)
+    # Group-committed with concurrent requests; only acknowledge once it is queued
+    try:
+        await group_committer.submit(event)
+    except Exception as e:
+        await _release([event])
+        raise HTTPException(status_code=503, detail=f"Failed to queue event: {e}")
     
     return {"status": "accepted", "message": "Event queued for processing"}
+
+@router.post("/slack/batch")
+async def ingest_slack_events(payloads: List[Dict[str, Any]]):
+    """
+    Bulk endpoint: queues many Slack events in one request.
+    URL verification challenges are not valid here. Events are queued with
+    "bulk" priority so backfills don't delay interactive traffic.
+    """
+    if len(payloads) > settings.INGEST_MAX_BULK_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.INGEST_MAX_BULK_EVENTS} events per batch")
+
+    events = [_slack_event(payload, priority="bulk") for payload in payloads if payload.get("type") != "url_verification"]
+    if events:
+        # All or nothing: the batch is admitted as one request
+        await _admit(events[0], len(events))
+    new_events = await _claim(events)
+    try:
+        await group_committer.submit_many(new_events)
+    except Exception as e:
+        await _release(new_events)
+        raise HTTPException(status_code=503, detail=f"Failed to queue events: {e}")
+
+    return {
+        "status": "accepted",
+        "accepted": len(new_events),
+        "duplicates": len(events) - len(new_events),
+        "message": "Events queued for processing"
+    }
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Enterprise Workflow Agent"
@@ -13,20 +13,177 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "workflow_agent"
     POSTGRES_PORT: str = "5432"
+    # Optional read replica for agent queries; defaults to the primary
+    POSTGRES_READ_SERVER: Optional[str] = None
+    POSTGRES_READ_PORT: Optional[str] = None
+
+    # Connection pools (the read pool is separate so agent reads can't starve audit writes)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_READ_POOL_SIZE: int = 10
+    DB_READ_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # DBQueryTool: results are streamed from a server-side cursor and capped
+    DB_QUERY_MAX_ROWS: int = 10_000
+    DB_QUERY_MAX_BYTES: int = 16 * 1024 * 1024
+    DB_QUERY_FETCH_SIZE: int = 1000
+    # Query guard: agent SQL is parsed, LIMIT-clamped and EXPLAIN-checked before it runs
+    DB_QUERY_EXPLAIN_CHECK: bool = True
+    DB_QUERY_MAX_PLAN_COST: float = 1_000_000.0
+    DB_QUERY_MAX_PLAN_ROWS: int = 1_000_000
+    DB_QUERY_STATEMENT_TIMEOUT_MS: int = 5000
+    # Read-through result cache in front of DBQueryTool (0 TTL disables it)
+    DB_QUERY_CACHE_TTL_SECONDS: float = 30.0
+    DB_QUERY_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
     
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def SQLALCHEMY_READ_DATABASE_URI(self) -> str:
+        server = self.POSTGRES_READ_SERVER or self.POSTGRES_SERVER
+        port = self.POSTGRES_READ_PORT or self.POSTGRES_PORT
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{server}:{port}/{self.POSTGRES_DB}"
+
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     REDIS_QUEUE_NAME: str = "workflow_events"
+    QUEUE_BATCH_SIZE: int = 16
+    QUEUE_BLOCK_TIMEOUT_SECONDS: float = 1.0
+    # Wire format for new events: "json" or "msgpack" (compact, binary). Workers of
+    # this version read both, older ones only JSON: switch writers to "msgpack"
+    # once every worker has been upgraded.
+    QUEUE_WIRE_FORMAT: str = "json"
+    QUEUE_WIRE_COMPRESS_MIN_BYTES: int = 1024
+    # Sharding: events are split across QUEUE_SHARDS queues by QUEUE_SHARD_KEY
+    # ("thread", "channel", "source" or "none"), one worker process per shard.
+    # Events with the same key are processed one at a time, in arrival order.
+    QUEUE_SHARDS: int = 1
+    QUEUE_SHARD_KEY: str = "thread"
+    QUEUE_SHARD_REPLICAS: int = 64
+    # Weighted fair scheduling: one queue per lane ("source" or "source:priority"),
+    # popped in proportion to these weights. Unlisted traffic uses the "default"
+    # lane at QUEUE_DEFAULT_LANE_WEIGHT. An empty mapping keeps a single queue.
+    QUEUE_LANE_WEIGHTS: Dict[str, int] = {"slack": 8, "slack:bulk": 2, "jira": 4, "email": 1}
+    QUEUE_DEFAULT_LANE_WEIGHT: int = 1
+    # Lane for "urgent" events (approval resumes), whatever their source
+    QUEUE_URGENT_LANE_WEIGHT: int = 64
+    # Failed events are retried with exponential backoff from a Redis sorted set
+    # (scored by due time), then moved to the dead-letter list
+    RETRY_MAX_ATTEMPTS: int = 5
+    RETRY_BASE_DELAY_SECONDS: float = 2.0
+    RETRY_MAX_DELAY_SECONDS: float = 300.0
+    RETRY_POLL_INTERVAL_SECONDS: float = 1.0
+    REDIS_RETRY_KEY: str = "workflow_events:retry"
+    REDIS_DLQ_KEY: str = "workflow_events:dlq"
+    # Workflows parked at an approval interrupt; undecided ones expire after the TTL
+    REDIS_APPROVALS_KEY: str = "workflow:approvals"
+    APPROVAL_TTL_SECONDS: float = 24 * 3600
+    APPROVAL_EXPIRY_POLL_SECONDS: float = 5.0
+
+    # Queue backend: "list" (single consumer) or "stream" (consumer groups with acks)
+    QUEUE_BACKEND: str = "list"
+    REDIS_STREAM_NAME: str = "workflow_events_stream"
+    REDIS_STREAM_GROUP: str = "workflow_workers"
+    REDIS_STREAM_CONSUMER: Optional[str] = None
+    REDIS_STREAM_MAXLEN: int = 100_000
+    REDIS_STREAM_CLAIM_IDLE_MS: int = 60_000
+    REDIS_STREAM_CLAIM_INTERVAL_SECONDS: float = 15.0
+
+    # Ingest: events from concurrent requests are pushed to Redis together
+    INGEST_GROUP_COMMIT_WINDOW_MS: float = 2.0
+    INGEST_GROUP_COMMIT_MAX_BATCH: int = 256
+    INGEST_MAX_BULK_EVENTS: int = 1000
+    # Dedup of Slack retries / duplicate deliveries, keyed on event_id or request_id
+    INGEST_DEDUP_TTL_SECONDS: int = 3600
+    INGEST_DEDUP_LOCAL_SIZE: int = 10_000
+    INGEST_DEDUP_KEY_PREFIX: str = "ingest:seen"
+    # Admission control: 429 + Retry-After instead of queueing work that will miss its SLA.
+    # Per-source rates (events/second, "source" or "source:priority"); empty = unlimited
+    INGEST_SOURCE_RATES: Dict[str, float] = {}
+    INGEST_SOURCE_BURST_SECONDS: float = 2.0
+    # Shed policy by queue depth: "bulk_first", "reject" or "off" (see AdmissionController)
+    INGEST_SHED_POLICY: str = "bulk_first"
+    INGEST_SHED_DEPTH: int = 5_000
+    INGEST_MAX_QUEUE_DEPTH: int = 20_000
+    INGEST_DEPTH_CACHE_SECONDS: float = 1.0
+    INGEST_OVERLOAD_RETRY_AFTER_SECONDS: float = 5.0
+
+    # Checkpointing: "postgres" (durable, shared by all workers) or "memory" (local dev)
+    CHECKPOINT_BACKEND: str = "postgres"
+    CHECKPOINT_COMPRESS_MIN_BYTES: int = 1024
+    CHECKPOINT_PRUNE_ON_COMPLETE: bool = True
+    # Context values of at least CONTEXT_BLOB_MIN_BYTES are stored out of band and
+    # referenced from state; backend "postgres" or "local" (files under CONTEXT_BLOB_DIR)
+    CONTEXT_BLOB_BACKEND: str = "postgres"
+    CONTEXT_BLOB_DIR: str = "./data/blobs"
+    CONTEXT_BLOB_MIN_BYTES: int = 16 * 1024
+    # Blobs older than this are deleted; must outlive APPROVAL_TTL_SECONDS
+    CONTEXT_BLOB_RETENTION_SECONDS: float = 7 * 24 * 3600
+    CONTEXT_BLOB_GC_INTERVAL_SECONDS: float = 3600
+
+    # Analysis of query results (src/agent/tools/analysis.py)
+    ANALYSIS_OUTLIER_THRESHOLD: float = 3.5  # robust z-score
+    ANALYSIS_MIN_CORRELATION: float = 0.8
+    ANALYSIS_TOP_K: int = 5
+    ANALYSIS_MAX_GROUPS: int = 50
+
+    # Audit: buffered write-behind to Postgres
+    AUDIT_BUFFER_MAX_ENTRIES: int = 10_000
+    AUDIT_FLUSH_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 0.5
+    # What to do when a flush fails: "retry" re-buffers the batch, "drop" discards it
+    AUDIT_FLUSH_FAILURE_POLICY: str = "retry"
+    # Delay before the next flush after consecutive failures, doubling up to the max
+    AUDIT_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    AUDIT_RETRY_MAX_DELAY_SECONDS: float = 30.0
+    # What to do when the buffer is full: "block" waits for a flush, "drop_oldest" evicts
+    AUDIT_OVERFLOW_POLICY: str = "block"
+
+    # Logging: records go through a bounded queue to a writer thread (see src/core/log.py)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # or "text"
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_MAX_FIELD_CHARS: int = 512
+    # Fraction of records kept per level, sampled per workflow; WARNING and above are always kept
+    LOG_SAMPLE_RATES: Dict[str, float] = {"DEBUG": 0.05, "INFO": 1.0}
+
+    # Worker
+    WORKER_MAX_CONCURRENCY: int = 32
+    WORKER_DRAIN_TIMEOUT_SECONDS: float = 30.0
+    # Popped events waiting for an earlier event with the same ordering key; the
+    # worker stops popping while this many are waiting
+    WORKER_MAX_WAITING_EVENTS: int = 1000
+    # Shard this process consumes; unset with QUEUE_SHARDS > 1 starts one process per shard
+    WORKER_SHARD: Optional[int] = None
+    # Prometheus exporter for the worker process (0 disables it); shard N listens on port + N
+    WORKER_METRICS_PORT: int = 9100
+    METRICS_QUEUE_DEPTH_INTERVAL_SECONDS: float = 5.0
 
     # External APIs
     SLACK_BOT_TOKEN: Optional[str] = None
     SLACK_SIGNING_SECRET: Optional[str] = None
+    # Slack Web API transport; point SLACK_API_URL at a stub server for local testing
+    # (python -m benchmarks.slack_stub)
+    SLACK_API_URL: str = "https://slack.com/api"
+    SLACK_TIMEOUT_SECONDS: float = 10.0
+    SLACK_MAX_CONNECTIONS: int = 20
+    SLACK_MAX_RETRIES: int = 3
+    # Client-side limits (calls/second) so bursts wait locally instead of drawing 429s:
+    # per method (unlisted methods get SLACK_DEFAULT_METHOD_RATE, about Tier 3) and per channel
+    SLACK_METHOD_RATES: Dict[str, float] = {"chat.postMessage": 5.0}
+    SLACK_DEFAULT_METHOD_RATE: float = 50 / 60
+    SLACK_CHANNEL_RATE: float = 1.0
+    SLACK_BURST_SECONDS: float = 3.0
+    # Messages for one channel within this window are joined into one post (0 disables)
+    SLACK_COALESCE_WINDOW_MS: float = 0
+    SLACK_COALESCE_MAX_CHARS: int = 4000
     JIRA_URL: Optional[str] = None
     JIRA_API_TOKEN: Optional[str] = None
 
@@ -1,22 +1,116 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import time
+from typing import Any, Dict
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from src.core.config import settings
 
-engine = create_async_engine(
+class PoolMetrics:
+    """Checkout wait statistics for one engine's connection pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waiters = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def observe_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self, engine: AsyncEngine) -> Dict[str, Any]:
+        pool = engine.sync_engine.pool
+        return {
+            "pool": self.name,
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "waiters": self.waiters,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_avg": self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+def _instrumented_pool(metrics: PoolMetrics):
+    # Pools are re-created from their class on dispose(), so metrics live in the closure
+    class InstrumentedPool(AsyncAdaptedQueuePool):
+        def _do_get(self):
+            metrics.waiters += 1
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except PoolTimeoutError:
+                metrics.timeouts += 1
+                raise
+            finally:
+                metrics.waiters -= 1
+                metrics.observe_wait(time.perf_counter() - start)
+    return InstrumentedPool
+
+def create_engine_with_metrics(url: str, name: str, pool_size: int, max_overflow: int, **kwargs):
+    metrics = PoolMetrics(name)
+    new_engine = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=_instrumented_pool(metrics),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        **kwargs,
+    )
+    return new_engine, metrics
+
+# Primary: audit writes, checkpoints
+engine, primary_pool_metrics = create_engine_with_metrics(
     settings.SQLALCHEMY_DATABASE_URI,
-    echo=False,
-    future=True,
+    "primary",
+    settings.DB_POOL_SIZE,
+    settings.DB_MAX_OVERFLOW,
+)
+
+# Read-only: agent queries (DBQueryTool). Points at the replica if one is configured
+read_engine, read_pool_metrics = create_engine_with_metrics(
+    settings.SQLALCHEMY_READ_DATABASE_URI,
+    "read",
+    settings.DB_READ_POOL_SIZE,
+    settings.DB_READ_MAX_OVERFLOW,
+    execution_options={"postgresql_readonly": True},
 )
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+ReadSessionLocal = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 Base = declarative_base()
 
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        "primary": primary_pool_metrics.snapshot(engine),
+        "read": read_pool_metrics.snapshot(read_engine),
+    }
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
             await session.close()
+
+async def init_db():
+    """Create any missing tables (checkpoints, audit log)."""
+    import src.core.models  # noqa: F401 - registers tables on Base.metadata
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,161 @@
+"""
+Structured, non-blocking logging.
+
+A log call on the event loop only resolves the (truncated) message and puts
+the record on a bounded in-memory queue; a QueueListener thread formats it
+as JSON (or text) and writes it to stdout. When the queue is full, records
+are dropped and counted in `log_records_dropped`, so a burst of events can
+slow logging down but never the loop.
+
+Use `get_logger(__name__)` in modules and `correlate(workflow_id=...)` around
+work for one workflow: every record logged inside the block, including from
+tasks it starts, carries those ids. Volume is bounded by LOG_SAMPLE_RATES:
+levels below WARNING can be sampled, and records with a workflow_id are
+sampled per workflow, so a kept workflow keeps its whole trace.
+"""
+import atexit
+import contextlib
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from src.core.config import settings
+from src.core import metrics
+
+# Namespace configured here; third-party loggers (uvicorn, httpx, ...) are left alone
+_ROOT_LOGGER = "src"
+# Attributes every LogRecord has; anything else on a record is a structured field
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_correlation: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_correlation", default={})
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+@contextlib.contextmanager
+def correlate(**ids):
+    """Attach ids (workflow_id, request_id, ...) to everything logged inside the block."""
+    token = _correlation.set({**_correlation.get(), **{k: v for k, v in ids.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _correlation.reset(token)
+
+def _truncate(value: str, limit: int = None) -> str:
+    limit = limit or settings.LOG_MAX_FIELD_CHARS
+    if len(value) <= limit:
+        return value
+    return f"{value[:limit]}...[{len(value) - limit} more chars]"
+
+def _fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS and not k.startswith("_")}
+
+class _CorrelationFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _correlation.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class _SamplingFilter(logging.Filter):
+    """Keeps a LOG_SAMPLE_RATES fraction of records per level; WARNING and above always pass."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.levelname, 1.0)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        workflow_id = getattr(record, "workflow_id", None)
+        if workflow_id:
+            return zlib.crc32(str(workflow_id).encode()) % 10_000 < rate * 10_000
+        return random.random() < rate
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Runs on the caller's thread: pin down the message now (its args may
+        # change later) but leave formatting and I/O to the listener thread
+        record = copy.copy(record)
+        record.msg = _truncate(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _truncate(logging.Formatter().formatException(record.exc_info), settings.LOG_MAX_FIELD_CHARS * 8)
+            record.exc_info = None
+        for key, value in _fields(record).items():
+            if not isinstance(value, (int, float, bool, type(None))):
+                setattr(record, key, _truncate(str(value)))
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.LOG_DROPPED.labels(level=record.levelname).inc()
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full at shutdown; wait for room instead of failing
+        self.queue.put(self._sentinel)
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(f"{k}={v}" for k, v in _fields(record).items())
+        return f"{line} {fields}" if fields else line
+
+def configure_logging():
+    """Install the queue handler and start its writer thread (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+    handler = _BoundedQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    handler.addFilter(_CorrelationFilter())
+    handler.addFilter(_SamplingFilter(settings.LOG_SAMPLE_RATES))
+
+    logger = logging.getLogger(_ROOT_LOGGER)
+    logger.handlers = [handler]
+    logger.setLevel(settings.LOG_LEVEL)
+    logger.propagate = False
+
+    _listener = _Listener(handler.queue, output)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
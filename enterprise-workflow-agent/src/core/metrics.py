@@ -0,0 +1,121 @@
+import functools
+import time
+from datetime import datetime
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest, start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+
+# Latency buckets from sub-millisecond node hops up to slow multi-step workflows
+_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+QUEUE_DEPTH = Gauge("workflow_queue_depth", "Events waiting in the Redis queue")
+WORKFLOWS_IN_FLIGHT = Gauge("workflow_in_flight", "Workflows currently running in this worker")
+WORKFLOWS_TOTAL = Counter("workflows", "Workflows finished, by outcome", ["outcome"])
+INGEST_REJECTED = Counter("ingest_rejected", "Events refused by admission control", ["source", "reason"])
+QUEUE_WAIT_LATENCY = Histogram(
+    "workflow_queue_wait_seconds",
+    "Time from IngestEvent.timestamp until a worker starts the workflow",
+    ["source"],
+    buckets=_LATENCY_BUCKETS,
+)
+END_TO_END_LATENCY = Histogram(
+    "workflow_end_to_end_seconds",
+    "Time from IngestEvent.timestamp until the workflow completes or parks for approval",
+    ["source"],
+    buckets=_LATENCY_BUCKETS,
+)
+APPROVAL_RESUME_LATENCY = Histogram(
+    "workflow_approval_resume_seconds",
+    "Time from an approval decision until the resumed workflow stops again",
+    buckets=_LATENCY_BUCKETS,
+)
+NODE_LATENCY = Histogram("workflow_node_seconds", "Graph node latency", ["node"], buckets=_LATENCY_BUCKETS)
+TOOL_LATENCY = Histogram("workflow_tool_seconds", "Tool call latency", ["tool"], buckets=_LATENCY_BUCKETS)
+LOG_DROPPED = Counter("log_records_dropped", "Log records dropped because the log queue was full", ["level"])
+SLACK_RATE_LIMITED = Counter("slack_rate_limited", "Slack API calls answered with 429, by method", ["method"])
+SLACK_THROTTLE_WAIT = Histogram(
+    "slack_throttle_wait_seconds",
+    "Time Slack calls waited for the client-side rate limiters",
+    ["method"],
+    buckets=_LATENCY_BUCKETS,
+)
+
+def _age(event_timestamp: datetime) -> float:
+    # IngestEvent timestamps are naive local time (datetime.now)
+    now = datetime.now(event_timestamp.tzinfo) if event_timestamp.tzinfo else datetime.now()
+    return max((now - event_timestamp).total_seconds(), 0.0)
+
+def observe_queue_wait(event_timestamp: datetime, source: str):
+    QUEUE_WAIT_LATENCY.labels(source=source).observe(_age(event_timestamp))
+
+def observe_end_to_end(event_timestamp: datetime, source: str):
+    END_TO_END_LATENCY.labels(source=source).observe(_age(event_timestamp))
+
+def observe_approval_resume(decided_at: datetime):
+    APPROVAL_RESUME_LATENCY.observe(_age(decided_at))
+
+def timed_node(name: str, node):
+    """Wrap a graph node so its latency lands in workflow_node_seconds{node=name}."""
+    histogram = NODE_LATENCY.labels(node=name)
+
+    # functools.wraps keeps the node's signature, so LangGraph still passes
+    # `config` to nodes that declare it
+    @functools.wraps(node)
+    async def wrapper(state, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await node(state, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+    return wrapper
+
+def timed_tool(name: str):
+    """Decorator for async tool methods, recorded in workflow_tool_seconds{tool=name}."""
+    histogram = TOOL_LATENCY.labels(tool=name)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+class _ServiceStatsCollector:
+    """Exports DB pool and query-cache stats, read at scrape time."""
+
+    def describe(self):
+        # Without this, REGISTRY.register() calls collect() at import time,
+        # which imports the DB and tool modules (and they import this one)
+        return []
+
+    def collect(self):
+        from src.core.database import pool_stats
+        from src.agent.tools.db_query import db_query_tool
+
+        pool_families = {
+            key: GaugeMetricFamily(f"db_pool_{key}", f"DB connection pool {key.replace('_', ' ')}", labels=["pool"])
+            for key in ("size", "checked_out", "overflow", "waiters", "wait_seconds_avg", "wait_seconds_max")
+        }
+        pool_families.update({
+            key: CounterMetricFamily(f"db_pool_{key}", f"DB connection pool {key}", labels=["pool"])
+            for key in ("checkouts", "timeouts")
+        })
+        for name, stats in pool_stats().items():
+            for key, family in pool_families.items():
+                family.add_metric([name], stats[key])
+        yield from pool_families.values()
+
+        cache_stats = db_query_tool.cache.stats()
+        for key in ("entries", "bytes"):
+            yield GaugeMetricFamily(f"db_query_cache_{key}", f"DBQueryTool result cache {key}", value=cache_stats[key])
+        # Running totals: export as counters so rate() works on them
+        for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+            yield CounterMetricFamily(f"db_query_cache_{key}", f"DBQueryTool result cache {key}", value=cache_stats[key])
+
+REGISTRY.register(_ServiceStatsCollector())
+
+def render_latest() -> bytes:
+    return generate_latest(REGISTRY)
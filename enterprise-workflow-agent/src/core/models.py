@@ -0,0 +1,71 @@
+from sqlalchemy import Table, Column, String, Integer, BigInteger, LargeBinary, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
+from src.core.database import Base
+
+# LangGraph checkpoints. Channel values live in `checkpoint_blobs`, keyed by
+# (channel, version), so each step only writes the channels it changed.
+checkpoints_table = Table(
+    "checkpoints",
+    Base.metadata,
+    Column("thread_id", String, primary_key=True),
+    Column("checkpoint_ns", String, primary_key=True, default=""),
+    Column("checkpoint_id", String, primary_key=True),
+    Column("parent_checkpoint_id", String, nullable=True),
+    Column("type", String, nullable=False),
+    Column("checkpoint", LargeBinary, nullable=False),
+    Column("metadata_type", String, nullable=False),
+    Column("metadata", LargeBinary, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+checkpoint_blobs_table = Table(
+    "checkpoint_blobs",
+    Base.metadata,
+    Column("thread_id", String, primary_key=True),
+    Column("checkpoint_ns", String, primary_key=True, default=""),
+    Column("channel", String, primary_key=True),
+    Column("version", String, primary_key=True),
+    Column("type", String, nullable=False),
+    Column("blob", LargeBinary, nullable=True),
+)
+
+checkpoint_writes_table = Table(
+    "checkpoint_writes",
+    Base.metadata,
+    Column("thread_id", String, primary_key=True),
+    Column("checkpoint_ns", String, primary_key=True, default=""),
+    Column("checkpoint_id", String, primary_key=True),
+    Column("task_id", String, primary_key=True),
+    Column("idx", Integer, primary_key=True),
+    Column("channel", String, nullable=False),
+    Column("type", String, nullable=False),
+    Column("blob", LargeBinary, nullable=False),
+    Column("task_path", String, nullable=False, default=""),
+)
+
+Index("ix_checkpoints_created_at", checkpoints_table.c.created_at)
+
+# Append-only audit log, written in batches by AuditService
+audit_logs_table = Table(
+    "audit_logs",
+    Base.metadata,
+    Column("id", BigInteger, primary_key=True, autoincrement=True),
+    Column("workflow_id", String, nullable=False, index=True),
+    Column("agent_name", String, nullable=False),
+    Column("tool_name", String, nullable=False),
+    Column("tool_input", JSONB, nullable=False),
+    Column("outcome", String, nullable=False),
+    Column("authorized_by", String, nullable=True),
+    Column("timestamp", DateTime(timezone=True), nullable=False),
+)
+
+# Large workflow context values, stored once per content hash (see blob_store.py)
+context_blobs_table = Table(
+    "context_blobs",
+    Base.metadata,
+    Column("digest", String, primary_key=True),
+    Column("data", LargeBinary, nullable=False),
+    Column("size", BigInteger, nullable=False),
+    # Refreshed whenever the same content is stored again; drives retention
+    Column("last_used_at", DateTime(timezone=True), server_default=func.now(), nullable=False, index=True),
+)
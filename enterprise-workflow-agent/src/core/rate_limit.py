@@ -0,0 +1,32 @@
+import time
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, count: int = 1) -> float:
+        """
+        Take `count` tokens. Returns 0 on success, otherwise the seconds until
+        they would be available.
+
+        A request larger than the burst is let through once the bucket is full
+        and leaves it in debt, so big batches are slowed down rather than
+        refused forever.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = min(count, self.burst)
+        if self.tokens >= needed:
+            self.tokens -= count
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def refund(self, count: int = 1):
+        """Give back tokens taken for a call that didn't happen."""
+        self.tokens = min(self.burst, self.tokens + count)
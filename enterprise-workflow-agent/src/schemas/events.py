@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -16,9 +16,46 @@ class WorkflowStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+class AgentAction(BaseModel):
+    agent_name: str
+    tool_name: str
+    tool_input: Dict[str, Any]
+    timestamp: datetime = Field(default_factory=datetime.now)
+
+class AuditLogEntry(BaseModel):
+    workflow_id: str
+    action: AgentAction
+    outcome: str
+    authorized_by: Optional[str]
+
+# Priority of events that jump the queue: the head of a list queue, or the urgent lane
+URGENT_PRIORITY = "urgent"
+
 class IngestEvent(BaseModel):
     source: EventSource
     event_type: str
     payload: Dict[str, Any]
     timestamp: datetime = Field(default_factory=datetime.now)
     request_id: Optional[str] = None
+    # Scheduling class within the source, e.g. "bulk" for backfills (see QUEUE_LANE_WEIGHTS),
+    # or URGENT_PRIORITY for internal events that must not wait behind the backlog
+    priority: str = "normal"
+    # Failed processing attempts so far (see RetryService)
+    attempts: int = 0
+
+    # Queue-backend receipt (e.g. Redis stream entry id) used to ack the event; never serialized
+    _delivery_id: Optional[str] = PrivateAttr(default=None)
+
+class PendingApproval(BaseModel):
+    """A workflow parked before a step that needs human approval."""
+    workflow_id: str
+    source: EventSource
+    request: str
+    pending_nodes: List[str]
+    parked_at: datetime
+    expires_at: datetime
+
+class ApprovalDecision(BaseModel):
+    approved: bool
+    approver: str
+    comment: Optional[str] = None
@@ -0,0 +1,100 @@
+import asyncio
+import math
+import time
+from typing import Dict
+from src.core.config import settings
+from src.core import metrics
+from src.core.log import get_logger
+from src.core.rate_limit import TokenBucket
+from src.schemas.events import IngestEvent
+from src.services.queue import queue_service
+
+logger = get_logger(__name__)
+
+class AdmissionRejected(Exception):
+    """Raised when an event is refused; the API turns it into 429 + Retry-After."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class AdmissionController:
+    """
+    Decides whether the ingest API may queue more events.
+
+    Two checks, both local to this API process:
+
+      rate   per-source token buckets (INGEST_SOURCE_RATES, events/second)
+      depth  the queue backlog, read from Redis at most every
+             INGEST_DEPTH_CACHE_SECONDS and shed per INGEST_SHED_POLICY:
+               "reject"      refuse everything above INGEST_MAX_QUEUE_DEPTH
+               "bulk_first"  refuse "bulk" priority above INGEST_SHED_DEPTH,
+                             everything above INGEST_MAX_QUEUE_DEPTH
+               "off"         no depth limit
+
+    Both fail open: if Redis can't report a depth, events are admitted.
+    """
+
+    def __init__(self, queue=None, rates: Dict[str, float] = None, shed_policy: str = None):
+        self.queue = queue or queue_service
+        self.rates = settings.INGEST_SOURCE_RATES if rates is None else rates
+        self.shed_policy = shed_policy or settings.INGEST_SHED_POLICY
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._depth = 0
+        self._depth_at = float("-inf")
+        self._refresh: asyncio.Task | None = None
+
+    def _bucket(self, event: IngestEvent) -> TokenBucket | None:
+        source = event.source.value
+        for key in (f"{source}:{event.priority}", source):
+            if key in self.rates:
+                if key not in self._buckets:
+                    rate = self.rates[key]
+                    self._buckets[key] = TokenBucket(rate, rate * settings.INGEST_SOURCE_BURST_SECONDS)
+                return self._buckets[key]
+        return None
+
+    async def _fetch_depth(self):
+        try:
+            self._depth = await self.queue.depth()
+        except Exception as e:
+            logger.warning("Queue depth check failed, admitting", extra={"error": str(e)})
+            self._depth = 0
+        self._depth_at = time.monotonic()
+
+    async def queue_depth(self) -> int:
+        """Backlog size, refreshed at most every INGEST_DEPTH_CACHE_SECONDS by one request."""
+        if time.monotonic() - self._depth_at >= settings.INGEST_DEPTH_CACHE_SECONDS:
+            if self._refresh is None or self._refresh.done():
+                self._refresh = asyncio.create_task(self._fetch_depth())
+            await asyncio.shield(self._refresh)
+        return self._depth
+
+    async def _check_depth(self, event: IngestEvent):
+        if self.shed_policy == "off" or not settings.INGEST_MAX_QUEUE_DEPTH:
+            return
+        depth = await self.queue_depth()
+        limit = settings.INGEST_MAX_QUEUE_DEPTH
+        if self.shed_policy == "bulk_first" and event.priority == "bulk":
+            limit = min(limit, settings.INGEST_SHED_DEPTH)
+        if depth >= limit:
+            raise AdmissionRejected("queue_full", settings.INGEST_OVERLOAD_RETRY_AFTER_SECONDS)
+
+    async def admit(self, event: IngestEvent, count: int = 1):
+        """
+        Raise AdmissionRejected unless `event` (standing for `count` events of
+        the same source and priority) may be queued now.
+        """
+        try:
+            await self._check_depth(event)
+            bucket = self._bucket(event)
+            if bucket is not None:
+                wait = bucket.take(count)
+                if wait:
+                    raise AdmissionRejected("rate_limited", wait)
+        except AdmissionRejected as e:
+            metrics.INGEST_REJECTED.labels(source=event.source.value, reason=e.reason).inc(count)
+            raise
+
+admission_controller = AdmissionController()
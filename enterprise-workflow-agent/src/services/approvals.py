@@ -0,0 +1,129 @@
+import time
+from datetime import datetime
+from typing import List, Optional
+import redis.asyncio as redis
+from src.core.config import settings
+from src.schemas.events import IngestEvent, PendingApproval, URGENT_PRIORITY
+from src.services.queue import queue_service
+
+# event_type of the queue event that tells a worker to finish a parked workflow
+RESUME_EVENT_TYPE = "workflow_resume"
+
+class ApprovalService:
+    """
+    Index of workflows parked at an approval interrupt.
+
+    A parked workflow is just its checkpoint plus one sorted-set member
+    (scored by expiry time) and one hash field with its summary, so thousands
+    can wait without holding anything in a worker. Deciding an approval
+    removes it from the index atomically, so each workflow is resumed,
+    rejected or expired exactly once, and queues an urgent resume event
+    (ahead of new work) for the workers, which continue the run from its
+    checkpoint.
+    """
+
+    def __init__(self, client: redis.Redis = None, queue=None, ttl: float = None):
+        self.queue = queue or queue_service
+        self.redis = client or self.queue.redis
+        self.ttl = ttl or settings.APPROVAL_TTL_SECONDS
+        self.index_key = f"{settings.REDIS_APPROVALS_KEY}:expiry"
+        self.details_key = f"{settings.REDIS_APPROVALS_KEY}:details"
+
+    async def park(self, workflow_id: str, event: IngestEvent, request: str, pending_nodes: List[str]):
+        """Record a workflow that is waiting for approval."""
+        now = time.time()
+        approval = PendingApproval(
+            workflow_id=workflow_id,
+            source=event.source,
+            request=request,
+            pending_nodes=pending_nodes,
+            parked_at=datetime.fromtimestamp(now),
+            expires_at=datetime.fromtimestamp(now + self.ttl),
+        )
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.details_key, workflow_id, approval.model_dump_json())
+            pipe.zadd(self.index_key, {workflow_id: now + self.ttl})
+            await pipe.execute()
+
+    async def get(self, workflow_id: str) -> Optional[PendingApproval]:
+        data = await self.redis.hget(self.details_key, workflow_id)
+        return PendingApproval.model_validate_json(data) if data else None
+
+    async def list_pending(self, offset: int = 0, limit: int = 50) -> List[PendingApproval]:
+        """Pending approvals, soonest to expire first."""
+        ids = await self.redis.zrange(self.index_key, offset, offset + limit - 1)
+        if not ids:
+            return []
+        details = await self.redis.hmget(self.details_key, ids)
+        return [PendingApproval.model_validate_json(data) for data in details if data]
+
+    async def count(self) -> int:
+        return await self.redis.zcard(self.index_key)
+
+    async def _claim(self, workflow_id: str) -> Optional[PendingApproval]:
+        """Remove a workflow from the index; returns its summary only for the caller that removed it."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.index_key, workflow_id)
+            pipe.hget(self.details_key, workflow_id)
+            pipe.hdel(self.details_key, workflow_id)
+            removed, data, _ = await pipe.execute()
+        if not removed or not data:
+            return None
+        return PendingApproval.model_validate_json(data)
+
+    def _resume_event(self, approval: PendingApproval, decision: str, decided_by: Optional[str], comment: Optional[str]) -> IngestEvent:
+        return IngestEvent(
+            source=approval.source,
+            event_type=RESUME_EVENT_TYPE,
+            payload={
+                "workflow_id": approval.workflow_id,
+                "decision": decision,
+                "decided_by": decided_by,
+                "comment": comment,
+            },
+            request_id=f"{RESUME_EVENT_TYPE}:{approval.workflow_id}",
+            # The approver is waiting on this; don't queue it behind new work
+            priority=URGENT_PRIORITY,
+        )
+
+    async def decide(self, workflow_id: str, approved: bool, decided_by: str, comment: str = None) -> Optional[PendingApproval]:
+        """
+        Approve or reject a parked workflow. Returns None if it isn't pending
+        (unknown, already decided or expired).
+        """
+        approval = await self._claim(workflow_id)
+        if approval is None:
+            return None
+        decision = "approved" if approved else "rejected"
+        try:
+            await self.queue.push_event(self._resume_event(approval, decision, decided_by, comment))
+        except Exception:
+            # Put it back so the approver can try again
+            await self.park_again(approval)
+            raise
+        return approval
+
+    async def park_again(self, approval: PendingApproval):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.details_key, approval.workflow_id, approval.model_dump_json())
+            pipe.zadd(self.index_key, {approval.workflow_id: approval.expires_at.timestamp()})
+            await pipe.execute()
+
+    async def expire_due(self, limit: int = 100) -> int:
+        """Queue an "expired" decision for every approval past its deadline."""
+        due = await self.redis.zrangebyscore(self.index_key, "-inf", time.time(), start=0, num=limit)
+        expired = 0
+        for workflow_id in due:
+            approval = await self._claim(workflow_id)
+            if approval is None:
+                # Decided or expired by someone else in the meantime
+                continue
+            try:
+                await self.queue.push_event(self._resume_event(approval, "expired", None, None))
+            except Exception:
+                await self.park_again(approval)
+                raise
+            expired += 1
+        return expired
+
+approval_service = ApprovalService()
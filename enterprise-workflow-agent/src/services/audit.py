@@ -1,21 +1,203 @@
-from src.schemas.events import AuditLogEntry
-from src.core.database import AsyncSessionLocal
-# from src.core.models import AuditLogModel # We would need a DB model
-import json
+import asyncio
+from collections import deque
+from typing import Deque, List
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from src.schemas.events import AgentAction, AuditLogEntry
+from src.core.config import settings
+from src.core.log import get_logger
+from src.core.database import engine as default_engine
+from src.core.models import audit_logs_table
+
+logger = get_logger(__name__)
 
 class AuditService:
+    """
+    Write-behind audit log.
+
+    `log_entry()` only appends to an in-memory buffer; a background task
+    flushes it as multi-row INSERTs when AUDIT_FLUSH_BATCH_SIZE entries are
+    waiting or every AUDIT_FLUSH_INTERVAL_SECONDS, whichever comes first.
+    After a failed flush the flusher backs off exponentially (up to
+    AUDIT_RETRY_MAX_DELAY_SECONDS) however often writers wake it.
+    Call `close()` on shutdown to flush what is left.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine = None,
+        max_entries: int = None,
+        batch_size: int = None,
+        flush_interval: float = None,
+        failure_policy: str = None,
+        overflow_policy: str = None,
+    ):
+        self.engine = engine or default_engine
+        self.max_entries = max_entries or settings.AUDIT_BUFFER_MAX_ENTRIES
+        self.batch_size = batch_size or settings.AUDIT_FLUSH_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.AUDIT_FLUSH_INTERVAL_SECONDS
+        self.failure_policy = failure_policy or settings.AUDIT_FLUSH_FAILURE_POLICY
+        self.overflow_policy = overflow_policy or settings.AUDIT_OVERFLOW_POLICY
+
+        self._buffer: Deque[AuditLogEntry] = deque()
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._space = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closed = False
+
+        # Counters for tuning / alerting
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        # Failed flushes since the last successful write, for backoff
+        self._consecutive_failures = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
     async def log_entry(self, entry: AuditLogEntry):
         """
-        Logs an entry to the database.
+        Buffers an entry for the next batch write.
         """
-        print(f"[AUDIT] Logging: {entry.action.agent_name} - {entry.action.tool_name} -> {entry.outcome}")
-        
-        # Mock DB save
-        # async with AsyncSessionLocal() as session:
-        #     db_entry = AuditLogModel(...)
-        #     session.add(db_entry)
-        #     await session.commit()
-        
+        if self._closed:
+            raise RuntimeError("AuditService is closed")
+        self._ensure_started()
+
+        while len(self._buffer) >= self.max_entries:
+            if self.overflow_policy == "drop_oldest":
+                self._buffer.popleft()
+                self.dropped += 1
+                break
+            # Backpressure: wait for the flusher to make room
+            self._space.clear()
+            self._wake.set()
+            await self._space.wait()
+
+        self._buffer.append(entry)
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
         return True
 
+    async def _flush_loop(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+            if self._consecutive_failures:
+                await self._backoff()
+                # Retry as soon as the backoff is over, not at the next interval
+                if self._buffer:
+                    self._wake.set()
+
+    async def _backoff(self):
+        """Sleep after a failed flush. Only close() cuts it short, not _wake."""
+        delay = min(
+            settings.AUDIT_RETRY_BASE_DELAY_SECONDS * 2 ** (self._consecutive_failures - 1),
+            settings.AUDIT_RETRY_MAX_DELAY_SECONDS,
+        )
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def flush(self):
+        """Write buffered entries in batches until the buffer is empty or a write fails."""
+        async with self._flush_lock:
+            while self._buffer:
+                batch: List[AuditLogEntry] = [
+                    self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))
+                ]
+                try:
+                    await self._write_batch(batch)
+                    self.written += len(batch)
+                    self._consecutive_failures = 0
+                except Exception as e:
+                    self.failed_flushes += 1
+                    self._consecutive_failures += 1
+                    self._handle_failed_batch(batch, e)
+                    break
+                finally:
+                    self._space.set()
+
+    def _handle_failed_batch(self, batch: List[AuditLogEntry], error: Exception):
+        if self.failure_policy == "retry":
+            # Put the batch back at the front; keep the newest entries if that overflows
+            self._buffer.extendleft(reversed(batch))
+            overflow = len(self._buffer) - self.max_entries
+            for _ in range(max(overflow, 0)):
+                self._buffer.popleft()
+                self.dropped += 1
+            logger.warning("Audit flush failed, will retry", extra={"entries": len(batch), "error": str(error)})
+        else:
+            self.dropped += len(batch)
+            logger.error("Audit flush failed, entries dropped", extra={"entries": len(batch), "error": str(error)})
+
+    async def _write_batch(self, batch: List[AuditLogEntry]):
+        rows = [
+            {
+                "workflow_id": entry.workflow_id,
+                "agent_name": entry.action.agent_name,
+                "tool_name": entry.action.tool_name,
+                "tool_input": entry.action.model_dump(mode="json")["tool_input"],
+                "outcome": entry.outcome,
+                "authorized_by": entry.authorized_by,
+                "timestamp": entry.action.timestamp,
+            }
+            for entry in batch
+        ]
+        async with self.engine.begin() as conn:
+            # executemany on asyncpg is batched into multi-row INSERTs by SQLAlchemy
+            await conn.execute(insert(audit_logs_table), rows)
+
+    async def get_trail(self, workflow_id: str) -> List[AuditLogEntry]:
+        """
+        Returns the full audit trail of a workflow, oldest first.
+
+        Buffered entries are flushed first so the trail includes everything
+        logged so far.
+        """
+        await self.flush()
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(
+                select(audit_logs_table)
+                .where(audit_logs_table.c.workflow_id == workflow_id)
+                .order_by(audit_logs_table.c.id)
+            )
+            return [
+                AuditLogEntry(
+                    workflow_id=row.workflow_id,
+                    action=AgentAction(
+                        agent_name=row.agent_name,
+                        tool_name=row.tool_name,
+                        tool_input=row.tool_input,
+                        timestamp=row.timestamp,
+                    ),
+                    outcome=row.outcome,
+                    authorized_by=row.authorized_by,
+                )
+                for row in rows
+            ]
+
+    async def close(self):
+        """Stop the flusher and write out whatever is still buffered."""
+        self._closed = True
+        self._wake.set()
+        self._stop.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._buffer:
+            logger.error("Audit entries could not be written on shutdown", extra={"entries": len(self._buffer)})
+
 audit_service = AuditService()
@@ -0,0 +1,226 @@
+"""
+Out-of-band storage for large workflow context values.
+
+Nodes put big results (query rows and the like) here and keep only a small
+reference in `WorkflowState.context`, so checkpoints and state updates stay
+the same size no matter how much data a workflow handles. Values are
+content-addressed (sha256 of their serialized form), so identical results
+are stored once, and are only loaded when a node calls `resolve()`. They are
+serialized with the checkpointer's serde, so a value comes back with the same
+types (Decimal, UUID, datetime, ...) whether it was offloaded or kept inline.
+
+A reference is a plain dict, `{"$blob": "<digest>", "bytes": <size>}`, so it
+checkpoints like any other context value.
+"""
+import abc
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from datetime import timedelta
+from typing import Any, Optional, Tuple
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from src.agent.checkpointer import build_serde
+from src.core.config import settings
+from src.core.database import engine as default_engine
+from src.core.models import context_blobs_table
+
+try:
+    import zstandard
+except ImportError:  # stored uncompressed without it
+    zstandard = None
+
+_RAW = b"R"
+_ZSTD = b"Z"
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and "$blob" in value
+
+_serde = build_serde()
+
+def _serialize(value: Any) -> bytes:
+    type_, data = _serde.dumps_typed(value)
+    return type_.encode() + b"\0" + data
+
+def _deserialize(data: bytes) -> Any:
+    type_, _, body = data.partition(b"\0")
+    return _serde.loads_typed((type_.decode(), body))
+
+def _digest(value: Any, min_bytes: int) -> Tuple[bytes, Optional[str]]:
+    """Serialized value and its sha256, or no digest if it is below `min_bytes`."""
+    data = _serialize(value)
+    if len(data) < min_bytes:
+        return data, None
+    return data, hashlib.sha256(data).hexdigest()
+
+def _compress(data: bytes) -> bytes:
+    if zstandard is None:
+        return _RAW + data
+    return _ZSTD + zstandard.ZstdCompressor(level=3).compress(data)
+
+def _decompress(data: bytes) -> bytes:
+    marker, body = data[:1], data[1:]
+    if marker == _ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(body)
+    return body
+
+def _load(data: bytes) -> Any:
+    return _deserialize(_decompress(data))
+
+class BlobStore(abc.ABC):
+    """Backend-independent part: thresholding, hashing, (de)serialization."""
+
+    def __init__(self, min_bytes: int = None):
+        self.min_bytes = settings.CONTEXT_BLOB_MIN_BYTES if min_bytes is None else min_bytes
+
+    async def offload(self, value: Any) -> Any:
+        """Store `value` out of band and return a reference, or `value` itself if it is small."""
+        # Serializing and hashing a large result is CPU work; keep it off the loop
+        data, digest = await asyncio.to_thread(_digest, value, self.min_bytes)
+        if digest is None:
+            return value
+        # Storing content that already exists only refreshes its retention clock
+        if not await self._touch(digest):
+            compressed = await asyncio.to_thread(_compress, data)
+            await self._write(digest, compressed, len(data))
+        return {"$blob": digest, "bytes": len(data)}
+
+    async def resolve(self, value: Any) -> Any:
+        """Load the value behind a reference; anything else is returned unchanged."""
+        if not is_blob_ref(value):
+            return value
+        data = await self._read(value["$blob"])
+        if data is None:
+            raise KeyError(f"Context blob {value['$blob']} not found (expired?)")
+        return await asyncio.to_thread(_load, data)
+
+    @abc.abstractmethod
+    async def _touch(self, digest: str) -> bool:
+        """Mark an existing blob as used; False if it doesn't exist."""
+
+    @abc.abstractmethod
+    async def _write(self, digest: str, data: bytes, size: int):
+        """Store compressed `data` (`size` bytes uncompressed) under `digest`."""
+
+    @abc.abstractmethod
+    async def _read(self, digest: str) -> Optional[bytes]:
+        """Compressed data stored under `digest`, or None."""
+
+    @abc.abstractmethod
+    async def gc(self, max_age: float = None) -> int:
+        """Delete blobs older than `max_age` seconds. Returns how many were removed."""
+
+class PostgresBlobStore(BlobStore):
+    """Blobs in the `context_blobs` table (bytea, TOASTed out of line by Postgres)."""
+
+    def __init__(self, engine: AsyncEngine = None, **kwargs):
+        super().__init__(**kwargs)
+        self.engine = engine or default_engine
+
+    async def _touch(self, digest: str) -> bool:
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                update(context_blobs_table)
+                .where(context_blobs_table.c.digest == digest)
+                .values(last_used_at=func.now())
+            )
+            return result.rowcount > 0
+
+    async def _write(self, digest: str, data: bytes, size: int):
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                insert(context_blobs_table)
+                .values(digest=digest, data=data, size=size)
+                .on_conflict_do_update(index_elements=["digest"], set_={"last_used_at": func.now()})
+            )
+
+    async def _read(self, digest: str) -> Optional[bytes]:
+        async with self.engine.connect() as conn:
+            row = await conn.execute(
+                select(context_blobs_table.c.data).where(context_blobs_table.c.digest == digest)
+            )
+            found = row.first()
+            return found.data if found else None
+
+    async def gc(self, max_age: float = None) -> int:
+        max_age = settings.CONTEXT_BLOB_RETENTION_SECONDS if max_age is None else max_age
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                delete(context_blobs_table).where(
+                    context_blobs_table.c.last_used_at < func.now() - timedelta(seconds=max_age)
+                )
+            )
+            return result.rowcount
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under CONTEXT_BLOB_DIR, fanned out by the first two hex digits."""
+
+    def __init__(self, root: str = None, **kwargs):
+        super().__init__(**kwargs)
+        self.root = root or settings.CONTEXT_BLOB_DIR
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _touch_file(self, digest: str) -> bool:
+        try:
+            os.utime(self._path(digest))
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def _touch(self, digest: str) -> bool:
+        return await asyncio.to_thread(self._touch_file, digest)
+
+    def _write_file(self, digest: str, data: bytes):
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    async def _write(self, digest: str, data: bytes, size: int):
+        await asyncio.to_thread(self._write_file, digest, data)
+
+    def _read_file(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def _read(self, digest: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read_file, digest)
+
+    def _gc_files(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        removed = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    async def gc(self, max_age: float = None) -> int:
+        max_age = settings.CONTEXT_BLOB_RETENTION_SECONDS if max_age is None else max_age
+        return await asyncio.to_thread(self._gc_files, max_age)
+
+def build_blob_store() -> BlobStore:
+    """Pick the blob store for CONTEXT_BLOB_BACKEND ("postgres" or "local")."""
+    if settings.CONTEXT_BLOB_BACKEND == "local":
+        return LocalBlobStore()
+    return PostgresBlobStore()
+
+blob_store = build_blob_store()
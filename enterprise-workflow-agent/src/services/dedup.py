@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import redis.asyncio as redis
+from src.core.config import settings
+from src.services.queue import queue_service
+
+def dedup_key(payload: Dict[str, Any]) -> Optional[str]:
+    """Slack's event_id survives retries; fall back to an explicit request_id."""
+    return payload.get("event_id") or payload.get("request_id")
+
+class EventDeduplicator:
+    """
+    Drops events that were already accepted.
+
+    Redis holds one `SET NX EX` key per event id, so entries expire
+    individually after INGEST_DEDUP_TTL_SECONDS and every API process sees the
+    same set. A small in-process LRU of recently seen ids answers most Slack
+    retries without a round trip.
+    """
+
+    def __init__(self, client: redis.Redis = None, ttl: int = None, local_size: int = None):
+        self.redis = client or queue_service.redis
+        self.ttl = ttl or settings.INGEST_DEDUP_TTL_SECONDS
+        self.local_size = local_size or settings.INGEST_DEDUP_LOCAL_SIZE
+        self._recent: OrderedDict[str, None] = OrderedDict()
+
+    def _key(self, event_id: str) -> str:
+        return f"{settings.INGEST_DEDUP_KEY_PREFIX}:{event_id}"
+
+    def _remember(self, event_id: str):
+        self._recent[event_id] = None
+        self._recent.move_to_end(event_id)
+        while len(self._recent) > self.local_size:
+            self._recent.popitem(last=False)
+
+    async def claim(self, event_id: str) -> bool:
+        """
+        Mark an event id as seen. Returns False if it was already seen (a duplicate).
+        """
+        return (await self.claim_many([event_id]))[0]
+
+    async def claim_many(self, event_ids: List[str]) -> List[bool]:
+        """Claim several ids in one pipelined round trip; duplicates within the list lose too."""
+        results = [False] * len(event_ids)
+        to_check = {}
+        for i, event_id in enumerate(event_ids):
+            if event_id in self._recent:
+                self._recent.move_to_end(event_id)
+                continue
+            if event_id not in to_check:
+                to_check[event_id] = i
+
+        if to_check:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for event_id in to_check:
+                    pipe.set(self._key(event_id), 1, nx=True, ex=self.ttl)
+                created = await pipe.execute()
+            for (event_id, i), is_new in zip(to_check.items(), created):
+                results[i] = bool(is_new)
+                self._remember(event_id)
+        return results
+
+    async def release(self, event_ids: List[str]):
+        """Forget ids whose events could not be queued, so a retry is accepted."""
+        for event_id in event_ids:
+            self._recent.pop(event_id, None)
+        if event_ids:
+            await self.redis.delete(*[self._key(event_id) for event_id in event_ids])
+
+event_deduplicator = EventDeduplicator()
@@ -0,0 +1,69 @@
+import asyncio
+from typing import List, Tuple
+from src.core.config import settings
+from src.schemas.events import IngestEvent
+from src.services.queue import queue_service
+
+class GroupCommitter:
+    """
+    Gathers events from concurrent ingest requests and pushes them to the
+    queue in one round trip.
+
+    The first event of a group opens a short window (INGEST_GROUP_COMMIT_WINDOW_MS);
+    everything submitted before it closes, or until INGEST_GROUP_COMMIT_MAX_BATCH
+    is reached, goes out in a single push. Callers await their own result, so a
+    failed push surfaces as an error instead of being lost after the response.
+    """
+
+    def __init__(self, queue=None, window_ms: float = None, max_batch: int = None):
+        self.queue = queue or queue_service
+        self.window = (settings.INGEST_GROUP_COMMIT_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_batch = max_batch or settings.INGEST_GROUP_COMMIT_MAX_BATCH
+        self._pending: List[Tuple[IngestEvent, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    async def submit(self, event: IngestEvent):
+        """Queue one event and wait until its group has been pushed."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((event, future))
+        if len(self._pending) >= self.max_batch:
+            self._commit()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._commit)
+        await future
+
+    async def submit_many(self, events: List[IngestEvent]):
+        """Push an already-batched list (bulk endpoint) in the same group as concurrent singles."""
+        await asyncio.gather(*[self.submit(event) for event in events])
+
+    def _commit(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        group, self._pending = self._pending, []
+        task = asyncio.create_task(self._push(group))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _push(self, group: List[Tuple[IngestEvent, asyncio.Future]]):
+        try:
+            await self.queue.push_events([event for event, _ in group])
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _, future in group:
+                if not future.done():
+                    future.set_result(None)
+
+    async def close(self):
+        """Push anything still waiting for its window and wait for in-flight pushes."""
+        self._commit()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+group_committer = GroupCommitter()
@@ -1,30 +1,471 @@
-import json
+import asyncio
+import itertools
+import os
+import socket
+import time
+from typing import Dict, List, Tuple
 import redis.asyncio as redis
 from src.core.config import settings
-from src.schemas.events import IngestEvent
+from src.core.log import get_logger
+from src.schemas.events import IngestEvent, URGENT_PRIORITY
+from src.services.event_codec import encode_event, decode_event, decode_events
+from src.services.sharding import HashRing, shard_key, shard_names
+
+logger = get_logger(__name__)
+
+def _default_redis() -> redis.Redis:
+    # Raw bytes: queued events may be binary (see event_codec)
+    return redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB
+    )
+
+def _text(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
 
 class QueueService:
-    def __init__(self):
-        self.redis = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=settings.REDIS_DB,
-            decode_responses=True
-        )
+    def __init__(self, client: redis.Redis = None, name: str = None):
+        self.redis = client or _default_redis()
+        self.name = name or settings.REDIS_QUEUE_NAME
 
     async def push_event(self, event: IngestEvent):
-        """Push an event to the Redis list (queue)."""
-        # Serialize the Pydantic model to JSON
-        event_json = event.model_dump_json()
-        await self.redis.rpush(settings.REDIS_QUEUE_NAME, event_json)
+        """Push an event to the Redis list (queue); urgent events go to the head."""
+        if event.priority == URGENT_PRIORITY:
+            await self.redis.lpush(self.name, encode_event(event))
+        else:
+            await self.redis.rpush(self.name, encode_event(event))
+
+    async def push_events(self, events: List[IngestEvent]):
+        """Push many events with a single multi-value RPUSH (one round trip)."""
+        urgent = [e for e in events if e.priority == URGENT_PRIORITY]
+        if urgent:
+            # LPUSH inserts one at a time, so reverse to keep their order at the head
+            await self.redis.lpush(self.name, *[encode_event(e) for e in reversed(urgent)])
+            events = [e for e in events if e.priority != URGENT_PRIORITY]
+        if events:
+            await self.redis.rpush(self.name, *[encode_event(e) for e in events])
 
     async def pop_event(self) -> IngestEvent | None:
         """Pop an event from the Redis list (queue)."""
         # blpop returns a tuple (key, value) or None if timeout
         # We use a non-blocking lpop for now, or could use blpop in a worker
-        data = await self.redis.lpop(settings.REDIS_QUEUE_NAME)
+        data = await self.redis.lpop(self.name)
         if data:
-            return IngestEvent.model_validate_json(data)
+            return decode_event(data)
         return None
 
-queue_service = QueueService()
+    async def pop_events(self, max_count: int = None, timeout: float = None) -> List[IngestEvent]:
+        """
+        Blocking, batched pop.
+
+        Waits up to `timeout` seconds for the queue to become non-empty, then
+        takes up to `max_count` events in the same round trip (BLMPOP, Redis 7+).
+        Returns an empty list on timeout; `timeout=0` doesn't block at all.
+        """
+        max_count = max_count or settings.QUEUE_BATCH_SIZE
+        timeout = settings.QUEUE_BLOCK_TIMEOUT_SECONDS if timeout is None else timeout
+
+        if timeout == 0:
+            # BLMPOP treats 0 as "block forever"
+            items = await self.redis.lpop(self.name, max_count)
+            return self.deserialize_batch(items) if items else []
+        return await self.pop_any([self], max_count, timeout)
+
+    @staticmethod
+    async def pop_any(queues: List["QueueService"], max_count: int, timeout: float) -> List[IngestEvent]:
+        """Block until any of `queues` has events, then pop up to `max_count` from the first non-empty one."""
+        names = [queue.name for queue in queues]
+        result = await queues[0].redis.blmpop(timeout, len(names), *names, direction="LEFT", count=max_count)
+        if not result:
+            return []
+        _, items = result
+        return QueueService.deserialize_batch(items)
+
+    @staticmethod
+    async def pop_each(requests: List[Tuple["QueueService", int]]) -> List[List[IngestEvent]]:
+        """Pop up to `count` events from each queue without blocking, in one pipelined round trip."""
+        async with requests[0][0].redis.pipeline(transaction=False) as pipe:
+            for queue, count in requests:
+                pipe.lpop(queue.name, count)
+            results = await pipe.execute()
+        return [QueueService.deserialize_batch(items) if items else [] for items in results]
+
+    @staticmethod
+    def deserialize_batch(items: List[bytes | str]) -> List[IngestEvent]:
+        """Decode a batch of raw events, whichever wire format each was written in."""
+        return decode_events(items)
+
+    async def ack(self, events: List[IngestEvent]):
+        """Lists have no delivery tracking; events are gone once popped."""
+        return None
+
+    async def depth(self) -> int:
+        """Number of events waiting in the queue."""
+        return await self.redis.llen(self.name)
+
+class StreamQueueService:
+    """
+    Redis Streams backend with a consumer group.
+
+    Events stay in the group's pending entries list (PEL) until the worker
+    acks them after the workflow finishes, so a crashed worker's events are
+    reclaimed by another consumer (XAUTOCLAIM) once they have been idle for
+    REDIS_STREAM_CLAIM_IDLE_MS. Delivery is at-least-once.
+    """
+
+    def __init__(self, client: redis.Redis = None, stream: str = None, group: str = None, consumer: str = None):
+        self.redis = client or _default_redis()
+        self.stream = stream or settings.REDIS_STREAM_NAME
+        self.group = group or settings.REDIS_STREAM_GROUP
+        self.consumer = consumer or settings.REDIS_STREAM_CONSUMER or f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+        self._last_claim = 0.0
+
+    async def ensure_group(self):
+        """Create the stream and consumer group if they don't exist yet."""
+        if self._group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def push_event(self, event: IngestEvent):
+        """Append an event to the stream (approximately capped at REDIS_STREAM_MAXLEN)."""
+        await self.redis.xadd(
+            self.stream,
+            {"event": encode_event(event)},
+            maxlen=settings.REDIS_STREAM_MAXLEN,
+            approximate=True
+        )
+
+    async def push_events(self, events: List[IngestEvent]):
+        """Append many events in one pipelined round trip."""
+        if not events:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.xadd(
+                    self.stream,
+                    {"event": encode_event(event)},
+                    maxlen=settings.REDIS_STREAM_MAXLEN,
+                    approximate=True
+                )
+            await pipe.execute()
+
+    async def pop_event(self) -> IngestEvent | None:
+        events = await self.pop_events(max_count=1, timeout=0)
+        return events[0] if events else None
+
+    async def pop_events(self, max_count: int = None, timeout: float = None) -> List[IngestEvent]:
+        """
+        Read up to `max_count` events for this consumer.
+
+        Stale entries from dead consumers are reclaimed first (at most every
+        REDIS_STREAM_CLAIM_INTERVAL_SECONDS); otherwise new entries are read,
+        blocking up to `timeout` seconds. Returned events must be acked.
+        """
+        await self.ensure_group()
+        max_count = max_count or settings.QUEUE_BATCH_SIZE
+        timeout = settings.QUEUE_BLOCK_TIMEOUT_SECONDS if timeout is None else timeout
+
+        claimed = await self.reclaim_stale(max_count)
+        if claimed:
+            return claimed
+
+        return await self.pop_any([self], max_count, timeout)
+
+    @staticmethod
+    async def pop_any(streams: List["StreamQueueService"], max_count: int, timeout: float) -> List[IngestEvent]:
+        """Read new entries from several streams of the same group in one XREADGROUP."""
+        by_name = {stream.stream: stream for stream in streams}
+        first = streams[0]
+        response = await first.redis.xreadgroup(
+            first.group,
+            first.consumer,
+            {name: ">" for name in by_name},
+            count=max_count,
+            block=int(timeout * 1000) if timeout else None
+        )
+        events = []
+        for name, entries in response or []:
+            events.extend(await by_name[_text(name)]._decode_entries(entries))
+        return events
+
+    @staticmethod
+    async def pop_each(requests: List[Tuple["StreamQueueService", int]]) -> List[List[IngestEvent]]:
+        """
+        Read up to `count` events from each stream without blocking. Stale
+        entries are reclaimed first, as in `pop_events`; new entries of all
+        streams are read in one pipelined round trip.
+        """
+        results = []
+        for stream, count in requests:
+            await stream.ensure_group()
+            results.append(await stream.reclaim_stale(count))
+        unread = [i for i, claimed in enumerate(results) if not claimed]
+        if not unread:
+            return results
+        async with requests[0][0].redis.pipeline(transaction=False) as pipe:
+            for i in unread:
+                stream, count = requests[i]
+                pipe.xreadgroup(stream.group, stream.consumer, {stream.stream: ">"}, count=count)
+            responses = await pipe.execute()
+        for i, response in zip(unread, responses):
+            stream = requests[i][0]
+            for _, entries in response or []:
+                results[i].extend(await stream._decode_entries(entries))
+        return results
+
+    async def reclaim_stale(self, max_count: int) -> List[IngestEvent]:
+        """Claim pending entries that other consumers have held for too long."""
+        now = time.monotonic()
+        if now - self._last_claim < settings.REDIS_STREAM_CLAIM_INTERVAL_SECONDS:
+            return []
+        self._last_claim = now
+
+        result = await self.redis.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=settings.REDIS_STREAM_CLAIM_IDLE_MS,
+            start_id="0-0",
+            count=max_count
+        )
+        # [next_start_id, entries] on Redis 6.2, plus deleted ids on Redis 7
+        entries = result[1] if result else []
+        if entries:
+            logger.info("Reclaimed stale stream entries", extra={"count": len(entries)})
+            # More may be waiting; check again on the next pop
+            self._last_claim = 0.0
+        return await self._decode_entries(entries)
+
+    async def _decode_entries(self, entries) -> List[IngestEvent]:
+        events = []
+        poison = []
+        for entry_id, fields in entries:
+            fields = fields or {}
+            # Field names are bytes on a raw client, str if decode_responses is on
+            data = fields.get(b"event", fields.get("event"))
+            if data is None:
+                # Trimmed or deleted while pending
+                poison.append(entry_id)
+                continue
+            try:
+                event = decode_event(data)
+            except ValueError as e:
+                logger.warning("Dropping malformed stream entry", extra={"entry_id": _text(entry_id), "error": str(e)})
+                poison.append(entry_id)
+                continue
+            event._delivery_id = _text(entry_id)
+            events.append(event)
+        if poison:
+            await self.redis.xack(self.stream, self.group, *poison)
+        return events
+
+    async def depth(self) -> int:
+        """Entries not yet delivered to the group plus those delivered but not acked."""
+        await self.ensure_group()
+        for group in await self.redis.xinfo_groups(self.stream):
+            if _text(group["name"]) == self.group:
+                # `lag` is None when Redis can't compute it (e.g. after XDEL); fall back to the stream length
+                lag = group.get("lag")
+                if lag is None:
+                    lag = await self.redis.xlen(self.stream)
+                return lag + group["pending"]
+        return 0
+
+    async def ack(self, events: List[IngestEvent]):
+        """Acknowledge processed events, removing them from the pending list."""
+        ids = [e._delivery_id for e in events if e._delivery_id]
+        if ids:
+            await self.redis.xack(self.stream, self.group, *ids)
+
+class ShardedQueueService:
+    """
+    Partitions events across QUEUE_SHARDS queues by ordering key (see sharding.py).
+
+    Producers push through this class; each worker process consumes exactly
+    one shard via `shard(i)`, so events with the same key are handled by one
+    worker, in order.
+    """
+
+    def __init__(self, backends: list, ring: HashRing = None):
+        self.backends = backends
+        self.ring = ring or HashRing(len(backends))
+        self._unkeyed = itertools.count()
+
+    @property
+    def redis(self):
+        """The shared client (all shards use one connection pool)."""
+        return self.backends[0].redis
+
+    @redis.setter
+    def redis(self, client):
+        for backend in self.backends:
+            backend.redis = client
+
+    def shard(self, index: int):
+        return self.backends[index]
+
+    def shard_for(self, event: IngestEvent) -> int:
+        key = shard_key(event)
+        if key is None:
+            # No ordering requested: round-robin
+            return next(self._unkeyed) % len(self.backends)
+        return self.ring.shard_for(key)
+
+    async def push_event(self, event: IngestEvent):
+        await self.backends[self.shard_for(event)].push_event(event)
+
+    async def push_events(self, events: List[IngestEvent]):
+        """Split a batch by shard, keeping each shard's events in submission order."""
+        by_shard: dict[int, List[IngestEvent]] = {}
+        for event in events:
+            by_shard.setdefault(self.shard_for(event), []).append(event)
+        await asyncio.gather(*[self.backends[shard].push_events(batch) for shard, batch in by_shard.items()])
+
+    async def depth(self) -> int:
+        return sum(await asyncio.gather(*[backend.depth() for backend in self.backends]))
+
+class FairQueueService:
+    """
+    Per-source lanes with a weighted fair scheduler.
+
+    Each lane (a source such as "slack", or "source:priority") is its own
+    queue. `pop_events` splits a batch between the non-empty lanes in
+    proportion to QUEUE_LANE_WEIGHTS (smooth weighted round-robin), so a
+    backlog of bulk email can't starve interactive Slack traffic. A lane
+    that runs dry loses its accumulated credit.
+
+    Events matching no lane go to the "default" lane, which keeps the plain
+    queue name so events queued before lanes were configured still drain.
+    Urgent events of any source go to the "urgent" lane, weighted by
+    QUEUE_URGENT_LANE_WEIGHT. Ordering between lanes is not preserved.
+    """
+
+    DEFAULT_LANE = "default"
+    URGENT_LANE = "urgent"
+
+    def __init__(self, lanes: Dict[str, object], weights: Dict[str, int] = None):
+        self.lanes = lanes
+        weights = settings.QUEUE_LANE_WEIGHTS if weights is None else weights
+        self.weights = {lane: weights.get(lane, settings.QUEUE_DEFAULT_LANE_WEIGHT) for lane in lanes}
+        self._credit = {lane: 0 for lane in lanes}
+        # Surplus from a multi-lane blocking read, served before anything else
+        self._carry: List[IngestEvent] = []
+
+    @property
+    def redis(self):
+        return self.lanes[self.DEFAULT_LANE].redis
+
+    @redis.setter
+    def redis(self, client):
+        for lane in self.lanes.values():
+            lane.redis = client
+
+    def lane_for(self, event: IngestEvent) -> str:
+        if event.priority == URGENT_PRIORITY and self.URGENT_LANE in self.lanes:
+            return self.URGENT_LANE
+        source = event.source.value
+        for lane in (f"{source}:{event.priority}", source):
+            if lane in self.lanes:
+                return lane
+        return self.DEFAULT_LANE
+
+    def _by_lane(self, events: List[IngestEvent]) -> Dict[str, List[IngestEvent]]:
+        grouped: Dict[str, List[IngestEvent]] = {}
+        for event in events:
+            grouped.setdefault(self.lane_for(event), []).append(event)
+        return grouped
+
+    async def push_event(self, event: IngestEvent):
+        await self.lanes[self.lane_for(event)].push_event(event)
+
+    async def push_events(self, events: List[IngestEvent]):
+        await asyncio.gather(*[self.lanes[lane].push_events(batch) for lane, batch in self._by_lane(events).items()])
+
+    async def pop_event(self) -> IngestEvent | None:
+        events = await self.pop_events(max_count=1, timeout=0)
+        return events[0] if events else None
+
+    def _allot(self, lanes: List[str], count: int) -> Dict[str, int]:
+        """Hand out `count` pops between `lanes` by smooth weighted round-robin."""
+        total = sum(self.weights[lane] for lane in lanes)
+        allotment = dict.fromkeys(lanes, 0)
+        for _ in range(count):
+            for lane in lanes:
+                self._credit[lane] += self.weights[lane]
+            chosen = max(lanes, key=self._credit.__getitem__)
+            self._credit[chosen] -= total
+            allotment[chosen] += 1
+        return allotment
+
+    async def pop_events(self, max_count: int = None, timeout: float = None) -> List[IngestEvent]:
+        """
+        Take up to `max_count` events, shared between lanes by weight.
+
+        Lanes are read without blocking, all in one pipelined round trip; a
+        lane that returns less than its share is drained and its share is
+        re-offered to the others. Only when every lane is empty does this
+        block (up to `timeout`) for the first lane to receive work.
+        """
+        max_count = max_count or settings.QUEUE_BATCH_SIZE
+        timeout = settings.QUEUE_BLOCK_TIMEOUT_SECONDS if timeout is None else timeout
+
+        events, self._carry = self._carry[:max_count], self._carry[max_count:]
+        backends = list(self.lanes.values())
+        candidates = list(self.lanes)
+        while len(events) < max_count and candidates:
+            wanted = {lane: n for lane, n in self._allot(candidates, max_count - len(events)).items() if n}
+            results = await type(backends[0]).pop_each([(self.lanes[lane], n) for lane, n in wanted.items()])
+            drained = set()
+            for (lane, n), popped in zip(wanted.items(), results):
+                events.extend(popped)
+                if len(popped) < n:
+                    drained.add(lane)
+                    self._credit[lane] = 0
+            candidates = [lane for lane in candidates if lane not in drained]
+
+        if events or timeout == 0:
+            return events
+
+        # Streams return up to `count` per stream; keep any surplus for the next call
+        per_lane = max(1, max_count // len(backends))
+        events = await type(backends[0]).pop_any(backends, per_lane, timeout)
+        events, self._carry = events[:max_count], events[max_count:]
+        return events
+
+    async def ack(self, events: List[IngestEvent]):
+        await asyncio.gather(*[self.lanes[lane].ack(batch) for lane, batch in self._by_lane(events).items()])
+
+    async def depth(self) -> int:
+        return sum(await asyncio.gather(*[lane.depth() for lane in self.lanes.values()]))
+
+def _single_queue(client: redis.Redis, name: str):
+    if settings.QUEUE_BACKEND == "stream":
+        return StreamQueueService(client, stream=name)
+    return QueueService(client, name=name)
+
+def _build_backend(client: redis.Redis, name: str):
+    """The queue behind one shard: a single list/stream, or one per lane."""
+    if not settings.QUEUE_LANE_WEIGHTS:
+        return _single_queue(client, name)
+    weights = {**settings.QUEUE_LANE_WEIGHTS, FairQueueService.URGENT_LANE: settings.QUEUE_URGENT_LANE_WEIGHT}
+    lanes = {FairQueueService.DEFAULT_LANE: _single_queue(client, name)}
+    for lane in weights:
+        lanes[lane] = _single_queue(client, f"{name}:{lane}")
+    return FairQueueService(lanes, weights)
+
+def _build_queue_service():
+    client = _default_redis()
+    base = settings.REDIS_STREAM_NAME if settings.QUEUE_BACKEND == "stream" else settings.REDIS_QUEUE_NAME
+    names = shard_names(base, max(settings.QUEUE_SHARDS, 1))
+    if len(names) == 1:
+        return _build_backend(client, names[0])
+    return ShardedQueueService([_build_backend(client, name) for name in names])
+
+queue_service = _build_queue_service()
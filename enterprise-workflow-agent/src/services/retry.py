@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+import redis.asyncio as redis
+from src.core.config import settings
+from src.core.log import get_logger
+from src.schemas.events import IngestEvent
+from src.services.event_codec import encode_event, decode_event
+from src.services.queue import queue_service
+
+logger = get_logger(__name__)
+
+class RetryService:
+    """
+    Delayed retries and a dead-letter queue for events whose workflow failed.
+
+    A failed event is written to a sorted set scored by the time it is due
+    again, with exponential backoff and jitter. Workers periodically move due
+    entries back onto the queue. After RETRY_MAX_ATTEMPTS failures the event
+    is moved to the dead-letter list together with its last error, where it
+    stays until someone re-drives or purges it.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis = None,
+        queue=None,
+        max_attempts: int = None,
+        base_delay: float = None,
+        max_delay: float = None,
+    ):
+        self.queue = queue or queue_service
+        self.redis = client or self.queue.redis
+        self.max_attempts = max_attempts or settings.RETRY_MAX_ATTEMPTS
+        self.base_delay = settings.RETRY_BASE_DELAY_SECONDS if base_delay is None else base_delay
+        self.max_delay = settings.RETRY_MAX_DELAY_SECONDS if max_delay is None else max_delay
+        self.retry_key = settings.REDIS_RETRY_KEY
+        self.dlq_key = settings.REDIS_DLQ_KEY
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (1-based): exponential, capped, with jitter."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        # Jitter spreads out retries of events that failed together (e.g. during an outage)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def fail(self, event: IngestEvent, error: BaseException) -> bool:
+        """
+        Record a failed attempt: schedule a retry, or dead-letter the event if
+        it is out of attempts. Returns True if a retry was scheduled.
+        """
+        event = event.model_copy(update={"attempts": event.attempts + 1})
+        if event.attempts >= self.max_attempts:
+            await self.dead_letter(event, error)
+            return False
+        await self.schedule(event, self.backoff(event.attempts))
+        return True
+
+    async def schedule(self, event: IngestEvent, delay: float):
+        await self.redis.zadd(self.retry_key, {encode_event(event): time.time() + delay})
+
+    async def promote_due(self, limit: int = 100) -> int:
+        """
+        Move retries that are due back onto the queue. Returns how many were moved.
+
+        Several workers may run this at once; an entry is only pushed by the
+        worker whose ZREM actually removed it.
+        """
+        due = await self.redis.zrangebyscore(self.retry_key, "-inf", time.time(), start=0, num=limit)
+        if not due:
+            return 0
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for member in due:
+                pipe.zrem(self.retry_key, member)
+            removed = await pipe.execute()
+
+        events = []
+        for member, was_removed in zip(due, removed):
+            if not was_removed:
+                continue
+            try:
+                events.append(decode_event(member))
+            except ValueError as e:
+                logger.warning("Dropping malformed retry entry", extra={"error": str(e)})
+        if events:
+            try:
+                await self.queue.push_events(events)
+            except Exception:
+                # Put them back so the next poll tries again
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for event in events:
+                        pipe.zadd(self.retry_key, {encode_event(event): time.time()})
+                    await pipe.execute()
+                raise
+        return len(events)
+
+    async def dead_letter(self, event: IngestEvent, error: BaseException):
+        entry = {
+            "event": event.model_dump(mode="json"),
+            "error": f"{type(error).__name__}: {error}",
+            "failed_at": datetime.now().isoformat(),
+        }
+        await self.redis.rpush(self.dlq_key, json.dumps(entry))
+        logger.error("Event dead-lettered", extra={"request_id": event.request_id, "attempts": event.attempts, "error": entry["error"]})
+
+    async def pending(self) -> int:
+        """Events waiting for a retry."""
+        return await self.redis.zcard(self.retry_key)
+
+    async def dead_letters(self, start: int = 0, count: int = 20) -> List[Dict[str, Any]]:
+        """Inspect the dead-letter queue, oldest first."""
+        entries = await self.redis.lrange(self.dlq_key, start, start + count - 1)
+        return [json.loads(entry) for entry in entries]
+
+    async def dead_letter_count(self) -> int:
+        return await self.redis.llen(self.dlq_key)
+
+    async def redrive(self, count: int = None) -> int:
+        """
+        Move up to `count` dead letters (all if None) back onto the queue with a
+        fresh attempt budget. Returns how many were re-queued.
+        """
+        moved = 0
+        while count is None or moved < count:
+            entries = await self.redis.lpop(self.dlq_key, min(100, count - moved) if count else 100)
+            if not entries:
+                break
+            try:
+                events = [IngestEvent.model_validate(json.loads(entry)["event"]).model_copy(update={"attempts": 0})
+                          for entry in entries]
+                await self.queue.push_events(events)
+            except Exception:
+                await self.redis.lpush(self.dlq_key, *reversed(entries))
+                raise
+            moved += len(events)
+        return moved
+
+    async def purge(self) -> int:
+        """Delete every dead letter. Returns how many were removed."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.llen(self.dlq_key)
+            pipe.delete(self.dlq_key)
+            count, _ = await pipe.execute()
+        return count
+
+retry_service = RetryService()
+
+async def _dlq_command(args):
+    if args.command == "list":
+        print(f"{await retry_service.dead_letter_count()} dead letters, {await retry_service.pending()} retries pending")
+        for i, entry in enumerate(await retry_service.dead_letters(args.start, args.count), start=args.start):
+            event = entry["event"]
+            print(f"[{i}] {entry['failed_at']} {event['source']}/{event['event_type']} "
+                  f"id={event.get('request_id')} attempts={event.get('attempts')} error={entry['error']}")
+    elif args.command == "redrive":
+        print(f"Re-queued {await retry_service.redrive(args.count)} events")
+    elif args.command == "purge":
+        print(f"Purged {await retry_service.purge()} dead letters")
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and re-drive the dead-letter queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    list_parser = sub.add_parser("list", help="show dead letters")
+    list_parser.add_argument("--start", type=int, default=0)
+    list_parser.add_argument("--count", type=int, default=20)
+    redrive_parser = sub.add_parser("redrive", help="move dead letters back onto the queue")
+    redrive_parser.add_argument("--count", type=int, default=None, help="default: all")
+    sub.add_parser("purge", help="delete all dead letters")
+    asyncio.run(_dlq_command(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,129 @@
+import argparse
 import asyncio
+import multiprocessing
+import signal
 import uuid
-from src.services.queue import queue_service
-from src.agent.graph import agent_graph
-from src.schemas.events import WorkflowStatus
+from collections import deque
+from typing import Deque, Dict, Optional
+from src.core.config import settings
+from src.services.queue import queue_service, ShardedQueueService
+from src.services.sharding import shard_key
+from src.services.retry import retry_service
+from src.agent.graph import agent_graph, checkpointer
+from src.agent.nodes.supervisor import APPROVAL_STEPS
+from src.core.database import init_db
+from src.core import metrics
+from src.core.log import configure_logging, correlate, get_logger, shutdown_logging
+from src.services.audit import audit_service
+from src.services.approvals import approval_service, RESUME_EVENT_TYPE
+from src.services.blob_store import blob_store
+from src.agent.tools.slack import slack_tool
+from src.schemas.events import AgentAction, AuditLogEntry, WorkflowStatus
 from src.agent.state import WorkflowState
 
+logger = get_logger(__name__)
+
+# Namespace for workflow ids derived from event ids
+_WORKFLOW_NAMESPACE = uuid.UUID("5b0e4c9e-2f51-4a55-9d0f-0f6f3c1e7a21")
+
+def workflow_id_for(event) -> str:
+    """
+    Checkpoint thread of the workflow an event starts, the same for every
+    delivery and retry of the event. An event without a request_id is given
+    one here; retries are copies of the event and keep it.
+    """
+    if event.request_id is None:
+        event.request_id = str(uuid.uuid4())
+    return str(uuid.uuid5(_WORKFLOW_NAMESPACE, f"{event.source.value}:{event.request_id}"))
+
+def _parked(snapshot) -> bool:
+    """Stopped at an approval interrupt, as opposed to failed or cut off mid-run."""
+    return set(snapshot.next) <= APPROVAL_STEPS and not any(task.error for task in snapshot.tasks)
+
+async def _compact_checkpoints(workflow_id: str, parked: bool = False):
+    """Keep only the latest checkpoint so storage doesn't grow with step count."""
+    if not settings.CHECKPOINT_PRUNE_ON_COMPLETE:
+        return
+    try:
+        await checkpointer.aprune([workflow_id])
+    except NotImplementedError:
+        # In-memory saver can't prune; drop finished threads instead (parked ones are still needed)
+        if not parked:
+            await checkpointer.adelete_thread(workflow_id)
+
+async def _settle(event, workflow_id: str, config: dict, result: dict):
+    """After a run stops: park the workflow if it hit an interrupt, otherwise finish it."""
+    snapshot = await agent_graph.aget_state(config)
+    metrics.observe_end_to_end(event.timestamp, event.source.value)
+    if snapshot.next:
+        metrics.WORKFLOWS_TOTAL.labels(outcome="interrupted").inc()
+        await _compact_checkpoints(workflow_id, parked=True)
+        await approval_service.park(workflow_id, event, snapshot.values.get("original_request", ""), list(snapshot.next))
+        logger.info("Workflow parked, waiting for approval", extra={"pending_nodes": list(snapshot.next)})
+    else:
+        metrics.WORKFLOWS_TOTAL.labels(outcome=str(result["status"].value)).inc()
+        logger.info("Workflow finished", extra={"status": result["status"].value, "audit_count": result["audit_count"]})
+        await _compact_checkpoints(workflow_id)
+
+async def resume_workflow(event):
+    """
+    Apply an approval decision to a parked workflow.
+
+    Approved runs continue from their checkpoint (the interrupted step runs
+    next; nothing before it is repeated). Rejected and expired ones are
+    audited and closed without running the step.
+    """
+    workflow_id = event.payload["workflow_id"]
+    decision = event.payload["decision"]
+    decided_by = event.payload.get("decided_by")
+    config = {"configurable": {"thread_id": workflow_id, "approved_by": decided_by}}
+    logger.info("Resuming workflow", extra={"decision": decision, "decided_by": decided_by})
+
+    if decision == "approved":
+        result = await agent_graph.ainvoke(None, config=config)
+        await _settle(event, workflow_id, config, result)
+        metrics.observe_approval_resume(event.timestamp)
+        return
+
+    snapshot = await agent_graph.aget_state(config)
+    await audit_service.log_entry(AuditLogEntry(
+        workflow_id=workflow_id,
+        action=AgentAction(
+            agent_name="ApprovalGate",
+            tool_name="approval",
+            tool_input={"pending_nodes": list(snapshot.next), "comment": event.payload.get("comment")},
+        ),
+        outcome=decision,
+        authorized_by=decided_by
+    ))
+    metrics.WORKFLOWS_TOTAL.labels(outcome=decision).inc()
+    await _compact_checkpoints(workflow_id)
+
+async def discard_workflow(event):
+    """Delete the checkpoints of a dead-lettered workflow; a redrive starts it over."""
+    if event.event_type == RESUME_EVENT_TYPE:
+        # The thread belongs to a parked workflow, not to this event
+        return
+    try:
+        await checkpointer.adelete_thread(workflow_id_for(event))
+    except Exception as e:
+        logger.warning("Failed to delete checkpoints of dead-lettered workflow", extra={"error": str(e)})
+
 async def process_event(event):
-    """Process a single event through the LangGraph agent"""
-    print(f"Processing event: {event}")
-    
-    workflow_id = str(uuid.uuid4())
+    """
+    Process a single event through the LangGraph agent.
+    Raises if the workflow fails, so the worker can schedule a retry.
+    """
+    if event.event_type == RESUME_EVENT_TYPE:
+        with correlate(workflow_id=event.payload.get("workflow_id")):
+            try:
+                return await resume_workflow(event)
+            except Exception:
+                metrics.WORKFLOWS_TOTAL.labels(outcome="error").inc()
+                logger.exception("Error resuming workflow")
+                raise
+
+    workflow_id = workflow_id_for(event)
     config = {"configurable": {"thread_id": workflow_id}}
     
     # Initialize state
@@ -18,47 +132,330 @@ async def process_event(event):
         source=event.source,
         original_request=event.payload.get("text", "No text provided"),
         plan=[],
-        current_step_index=0,
+        dependencies={},
+        completed_steps=[],
         context={},
         status=WorkflowStatus.PENDING,
         errors=[],
-        audit_trail=[],
-        next_node=None
+        audit_count=0,
+        next_nodes=[]
     )
     
-    try:
-        # Run the graph
-        # This will run until it hits an interrupt or END
-        result = await agent_graph.ainvoke(initial_state, config=config)
-        
-        # Check if we are interrupted
-        snapshot = await agent_graph.aget_state(config)
-        if snapshot.next:
-            print(f"Workflow interrupted at: {snapshot.next}. Waiting for approval...")
-            # In a real system, we would notify the approval service here.
-            # For demonstration, we could simulate approval:
-            # await agent_graph.ainvoke(None, config=config)
-        else:
-            print(f"Workflow completed: {result['status']}")
-            print(f"Audit Trail: {result['audit_trail']}")
-            
-    except Exception as e:
-        print(f"Error processing workflow: {e}")
+    with correlate(workflow_id=workflow_id):
+        logger.info("Processing event", extra={"event_type": event.event_type, "attempts": event.attempts})
+        try:
+            # A retry or redelivery finds the earlier attempt's checkpoint
+            snapshot = await agent_graph.aget_state(config)
+            if not snapshot.values:
+                # Runs until it hits an interrupt or END
+                result = await agent_graph.ainvoke(initial_state, config=config)
+            elif snapshot.next and not _parked(snapshot):
+                # Continue from the checkpoint: only the steps that failed run again
+                logger.info("Resuming workflow from checkpoint", extra={"pending_nodes": list(snapshot.next)})
+                result = await agent_graph.ainvoke(None, config=config)
+            else:
+                # The run already finished or parked; only settling it failed
+                result = snapshot.values
+            await _settle(event, workflow_id, config, result)
+        except Exception:
+            metrics.WORKFLOWS_TOTAL.labels(outcome="error").inc()
+            logger.exception("Error processing workflow")
+            raise
+
+# Backoff between failed pops (e.g. Redis unavailable), doubling up to the max
+_POP_ERROR_BACKOFF_MIN = 0.1
+_POP_ERROR_BACKOFF_MAX = 5.0
+
+class WorkflowWorker:
+    """
+    Consumes events from the queue and keeps up to `max_concurrency`
+    workflows in flight at once.
+
+    A slot is acquired *before* popping, so a saturated worker stops pulling
+    from Redis and leaves the backlog for other workers (backpressure).
+
+    Events that share an ordering key (QUEUE_SHARD_KEY) run one after another
+    in the order they were popped; different keys still run concurrently. An
+    event whose key is busy waits in that key's FIFO without holding a slot,
+    so one busy key can't starve the others. At most `max_waiting` events
+    wait this way; beyond that the worker stops popping until they drain.
+    """
+
+    def __init__(self, max_concurrency: int = None, drain_timeout: float = None, batch_size: int = None, queue=None,
+                 max_waiting: int = None):
+        self.queue = queue or queue_service
+        self.max_concurrency = max_concurrency or settings.WORKER_MAX_CONCURRENCY
+        self.batch_size = batch_size or settings.QUEUE_BATCH_SIZE
+        self.drain_timeout = drain_timeout if drain_timeout is not None else settings.WORKER_DRAIN_TIMEOUT_SECONDS
+        self.max_waiting = max_waiting or settings.WORKER_MAX_WAITING_EVENTS
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight: set[asyncio.Task] = set()
+        # Ordering key -> events waiting for the key's running task, which runs them next
+        self._key_queues: Dict[str, Deque] = {}
+        self._queued = 0
+        self._queue_space = asyncio.Event()
+        self._queue_space.set()
+        self._stopping = asyncio.Event()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def stop(self):
+        """Stop pulling new events; in-flight workflows are drained by run()."""
+        self._stopping.set()
+
+    async def _unless_stopping(self, awaitable) -> bool:
+        """Await `awaitable` unless stop() is called first. Returns whether it completed."""
+        task = asyncio.ensure_future(awaitable)
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        await asyncio.wait({task, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return task.done() and not task.cancelled()
+
+    async def _idle(self, seconds: float):
+        """Sleep, but wake up immediately if a shutdown is requested."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run_one(self, event):
+        """Run one event while holding a slot."""
+        try:
+            metrics.observe_queue_wait(event.timestamp, event.source.value)
+            metrics.WORKFLOWS_IN_FLIGHT.inc()
+            with correlate(request_id=event.request_id, source=event.source.value):
+                try:
+                    await process_event(event)
+                except Exception as e:
+                    # The retry set (or the DLQ) owns the event from here on
+                    if not await retry_service.fail(event, e):
+                        await discard_workflow(event)
+                finally:
+                    metrics.WORKFLOWS_IN_FLIGHT.dec()
+            # Only ack once the workflow has run or been handed to the retry set;
+            # a crash before this leaves the event pending for redelivery on
+            # stream-backed queues.
+            await self.queue.ack([event])
+        except Exception:
+            logger.exception("Worker error")
+        finally:
+            self._slots.release()
 
-async def run_worker():
-    """Main loop for the background worker"""
-    print("Starting worker...")
+    async def _run_key(self, key: Optional[str], event):
+        """Run `event`, then the events queued behind it for the same key, one at a time."""
+        while True:
+            await self._run_one(event)
+            waiting = self._key_queues.get(key)
+            if not waiting:
+                self._key_queues.pop(key, None)
+                return
+            event = waiting.popleft()
+            self._queued -= 1
+            self._queue_space.set()
+            # The next event of this key takes a slot only now that its predecessor is done
+            await self._slots.acquire()
+
+    def _release(self, count: int):
+        for _ in range(count):
+            self._slots.release()
+
+    def _dispatch(self, event):
+        """Start a popped event (which holds a slot), or queue it behind its key."""
+        key = shard_key(event)
+        if key is not None and key in self._key_queues:
+            self._key_queues[key].append(event)
+            self._queued += 1
+            if self._queued >= self.max_waiting:
+                self._queue_space.clear()
+            self._slots.release()
+            return
+        if key is not None:
+            self._key_queues[key] = deque()
+        task = asyncio.create_task(self._run_key(key, event))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def drain(self):
+        """Wait for in-flight workflows, cancelling any that outlive the drain timeout."""
+        if not self._in_flight:
+            return
+        logger.info("Draining in-flight workflows", extra={"in_flight": len(self._in_flight)})
+        done, pending = await asyncio.wait(set(self._in_flight), timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning("Cancelled workflows after drain timeout",
+                           extra={"cancelled": len(pending), "drain_timeout": self.drain_timeout})
+
+    async def run(self):
+        """Main loop for the background worker"""
+        logger.info("Starting worker", extra={"max_concurrency": self.max_concurrency})
+        error_backoff = _POP_ERROR_BACKOFF_MIN
+        try:
+            while not self._stopping.is_set():
+                # Events waiting behind busy keys count against the backlog too
+                if not self._queue_space.is_set():
+                    if not await self._unless_stopping(self._queue_space.wait()):
+                        break
+                    continue
+                # Backpressure: block here while all slots are busy, but let
+                # stop() through so a saturated worker still reaches drain()
+                if not await self._unless_stopping(self._slots.acquire()):
+                    break
+                if self._stopping.is_set():
+                    self._slots.release()
+                    break
+
+                # Only ask for as many events as we have free slots for
+                reserved = 1
+                while reserved < self.batch_size and not self._slots.locked():
+                    await self._slots.acquire()
+                    reserved += 1
+
+                try:
+                    events = await self.queue.pop_events(max_count=reserved)
+                except Exception as e:
+                    self._release(reserved)
+                    logger.warning("Failed to pop events, retrying", extra={"error": str(e), "retry_in": error_backoff})
+                    await self._idle(error_backoff)
+                    error_backoff = min(error_backoff * 2, _POP_ERROR_BACKOFF_MAX)
+                    continue
+                error_backoff = _POP_ERROR_BACKOFF_MIN
+
+                # pop_events already blocked for the read timeout if nothing came back
+                self._release(reserved - len(events))
+                for event in events:
+                    self._dispatch(event)
+        finally:
+            await self.drain()
+        logger.info("Worker stopped")
+
+async def _poll_queue_depth(queue, interval: float):
+    """Keep the queue-depth gauge fresh for the worker's exporter."""
     while True:
         try:
-            event = await queue_service.pop_event()
-            if event:
-                await process_event(event)
-            else:
-                # Sleep briefly to avoid tight loop
-                await asyncio.sleep(1)
+            metrics.QUEUE_DEPTH.set(await queue.depth())
+        except Exception as e:
+            logger.warning("Queue depth poll failed", extra={"error": str(e)})
+        await asyncio.sleep(interval)
+
+async def _expire_approvals(interval: float):
+    """Close approvals nobody decided on before APPROVAL_TTL_SECONDS."""
+    while True:
+        try:
+            expired = await approval_service.expire_due()
+            if expired:
+                logger.info("Expired pending approvals", extra={"count": expired})
         except Exception as e:
-            print(f"Worker error: {e}")
-            await asyncio.sleep(5)
+            logger.warning("Approval expiry failed", extra={"error": str(e)})
+        await asyncio.sleep(interval)
+
+async def _collect_blobs(interval: float):
+    """Delete context blobs past CONTEXT_BLOB_RETENTION_SECONDS."""
+    while True:
+        try:
+            removed = await blob_store.gc()
+            if removed:
+                logger.info("Removed expired context blobs", extra={"count": removed})
+        except Exception as e:
+            logger.warning("Context blob GC failed", extra={"error": str(e)})
+        await asyncio.sleep(interval)
+
+async def _promote_retries(interval: float):
+    """Move due retries back onto the queue."""
+    while True:
+        try:
+            moved = await retry_service.promote_due()
+            if moved:
+                logger.info("Re-queued events for retry", extra={"count": moved})
+                # There may be more due; don't wait a full interval
+                continue
+        except Exception as e:
+            logger.warning("Retry promotion failed", extra={"error": str(e)})
+        await asyncio.sleep(interval)
+
+async def run_worker(max_concurrency: int = None, shard: int = None):
+    """Run a worker until SIGINT/SIGTERM, then drain in-flight workflows."""
+    if isinstance(queue_service, ShardedQueueService):
+        if shard is None:
+            raise ValueError(f"QUEUE_SHARDS={settings.QUEUE_SHARDS}: pass the shard this worker consumes")
+        queue = queue_service.shard(shard)
+    elif shard not in (None, 0):
+        raise ValueError(f"Shard {shard} requested but QUEUE_SHARDS={settings.QUEUE_SHARDS}")
+    else:
+        queue = queue_service
+
+    configure_logging()
+    await init_db()
+    if settings.WORKER_METRICS_PORT:
+        metrics.start_http_server(settings.WORKER_METRICS_PORT + (shard or 0))
+    depth_poller = asyncio.create_task(_poll_queue_depth(queue, settings.METRICS_QUEUE_DEPTH_INTERVAL_SECONDS))
+    retry_promoter = asyncio.create_task(_promote_retries(settings.RETRY_POLL_INTERVAL_SECONDS))
+    approval_expirer = asyncio.create_task(_expire_approvals(settings.APPROVAL_EXPIRY_POLL_SECONDS))
+    blob_collector = asyncio.create_task(_collect_blobs(settings.CONTEXT_BLOB_GC_INTERVAL_SECONDS))
+    worker = WorkflowWorker(max_concurrency=max_concurrency, queue=queue)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            # Signal handlers are not available on Windows event loops
+            pass
+    try:
+        await worker.run()
+    finally:
+        depth_poller.cancel()
+        retry_promoter.cancel()
+        approval_expirer.cancel()
+        blob_collector.cancel()
+        await slack_tool.close()
+        await audit_service.close()
+        shutdown_logging()
+
+def _run_shard(shard: int, max_concurrency: int = None):
+    asyncio.run(run_worker(max_concurrency=max_concurrency, shard=shard))
+
+def run_sharded_workers(max_concurrency: int = None):
+    """
+    Start one worker process per shard and wait for them.
+
+    SIGINT/SIGTERM are forwarded so every shard drains before exiting.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_run_shard, args=(shard, max_concurrency), name=f"worker-shard-{shard}")
+        for shard in range(settings.QUEUE_SHARDS)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, forward)
+    # Ctrl-C already reaches the children through the process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for process in processes:
+        process.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Workflow worker")
+    parser.add_argument("--shard", type=int, default=settings.WORKER_SHARD, help="shard to consume (default: all, one process each)")
+    parser.add_argument("--concurrency", type=int, default=None, help="max in-flight workflows per process")
+    args = parser.parse_args()
+
+    if settings.QUEUE_SHARDS > 1 and args.shard is None:
+        run_sharded_workers(args.concurrency)
+    else:
+        asyncio.run(run_worker(max_concurrency=args.concurrency, shard=args.shard))
 
 if __name__ == "__main__":
-    asyncio.run(run_worker())
+    main()
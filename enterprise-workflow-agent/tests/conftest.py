@@ -0,0 +1,40 @@
+"""
+Unit tests run against fakeredis and never need Redis or Postgres:
+
+    pip install -r tests/requirements.txt
+    python -m pytest -q
+
+The PostgresCheckpointer tests are skipped unless TEST_DATABASE_URL points
+at a throwaway database (see test_checkpointer.py).
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import fakeredis
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import settings  # noqa: E402
+
+# Before anything imports the graph: keep checkpoints and blobs in process
+settings.CHECKPOINT_BACKEND = "memory"
+settings.CONTEXT_BLOB_BACKEND = "local"
+settings.CONTEXT_BLOB_DIR = tempfile.mkdtemp(prefix="blobs-")
+
+from src.schemas.events import EventSource, IngestEvent  # noqa: E402
+
+def run(coro):
+    """Run a coroutine to completion (tests are plain functions, no async plugin needed)."""
+    return asyncio.run(coro)
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis()
+
+def make_event(text: str = "hello", **fields) -> IngestEvent:
+    fields.setdefault("source", EventSource.SLACK)
+    fields.setdefault("event_type", "message")
+    return IngestEvent(payload={"text": text, "channel": "C1"}, **fields)
@@ -0,0 +1,76 @@
+import pytest
+
+from conftest import make_event, run
+from src.core.config import settings
+from src.core.rate_limit import TokenBucket
+from src.schemas.events import EventSource
+from src.services.admission import AdmissionController, AdmissionRejected
+
+class FakeQueue:
+    def __init__(self, depth=0, fail=False):
+        self._depth = depth
+        self.fail = fail
+        self.calls = 0
+
+    async def depth(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self._depth
+
+@pytest.fixture(autouse=True)
+def depth_limits(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_SHED_DEPTH", 100)
+    monkeypatch.setattr(settings, "INGEST_MAX_QUEUE_DEPTH", 1000)
+    monkeypatch.setattr(settings, "INGEST_DEPTH_CACHE_SECONDS", 60)
+
+def test_token_bucket_allows_burst_then_reports_wait():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.take() == 0 and bucket.take() == 0
+    assert 0 < bucket.take() <= 0.1
+    bucket.refund()
+    assert bucket.take() == 0
+
+def test_rate_limit_per_source_and_priority():
+    async def scenario():
+        controller = AdmissionController(FakeQueue(), rates={"slack:bulk": 1.0}, shed_policy="off")
+        await controller.admit(make_event(priority="bulk"), count=2)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.admit(make_event(priority="bulk"))
+        assert rejected.value.reason == "rate_limited"
+        assert rejected.value.retry_after >= 1
+        # Other priorities and sources have no bucket
+        await controller.admit(make_event())
+        await controller.admit(make_event(source=EventSource.JIRA))
+    run(scenario())
+
+def test_bulk_is_shed_first():
+    async def scenario():
+        controller = AdmissionController(FakeQueue(depth=500), rates={}, shed_policy="bulk_first")
+        with pytest.raises(AdmissionRejected, match="queue_full"):
+            await controller.admit(make_event(priority="bulk"))
+        await controller.admit(make_event())
+    run(scenario())
+
+def test_everything_is_rejected_above_max_depth():
+    async def scenario():
+        controller = AdmissionController(FakeQueue(depth=1000), rates={}, shed_policy="bulk_first")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.admit(make_event())
+        assert rejected.value.retry_after == settings.INGEST_OVERLOAD_RETRY_AFTER_SECONDS
+    run(scenario())
+
+def test_depth_is_cached():
+    async def scenario():
+        queue = FakeQueue(depth=10)
+        controller = AdmissionController(queue, rates={}, shed_policy="reject")
+        for _ in range(5):
+            await controller.admit(make_event())
+        assert queue.calls == 1
+    run(scenario())
+
+def test_fails_open_when_depth_is_unavailable():
+    async def scenario():
+        controller = AdmissionController(FakeQueue(fail=True), rates={}, shed_policy="reject")
+        await controller.admit(make_event())
+    run(scenario())
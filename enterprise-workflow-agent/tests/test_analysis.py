@@ -0,0 +1,35 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src.agent.tools.analysis import AnalysisEngine, Frame
+
+def test_number_like_strings_stay_categorical():
+    frame = Frame.from_result({"zip": ["00123", "00123", "10001", None], "amount": [1, 2.5, Decimal("3"), None]})
+    assert not frame.columns["zip"].numeric
+    assert list(frame.columns["zip"].categories) == ["00123", "10001"]
+    assert list(frame.columns["zip"].codes) == [0, 0, 1, -1]
+    assert frame.columns["amount"].numeric
+    np.testing.assert_array_equal(frame.columns["amount"].values, [1.0, 2.5, 3.0, np.nan])
+
+def test_row_dicts_and_columnar_envelope_agree():
+    rows = [{"id": 1, "v": 2.0}, {"id": 2, "v": None}]
+    envelope = {"columns": ["id", "v"], "data": {"id": [1, 2], "v": [2.0, None]}, "row_count": 2}
+    a, b = Frame.from_result(rows), Frame.from_result(envelope)
+    assert a.row_count == b.row_count == 2
+    np.testing.assert_array_equal(a.columns["v"].values, b.columns["v"].values)
+
+def test_a_column_named_data_is_not_unwrapped():
+    assert set(Frame.from_result({"data": [1, 2], "x": [3, 4]}).columns) == {"data", "x"}
+
+def test_rows_must_be_dicts():
+    with pytest.raises(ValueError, match="row dicts"):
+        Frame.from_result([[1, 2], [3, 4]])
+
+def test_outliers_and_zero_thresholds():
+    engine = AnalysisEngine(outlier_threshold=0)
+    assert engine.outlier_threshold == 0
+    result = AnalysisEngine().analyze({"v": [10, 11, 10, 12, 11, 500]})
+    assert result["anomalies"]["v"]["count"] == 1
+    assert result["anomalies"]["v"]["examples"][0]["row"] == 5
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from conftest import make_event, run
+from src.services.approvals import RESUME_EVENT_TYPE, ApprovalService
+from src.services.queue import QueueService
+
+def _service(redis, ttl=60):
+    queue = QueueService(redis, name="test:queue")
+    return queue, ApprovalService(redis, queue=queue, ttl=ttl)
+
+def test_park_lists_pending(redis):
+    async def scenario():
+        _, approvals = _service(redis)
+        await approvals.park("wf1", make_event(), "send the report", ["communication_node"])
+        assert await approvals.count() == 1
+        [pending] = await approvals.list_pending()
+        assert pending.workflow_id == "wf1" and pending.pending_nodes == ["communication_node"]
+    run(scenario())
+
+def test_decision_queues_resume_event_ahead_of_new_work(redis):
+    async def scenario():
+        queue, approvals = _service(redis)
+        await queue.push_events([make_event(str(i)) for i in range(3)])
+        await approvals.park("wf1", make_event(), "send the report", ["communication_node"])
+        assert (await approvals.decide("wf1", True, "alice", "ok")).workflow_id == "wf1"
+
+        events = await queue.pop_events(10, timeout=0)
+        assert events[0].event_type == RESUME_EVENT_TYPE
+        assert events[0].payload == {"workflow_id": "wf1", "decision": "approved", "decided_by": "alice", "comment": "ok"}
+        assert [e.event_type for e in events[1:]] == ["message"] * 3
+        assert await approvals.count() == 0
+    run(scenario())
+
+def test_only_one_concurrent_decision_wins(redis):
+    async def scenario():
+        queue, approvals = _service(redis)
+        await approvals.park("wf1", make_event(), "send the report", ["communication_node"])
+        results = await asyncio.gather(*[approvals.decide("wf1", i % 2 == 0, f"user{i}") for i in range(5)])
+        assert sum(result is not None for result in results) == 1
+        assert await queue.depth() == 1
+        assert await approvals.decide("wf1", True, "late") is None
+    run(scenario())
+
+def test_failed_push_parks_the_workflow_again(redis):
+    class BrokenQueue:
+        async def push_event(self, event):
+            raise ConnectionError("queue down")
+
+    async def scenario():
+        approvals = ApprovalService(redis, queue=BrokenQueue(), ttl=60)
+        await approvals.park("wf1", make_event(), "send the report", ["communication_node"])
+        with pytest.raises(ConnectionError):
+            await approvals.decide("wf1", True, "alice")
+        assert (await approvals.get("wf1")) is not None
+        assert await approvals.count() == 1
+    run(scenario())
+
+def test_expired_approvals_resume_as_expired(redis):
+    async def scenario():
+        queue, approvals = _service(redis, ttl=-1)
+        await approvals.park("wf1", make_event(), "send the report", ["communication_node"])
+        assert await approvals.expire_due() == 1
+        assert await approvals.expire_due() == 0
+        [event] = await queue.pop_events(10, timeout=0)
+        assert event.payload["decision"] == "expired"
+        assert await approvals.decide("wf1", True, "alice") is None
+    run(scenario())
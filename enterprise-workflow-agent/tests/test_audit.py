@@ -0,0 +1,147 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from conftest import run
+from src.core.config import settings
+from src.schemas.events import AgentAction, AuditLogEntry
+from src.services.audit import AuditService
+
+class FakeEngine:
+    """Records each batch INSERT; fails the next `failures` of them, or holds them until `gate` is set."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+        self.gate = None
+
+    @asynccontextmanager
+    async def begin(self):
+        yield self
+
+    async def execute(self, statement, rows):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        self.batches.append([row["workflow_id"] for row in rows])
+
+    @property
+    def written(self):
+        return [workflow_id for batch in self.batches for workflow_id in batch]
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_RETRY_BASE_DELAY_SECONDS", 0.01)
+
+def _entry(workflow_id):
+    return AuditLogEntry(
+        workflow_id=workflow_id,
+        action=AgentAction(agent_name="TestAgent", tool_name="test", tool_input={}),
+        outcome="success",
+        authorized_by=None,
+    )
+
+def _service(engine, **kwargs):
+    kwargs = {"batch_size": 100, "flush_interval": 60, **kwargs}
+    return AuditService(engine=engine, **kwargs)
+
+async def _log(audit, *workflow_ids):
+    for workflow_id in workflow_ids:
+        await audit.log_entry(_entry(workflow_id))
+
+def test_full_batch_is_written_without_waiting_for_the_interval():
+    engine = FakeEngine()
+
+    async def scenario():
+        audit = _service(engine, batch_size=3)
+        await _log(audit, "a", "b", "c")
+        await asyncio.sleep(0.01)
+        assert engine.batches == [["a", "b", "c"]]
+        await _log(audit, "d")
+        await asyncio.sleep(0.01)
+        assert engine.batches == [["a", "b", "c"]]
+        assert audit.pending == 1
+        await audit.close()
+    run(scenario())
+
+def test_partial_batch_is_written_after_the_interval():
+    engine = FakeEngine()
+
+    async def scenario():
+        audit = _service(engine, flush_interval=0.05)
+        await _log(audit, "a", "b")
+        await asyncio.sleep(0.01)
+        assert engine.batches == []
+        await asyncio.sleep(0.1)
+        assert engine.batches == [["a", "b"]]
+        await audit.close()
+    run(scenario())
+
+def test_retry_policy_keeps_a_failed_batch():
+    engine = FakeEngine(failures=1)
+
+    async def scenario():
+        audit = _service(engine, batch_size=2, failure_policy="retry")
+        await _log(audit, "a", "b")
+        await asyncio.sleep(0.1)
+        assert engine.written == ["a", "b"]
+        assert (audit.failed_flushes, audit.dropped, audit.written) == (1, 0, 2)
+        await audit.close()
+    run(scenario())
+
+def test_drop_policy_discards_a_failed_batch():
+    engine = FakeEngine(failures=1)
+
+    async def scenario():
+        audit = _service(engine, batch_size=2, failure_policy="drop")
+        await _log(audit, "a", "b")
+        await asyncio.sleep(0.01)
+        await _log(audit, "c")
+        await audit.close()
+        assert engine.written == ["c"]
+        assert (audit.failed_flushes, audit.dropped, audit.written) == (1, 2, 1)
+    run(scenario())
+
+def test_block_overflow_waits_for_the_flusher():
+    engine = FakeEngine()
+
+    async def scenario():
+        engine.gate = asyncio.Event()
+        audit = _service(engine, max_entries=2, overflow_policy="block")
+        await _log(audit, "a", "b")
+        writer = asyncio.create_task(_log(audit, "c"))
+        await asyncio.sleep(0.01)
+        assert not writer.done()
+        engine.gate.set()
+        await asyncio.wait_for(writer, 1)
+        await audit.close()
+        assert engine.written == ["a", "b", "c"]
+        assert audit.dropped == 0
+    run(scenario())
+
+def test_drop_oldest_overflow_keeps_the_newest_entries():
+    engine = FakeEngine()
+
+    async def scenario():
+        audit = _service(engine, max_entries=2, overflow_policy="drop_oldest")
+        await _log(audit, "a", "b", "c")
+        assert audit.dropped == 1
+        await audit.close()
+        assert engine.written == ["b", "c"]
+    run(scenario())
+
+def test_close_flushes_what_is_left():
+    engine = FakeEngine()
+
+    async def scenario():
+        audit = _service(engine, batch_size=2)
+        await _log(audit, "a", "b", "c")
+        await audit.close()
+        assert engine.written == ["a", "b", "c"]
+        assert audit.pending == 0
+        with pytest.raises(RuntimeError, match="closed"):
+            await _log(audit, "d")
+    run(scenario())
@@ -0,0 +1,53 @@
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from conftest import run
+from src.services.blob_store import BlobStore, LocalBlobStore, is_blob_ref
+
+ROWS = {
+    "columns": ["id", "amount", "created_at", "day", "note"],
+    "data": {
+        "id": [uuid.UUID(int=i) for i in range(3)],
+        "amount": [Decimal("1.10"), Decimal("22.00"), None],
+        "created_at": [datetime(2024, 1, 1, 12, 30)] * 3,
+        "day": [date(2024, 1, 1)] * 3,
+        "note": ["a", "b", "c"],
+    },
+    "row_count": 3,
+}
+
+def test_offloaded_values_keep_their_types(tmp_path):
+    async def scenario():
+        store = LocalBlobStore(root=str(tmp_path), min_bytes=0)
+        ref = await store.offload(ROWS)
+        assert is_blob_ref(ref)
+        assert await store.resolve(ref) == ROWS
+    run(scenario())
+
+def test_small_values_stay_inline(tmp_path):
+    async def scenario():
+        store = LocalBlobStore(root=str(tmp_path), min_bytes=1_000_000)
+        assert await store.offload(ROWS) is ROWS
+        assert await store.resolve(ROWS) is ROWS
+    run(scenario())
+
+def test_identical_values_are_stored_once(tmp_path):
+    async def scenario():
+        store = LocalBlobStore(root=str(tmp_path), min_bytes=0)
+        assert await store.offload(ROWS) == await store.offload(dict(ROWS))
+        assert len(list(tmp_path.rglob("*"))) == 2  # fan-out directory + one blob
+    run(scenario())
+
+def test_missing_blob_raises(tmp_path):
+    async def scenario():
+        store = LocalBlobStore(root=str(tmp_path), min_bytes=0)
+        with pytest.raises(KeyError):
+            await store.resolve({"$blob": "0" * 64, "bytes": 1})
+    run(scenario())
+
+def test_backends_must_implement_the_storage_hooks():
+    with pytest.raises(TypeError):
+        BlobStore()
@@ -0,0 +1,143 @@
+"""
+PostgresCheckpointer against a throwaway database: set TEST_DATABASE_URL,
+e.g. postgresql+asyncpg://postgres:@/workflow_agent?host=/tmp/pgdata
+"""
+import operator
+import os
+import uuid
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.graph import END, START, StateGraph
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from conftest import run
+from src.agent.checkpointer import PostgresCheckpointer, build_serde
+from src.core.models import checkpoints_table
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+@pytest.fixture
+def saver():
+    # NullPool: every test runs its own event loop, so connections must not be reused
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+    saver = PostgresCheckpointer(engine=engine, serde=build_serde(), compress_min_bytes=64)
+    run(saver.setup())
+    saver.threads = []
+    yield saver
+    async def cleanup():
+        for thread_id in saver.threads:
+            await saver.adelete_thread(thread_id)
+        await engine.dispose()
+    run(cleanup())
+
+def _config(saver):
+    thread_id = f"test-{uuid.uuid4()}"
+    saver.threads.append(thread_id)
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+def _checkpoint(values, versions):
+    checkpoint = empty_checkpoint()
+    checkpoint["id"] = str(uuid6())
+    checkpoint["channel_values"] = values
+    checkpoint["channel_versions"] = versions
+    return checkpoint
+
+async def _count(saver, thread_id):
+    async with saver.engine.connect() as conn:
+        return await conn.scalar(
+            select(func.count()).select_from(checkpoints_table).where(checkpoints_table.c.thread_id == thread_id)
+        )
+
+def test_put_get_and_list(saver):
+    config = _config(saver)
+
+    async def scenario():
+        first = await saver.aput(config, _checkpoint({"a": 1, "big": "x" * 500}, {"a": "1", "big": "1"}),
+                                 {"source": "input", "step": -1}, {"a": "1", "big": "1"})
+        # Second step only changes "a"; "big" is read back from the first step's blob
+        second = await saver.aput(first, _checkpoint({"a": 2, "big": "x" * 500}, {"a": "2", "big": "1"}),
+                                  {"source": "loop", "step": 0}, {"a": "2"})
+
+        latest = await saver.aget_tuple(config)
+        assert latest.config["configurable"]["checkpoint_id"] == second["configurable"]["checkpoint_id"]
+        assert latest.checkpoint["channel_values"] == {"a": 2, "big": "x" * 500}
+        assert latest.parent_config["configurable"]["checkpoint_id"] == first["configurable"]["checkpoint_id"]
+        assert latest.metadata["step"] == 0
+
+        older = await saver.aget_tuple(first)
+        assert older.checkpoint["channel_values"]["a"] == 1 and older.parent_config is None
+
+        listed = [t.metadata["step"] async for t in saver.alist(config)]
+        assert listed == [0, -1]
+        assert [t.metadata["step"] async for t in saver.alist(config, filter={"source": "input"})] == [-1]
+        assert [t.metadata["step"] async for t in saver.alist(config, before=second)] == [-1]
+        assert [t.metadata["step"] async for t in saver.alist(config, limit=1)] == [0]
+    run(scenario())
+
+def test_pending_writes(saver):
+    config = _config(saver)
+
+    async def scenario():
+        saved = await saver.aput(config, _checkpoint({"a": 1}, {"a": "1"}), {"step": 0}, {"a": "1"})
+        await saver.aput_writes(saved, [("a", 2), ("b", "x")], task_id="task-1")
+        await saver.aput_writes(saved, [("__error__", "first")], task_id="task-2")
+        # Special writes replace the earlier one; regular writes are kept once
+        await saver.aput_writes(saved, [("__error__", "second")], task_id="task-2")
+        await saver.aput_writes(saved, [("a", 3)], task_id="task-1")
+
+        writes = (await saver.aget_tuple(config)).pending_writes
+        assert sorted(writes) == [("task-1", "a", 2), ("task-1", "b", "x"), ("task-2", "__error__", "second")]
+    run(scenario())
+
+class _State(TypedDict):
+    log: Annotated[List[str], operator.add]
+
+def test_prune_keeps_a_parked_workflow_resumable(saver):
+    config = _config(saver)
+    calls = []
+
+    def step(name, fail=False):
+        def node(state):
+            calls.append(name)
+            if fail and calls.count(name) == 1:
+                raise RuntimeError(f"{name} failed")
+            return {"log": [name]}
+        return node
+
+    # "sent" and "flaky" run in one superstep; "flaky" fails once, leaving
+    # "sent"'s output as a pending write, and "report" waits for approval
+    builder = StateGraph(_State)
+    builder.add_node("sent", step("sent"))
+    builder.add_node("flaky", step("flaky", fail=True))
+    builder.add_node("report", step("report"))
+    builder.add_edge(START, "sent")
+    builder.add_edge(START, "flaky")
+    builder.add_edge(["sent", "flaky"], "report")
+    builder.add_edge("report", END)
+    graph = builder.compile(checkpointer=saver, interrupt_before=["report"])
+
+    async def scenario():
+        thread_id = config["configurable"]["thread_id"]
+        with pytest.raises(RuntimeError):
+            await graph.ainvoke({"log": []}, config)
+        await saver.aprune([thread_id])
+        assert await _count(saver, thread_id) == 1
+
+        # Retry: only the failed task runs again, then the graph parks before "report"
+        await graph.ainvoke(None, config)
+        assert sorted(calls) == ["flaky", "flaky", "sent"]
+        assert (await graph.aget_state(config)).next == ("report",)
+
+        await saver.aprune([thread_id])
+        assert await _count(saver, thread_id) == 1
+        result = await graph.ainvoke(None, config)
+        assert sorted(result["log"]) == ["flaky", "report", "sent"]
+        assert calls.count("sent") == 1 and calls.count("report") == 1
+    run(scenario())
@@ -0,0 +1,46 @@
+from conftest import run
+from src.services.dedup import EventDeduplicator, dedup_key
+
+def test_dedup_key_prefers_slack_event_id():
+    assert dedup_key({"event_id": "Ev1", "request_id": "r1"}) == "Ev1"
+    assert dedup_key({"request_id": "r1"}) == "r1"
+    assert dedup_key({}) is None
+
+def test_second_claim_is_a_duplicate(redis):
+    async def scenario():
+        dedup = EventDeduplicator(redis, ttl=60)
+        assert await dedup.claim("Ev1")
+        assert not await dedup.claim("Ev1")
+        # Another API process has its own LRU but shares Redis
+        assert not await EventDeduplicator(redis, ttl=60).claim("Ev1")
+    run(scenario())
+
+def test_duplicates_within_one_batch_lose(redis):
+    async def scenario():
+        dedup = EventDeduplicator(redis, ttl=60)
+        assert await dedup.claim_many(["a", "b", "a", "c"]) == [True, True, False, True]
+    run(scenario())
+
+def test_claims_expire_with_the_ttl(redis):
+    async def scenario():
+        await EventDeduplicator(redis, ttl=60).claim("Ev1")
+        assert 0 < await redis.ttl("ingest:seen:Ev1") <= 60
+    run(scenario())
+
+def test_release_lets_a_retry_through(redis):
+    async def scenario():
+        dedup = EventDeduplicator(redis, ttl=60)
+        await dedup.claim("Ev1")
+        await dedup.release(["Ev1"])
+        assert await dedup.claim("Ev1")
+    run(scenario())
+
+def test_local_cache_answers_without_redis(redis):
+    async def scenario():
+        dedup = EventDeduplicator(redis, ttl=60, local_size=2)
+        await dedup.claim_many(["a", "b", "c"])
+        assert list(dedup._recent) == ["b", "c"]
+        await redis.flushall()
+        # "c" is still known locally, "a" was evicted and has to ask Redis again
+        assert await dedup.claim_many(["c", "a"]) == [False, True]
+    run(scenario())
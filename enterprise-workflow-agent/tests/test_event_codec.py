@@ -0,0 +1,59 @@
+import ormsgpack
+import pytest
+
+from conftest import make_event
+from src.services import event_codec
+from src.services.event_codec import decode_event, decode_events, encode_event, is_json
+
+def _msgpack(values, version=event_codec.WIRE_VERSION):
+    return bytes((0xC1, version, 0)) + ormsgpack.packb(values)
+
+@pytest.mark.parametrize("wire_format", ["msgpack", "json"])
+def test_round_trip(wire_format):
+    event = make_event(request_id="r1", priority="bulk", attempts=2)
+    data = encode_event(event, wire_format)
+    assert is_json(data) == (wire_format == "json")
+    assert decode_event(data) == event
+
+def test_large_event_is_compressed_and_round_trips():
+    event = make_event("x" * 50_000)
+    data = encode_event(event, "msgpack")
+    assert data[2] & event_codec._FLAG_ZSTD
+    assert len(data) < 50_000
+    assert decode_event(data) == event
+
+def test_batch_of_mixed_formats():
+    events = [make_event(str(i)) for i in range(4)]
+    items = [encode_event(e, "msgpack" if i % 2 else "json") for i, e in enumerate(events)]
+    assert decode_events(items) == events
+
+def test_reads_fields_appended_by_a_newer_writer():
+    event = make_event(request_id="r1")
+    values = [event.source.value, event.event_type, event.payload, event.timestamp,
+              event.request_id, event.priority, event.attempts, "field from the future"]
+    assert decode_event(_msgpack(values)) == event
+
+def test_defaults_fields_an_older_writer_did_not_send():
+    event = make_event(request_id="r1")
+    values = [event.source.value, event.event_type, event.payload, event.timestamp, event.request_id]
+    decoded = decode_event(_msgpack(values, version=1))
+    assert decoded.priority == "normal"
+    assert decoded.attempts == 0
+    assert decoded.payload == event.payload
+
+def test_rejects_unknown_version():
+    data = bytearray(encode_event(make_event(), "msgpack"))
+    data[1] = 99
+    with pytest.raises(ValueError, match="version"):
+        decode_event(bytes(data))
+
+def test_rejects_truncated_body():
+    with pytest.raises(ValueError):
+        decode_event(_msgpack(["slack", "message"]))
+
+def test_batch_drops_only_the_malformed_item():
+    good = [encode_event(make_event(str(i)), "msgpack") for i in range(3)]
+    assert len(decode_events(good[:1] + [b"\xc1\x01\x00garbage"] + good[1:])) == 3
+
+def test_writes_json_by_default_for_rolling_upgrades():
+    assert encode_event(make_event()).startswith(b"{")
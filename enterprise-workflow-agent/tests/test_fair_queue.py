@@ -0,0 +1,104 @@
+from conftest import make_event, run
+from src.schemas.events import EventSource
+from src.services.queue import FairQueueService, QueueService, StreamQueueService
+
+WEIGHTS = {"default": 1, "slack": 3, "email": 1}
+
+def _list_lanes(redis):
+    return FairQueueService({lane: QueueService(redis, name=f"test:{lane}") for lane in WEIGHTS}, WEIGHTS)
+
+def _stream_lanes(redis):
+    return FairQueueService(
+        {lane: StreamQueueService(redis, stream=f"test:{lane}", group="workers", consumer="c") for lane in WEIGHTS},
+        WEIGHTS,
+    )
+
+def _events(source, count):
+    return [make_event(f"{source.value}{i}", source=source) for i in range(count)]
+
+def _sources(events):
+    return [event.source.value for event in events]
+
+def test_allot_splits_by_weight_and_interleaves():
+    queue = _list_lanes(None)
+    assert queue._allot(["slack", "email"], 8) == {"slack": 6, "email": 2}
+    # Smooth WRR: single pops follow the weights instead of bursting one lane
+    picks = [next(lane for lane, n in queue._allot(["slack", "email"], 1).items() if n) for _ in range(4)]
+    assert picks == ["slack", "slack", "email", "slack"]
+
+def test_allot_credit_carries_over_between_calls():
+    queue = _list_lanes(None)
+    # One pop at a time still adds up to the weights over a full round
+    counts = {"slack": 0, "email": 0}
+    for _ in range(8):
+        for lane, n in queue._allot(["slack", "email"], 1).items():
+            counts[lane] += n
+    assert counts == {"slack": 6, "email": 2}
+
+def test_pop_shares_a_batch_by_weight(redis):
+    async def scenario():
+        queue = _list_lanes(redis)
+        await queue.push_events(_events(EventSource.SLACK, 10) + _events(EventSource.EMAIL, 10))
+        assert sorted(_sources(await queue.pop_events(max_count=8, timeout=0))) == ["email"] * 2 + ["slack"] * 6
+    run(scenario())
+
+def test_share_of_a_drained_lane_goes_to_the_others(redis):
+    async def scenario():
+        queue = _list_lanes(redis)
+        await queue.push_events(_events(EventSource.SLACK, 10) + _events(EventSource.EMAIL, 1))
+        events = await queue.pop_events(max_count=8, timeout=0)
+        assert sorted(_sources(events)) == ["email"] + ["slack"] * 7
+        # Drained lanes start from zero credit
+        assert queue._credit["email"] == 0 and queue._credit["default"] == 0
+    run(scenario())
+
+def test_lanes_are_popped_in_one_round_trip(redis, monkeypatch):
+    rounds = []
+    pop_each = QueueService.pop_each
+
+    async def counting(requests):
+        rounds.append(len(requests))
+        return await pop_each(requests)
+
+    monkeypatch.setattr(QueueService, "pop_each", staticmethod(counting))
+    monkeypatch.setattr(QueueService, "pop_events", None)  # no per-lane pops
+
+    async def scenario():
+        queue = _list_lanes(redis)
+        await queue.push_events([
+            *_events(EventSource.SLACK, 10), *_events(EventSource.EMAIL, 10), *_events(EventSource.JIRA, 10),
+        ])
+        assert len(await queue.pop_events(max_count=10, timeout=0)) == 10
+    run(scenario())
+    assert rounds == [3]
+
+def test_stream_lanes_are_popped_by_weight(redis):
+    async def scenario():
+        queue = _stream_lanes(redis)
+        await queue.push_events(_events(EventSource.SLACK, 10) + _events(EventSource.EMAIL, 1))
+        events = await queue.pop_events(max_count=4, timeout=0)
+        assert sorted(_sources(events)) == ["email"] + ["slack"] * 3
+        assert all(event._delivery_id for event in events)
+    run(scenario())
+
+async def _nothing_yet(requests):
+    for stream, _ in requests:
+        await stream.ensure_group()
+    return [[] for _ in requests]
+
+def test_surplus_of_a_blocking_read_is_carried_to_the_next_pop(redis, monkeypatch):
+    pop_each = StreamQueueService.pop_each
+
+    async def scenario():
+        queue = _stream_lanes(redis)
+        await queue.push_events(_events(EventSource.SLACK, 1) + _events(EventSource.EMAIL, 1))
+        # The entries arrive after the non-blocking pass found every lane empty
+        monkeypatch.setattr(StreamQueueService, "pop_each", staticmethod(_nothing_yet))
+        first = await queue.pop_events(max_count=1, timeout=1)
+        # XREADGROUP returns one entry per stream: one is handed out, the other kept
+        assert len(first) == 1 and len(queue._carry) == 1
+        monkeypatch.setattr(StreamQueueService, "pop_each", pop_each)
+        second = await queue.pop_events(max_count=1, timeout=0)
+        assert sorted(_sources(first + second)) == ["email", "slack"]
+        assert queue._carry == []
+    run(scenario())
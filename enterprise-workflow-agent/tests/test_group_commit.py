@@ -0,0 +1,84 @@
+import asyncio
+
+import fakeredis
+from redis.exceptions import ConnectionError
+
+from conftest import make_event, run
+from src.services.group_commit import GroupCommitter
+from src.services.queue import QueueService
+
+class CountingQueue(QueueService):
+    def __init__(self, client):
+        super().__init__(client, name="test:queue")
+        self.pushes = []
+
+    async def push_events(self, events):
+        self.pushes.append(len(events))
+        return await super().push_events(events)
+
+async def _texts(queue):
+    return [event.payload["text"] for event in await queue.pop_events(100, timeout=0)]
+
+def test_concurrent_submits_share_one_push(redis):
+    async def scenario():
+        queue = CountingQueue(redis)
+        committer = GroupCommitter(queue, window_ms=20, max_batch=100)
+        await asyncio.gather(*(committer.submit(make_event(str(i))) for i in range(5)))
+        assert queue.pushes == [5]
+        assert await _texts(queue) == ["0", "1", "2", "3", "4"]
+    run(scenario())
+
+def test_full_group_is_pushed_without_waiting_for_the_window(redis):
+    async def scenario():
+        queue = CountingQueue(redis)
+        committer = GroupCommitter(queue, window_ms=10_000, max_batch=3)
+        await asyncio.wait_for(asyncio.gather(*(committer.submit(make_event(str(i))) for i in range(3))), 1)
+        assert queue.pushes == [3]
+        # The next event opens a new window
+        late = asyncio.create_task(committer.submit(make_event("3")))
+        await asyncio.sleep(0.01)
+        assert not late.done()
+        await committer.close()
+        await late
+        assert queue.pushes == [3, 1]
+    run(scenario())
+
+def test_submits_after_the_window_form_a_new_group(redis):
+    async def scenario():
+        queue = CountingQueue(redis)
+        committer = GroupCommitter(queue, window_ms=5, max_batch=100)
+        await committer.submit_many([make_event("a"), make_event("b")])
+        await committer.submit(make_event("c"))
+        assert queue.pushes == [2, 1]
+        assert await _texts(queue) == ["a", "b", "c"]
+    run(scenario())
+
+def test_every_waiter_of_a_failed_group_gets_the_error():
+    server = fakeredis.FakeServer()
+    queue = CountingQueue(fakeredis.FakeAsyncRedis(server=server))
+
+    async def scenario():
+        committer = GroupCommitter(queue, window_ms=10, max_batch=100)
+        server.connected = False
+        results = await asyncio.gather(*(committer.submit(make_event(str(i))) for i in range(4)),
+                                       return_exceptions=True)
+        assert queue.pushes == [4]
+        assert isinstance(results[0], ConnectionError)
+        assert all(result is results[0] for result in results)
+
+        # The failure doesn't stick: the next group goes through
+        server.connected = True
+        await committer.submit(make_event("after"))
+        assert await _texts(queue) == ["after"]
+    run(scenario())
+
+def test_close_pushes_the_open_group(redis):
+    async def scenario():
+        queue = CountingQueue(redis)
+        committer = GroupCommitter(queue, window_ms=10_000, max_batch=100)
+        waiter = asyncio.create_task(committer.submit(make_event("x")))
+        await asyncio.sleep(0)
+        await committer.close()
+        await waiter
+        assert queue.pushes == [1]
+    run(scenario())
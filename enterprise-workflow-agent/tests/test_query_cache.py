@@ -0,0 +1,18 @@
+from src.agent.tools.query_cache import QueryCache, normalize_sql, referenced_tables
+
+def test_cache_tables_come_from_the_parse():
+    assert referenced_tables(normalize_sql('select * from "users"')) == {"users"}
+    query = 'WITH recent AS (SELECT * FROM public."Orders") SELECT * FROM recent JOIN Users u ON true'
+    assert referenced_tables(normalize_sql(query)) == {"Orders", "users"}
+
+def test_quoted_identifiers_keep_their_case():
+    assert normalize_sql('SELECT * FROM "Users"') != normalize_sql("SELECT * FROM users")
+    assert normalize_sql("SELECT  *  FROM Users") == normalize_sql("select * from users")
+
+def test_invalidation_matches_postgres_name_folding():
+    cache = QueryCache(ttl=60, max_bytes=1_000_000)
+    cache.put(("a",), 1, referenced_tables(normalize_sql('select * from "Users"')), 1)
+    cache.put(("b",), 2, referenced_tables(normalize_sql("select * from users")), 1)
+    assert cache.invalidate_tables(["Users"]) == 1
+    assert cache.get(("a",)) is not None
+    assert cache.invalidate_tables(['"Users"']) == 1
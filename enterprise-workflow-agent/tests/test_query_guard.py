@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from conftest import run
+from src.agent.tools.query_guard import QueryGuard, QueryRejected
+
+guard = QueryGuard(explain=False)
+
+@pytest.mark.parametrize("query", [
+    "DELETE FROM users",
+    "UPDATE users SET name = 'x'",
+    "INSERT INTO users VALUES (1)",
+    "DROP TABLE users",
+    "WITH gone AS (DELETE FROM users RETURNING *) SELECT * FROM gone",
+    "SELECT * FROM users FOR UPDATE",
+    "SELECT * INTO backup FROM users",
+    "SELECT 1; SELECT 2",
+    "SELECT * FROM users, orders",
+    "SELECT * FROM users CROSS JOIN orders",
+    "SELECT pg_sleep(10)",
+    "SELECT * FROM users WHERE pg_terminate_backend(1)",
+    "SELECT FROM WHERE",
+])
+def test_rejects(query):
+    with pytest.raises(QueryRejected):
+        guard.rewrite(query, 100)
+
+def test_wraps_unbounded_query_in_limit():
+    rewritten = guard.rewrite("SELECT * FROM users -- trailing comment", 100)
+    assert rewritten.endswith("LIMIT 100")
+    assert "-- trailing comment\n)" in rewritten
+
+def test_keeps_query_with_small_enough_limit():
+    assert guard.rewrite("SELECT * FROM users LIMIT 10;", 100) == "SELECT * FROM users LIMIT 10"
+
+def test_clamps_query_with_larger_limit():
+    assert guard.rewrite("SELECT * FROM users LIMIT 5000", 100).endswith("LIMIT 100")
+
+def test_allows_joins_with_a_condition():
+    guard.rewrite("SELECT * FROM users u JOIN orders o ON o.user_id = u.id", 100)
+
+class ExplainSession:
+    """Answers EXPLAIN with a canned plan."""
+
+    def __init__(self, plan):
+        self.plan = plan
+
+    async def execute(self, statement, params=None):
+        plan = self.plan
+
+        class Result:
+            def scalar(self):
+                return json.dumps([{"Plan": plan}])
+        return Result()
+
+def _limited(child):
+    # What Postgres reports for `SELECT * FROM (...) LIMIT 10001`
+    return {"Node Type": "Limit", "Total Cost": 12.5, "Plan Rows": 10001, "Plans": [child]}
+
+def test_plan_under_the_limit_is_checked_for_rows():
+    sort = {"Node Type": "Sort", "Total Cost": 900.0, "Plan Rows": 5_000_000,
+            "Plans": [{"Node Type": "Seq Scan", "Total Cost": 800.0, "Plan Rows": 5_000_000}]}
+    strict = QueryGuard(max_cost=1e9, max_plan_rows=1_000_000, explain=True)
+    with pytest.raises(QueryRejected, match="rows"):
+        run(strict.check_plan(ExplainSession(_limited(sort)), "SELECT 1"))
+
+def test_plan_under_the_limit_is_checked_for_cost():
+    aggregate = {"Node Type": "Aggregate", "Total Cost": 5e7, "Plan Rows": 100}
+    strict = QueryGuard(max_cost=1e6, max_plan_rows=1_000_000, explain=True)
+    with pytest.raises(QueryRejected, match="cost"):
+        run(strict.check_plan(ExplainSession(_limited(aggregate)), "SELECT 1"))
+
+def test_plan_within_budget_passes():
+    scan = {"Node Type": "Index Scan", "Total Cost": 40.0, "Plan Rows": 500}
+    run(QueryGuard(max_cost=1e6, max_plan_rows=1_000_000, explain=True).check_plan(ExplainSession(_limited(scan)), "SELECT 1"))
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from conftest import make_event, run
+from src.services.queue import QueueService
+from src.services.retry import RetryService
+
+def _service(redis, **kwargs):
+    queue = QueueService(redis, name="test:queue")
+    return queue, RetryService(redis, queue=queue, **kwargs)
+
+def test_backoff_is_exponential_capped_and_jittered(redis):
+    retry = RetryService(redis, base_delay=2, max_delay=10)
+    for attempt, ceiling in [(1, 2), (2, 4), (3, 8), (4, 10), (10, 10)]:
+        assert ceiling / 2 <= retry.backoff(attempt) <= ceiling
+
+def test_failed_event_is_retried_once_due(redis):
+    async def scenario():
+        queue, retry = _service(redis, max_attempts=3, base_delay=0)
+        assert await retry.fail(make_event(request_id="r1"), RuntimeError("boom"))
+        assert await retry.pending() == 1
+        assert await retry.promote_due() == 1
+        [event] = await queue.pop_events(10, timeout=0)
+        assert event.request_id == "r1" and event.attempts == 1
+        assert await retry.pending() == 0
+    run(scenario())
+
+def test_retry_waits_until_due(redis):
+    async def scenario():
+        _, retry = _service(redis, max_attempts=3)
+        await retry.schedule(make_event(), delay=60)
+        assert await retry.promote_due() == 0
+        assert await retry.pending() == 1
+    run(scenario())
+
+def test_dead_letters_after_max_attempts(redis):
+    async def scenario():
+        queue, retry = _service(redis, max_attempts=2, base_delay=0)
+        event = make_event(request_id="r1")
+        assert await retry.fail(event, RuntimeError("first"))
+        assert not await retry.fail(event.model_copy(update={"attempts": 1}), RuntimeError("second"))
+        assert await retry.dead_letter_count() == 1
+        [entry] = await retry.dead_letters()
+        assert entry["error"] == "RuntimeError: second"
+        assert entry["event"]["attempts"] == 2
+    run(scenario())
+
+def test_redrive_resets_attempts(redis):
+    async def scenario():
+        queue, retry = _service(redis, max_attempts=1)
+        for i in range(3):
+            await retry.fail(make_event(request_id=f"r{i}"), RuntimeError("boom"))
+        assert await retry.redrive(count=2) == 2
+        events = await queue.pop_events(10, timeout=0)
+        assert [e.request_id for e in events] == ["r0", "r1"]
+        assert all(e.attempts == 0 for e in events)
+        assert await retry.purge() == 1
+    run(scenario())
+
+def test_failed_promotion_puts_events_back(redis):
+    class BrokenQueue:
+        redis = None
+
+        async def push_events(self, events):
+            raise ConnectionError("queue down")
+
+    async def scenario():
+        retry = RetryService(redis, queue=BrokenQueue())
+        await retry.schedule(make_event(), delay=0)
+        with pytest.raises(ConnectionError):
+            await retry.promote_due()
+        assert await retry.pending() == 1
+        [(_, due)] = await redis.zrange(retry.retry_key, 0, -1, withscores=True)
+        assert due <= time.time()
+    run(scenario())
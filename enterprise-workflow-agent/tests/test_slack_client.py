@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from benchmarks.slack_stub import create_app
+from conftest import run
+from src.agent.tools.slack_client import SlackApiError, SlackClient
+from src.core.config import settings
+
+@pytest.fixture(autouse=True)
+def fast_limits(monkeypatch):
+    # Local buckets never wait, so every limit seen comes from the stub
+    monkeypatch.setattr(settings, "SLACK_CHANNEL_RATE", 1000.0)
+    monkeypatch.setattr(settings, "SLACK_METHOD_RATES", {"chat.postMessage": 1000.0})
+    monkeypatch.setattr(settings, "SLACK_COALESCE_WINDOW_MS", 0)
+    monkeypatch.setattr(SlackClient, "_backoff", staticmethod(lambda attempt: 0.0))
+
+def _stub_client(app):
+    return SlackClient(token="xoxb-test", base_url="http://slack.test/api", transport=httpx.ASGITransport(app=app))
+
+def _failing_client(*failures):
+    """Client whose transport raises or answers each of `failures` in turn, then succeeds."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) <= len(failures):
+            failure = failures[len(calls) - 1]
+            if isinstance(failure, Exception):
+                raise failure
+            return httpx.Response(failure)
+        return httpx.Response(200, json={"ok": True})
+
+    client = SlackClient(token="xoxb-test", base_url="http://slack.test/api", transport=httpx.MockTransport(handler))
+    return client, calls
+
+def test_429_waits_for_retry_after():
+    app = create_app(channel_rate=10, burst=1)
+    client = _stub_client(app)
+
+    async def scenario():
+        await client.post_message("C1", "first")
+        start = time.monotonic()
+        await client.post_message("C1", "second")
+        elapsed = time.monotonic() - start
+        await client.close()
+        return elapsed
+
+    elapsed = run(scenario())
+    assert app.state.rate_limited == 1
+    assert elapsed >= 0.9  # Retry-After: 1
+    assert [m["text"] for m in app.state.messages["C1"]] == ["first", "second"]
+
+def test_coalesced_messages_go_out_in_one_post(monkeypatch):
+    monkeypatch.setattr(settings, "SLACK_COALESCE_WINDOW_MS", 20)
+    app = create_app(channel_rate=100, burst=10)
+    client = _stub_client(app)
+
+    async def scenario():
+        results = await asyncio.gather(*(client.post_message("C1", f"m{i}") for i in range(3)))
+        await client.close()
+        return results
+
+    results = run(scenario())
+    assert app.state.calls == 1
+    assert [m["text"] for m in app.state.messages["C1"]] == ["m0\nm1\nm2"]
+    assert all(result["ok"] for result in results)
+
+def test_post_message_is_not_retried_after_a_5xx():
+    client, calls = _failing_client(503)
+    with pytest.raises(SlackApiError, match="HTTP 503"):
+        run(client.post_message("C1", "hi"))
+    assert len(calls) == 1
+
+def test_post_message_is_not_retried_after_a_read_error():
+    client, calls = _failing_client(httpx.ReadTimeout("timed out"))
+    with pytest.raises(SlackApiError, match="ReadTimeout"):
+        run(client.post_message("C1", "hi"))
+    assert len(calls) == 1
+
+def test_post_message_is_retried_when_never_sent():
+    client, calls = _failing_client(httpx.ConnectError("refused"))
+    assert run(client.post_message("C1", "hi"))["ok"]
+    assert len(calls) == 2
+
+def test_idempotent_methods_are_retried_after_a_5xx():
+    client, calls = _failing_client(502, httpx.ReadTimeout("timed out"))
+    assert run(client.api_call("conversations.info", channel="C1"))["ok"]
+    assert len(calls) == 3
@@ -0,0 +1,78 @@
+import pytest
+
+from conftest import make_event, run
+from src.core.config import settings
+from src.services.queue import StreamQueueService
+
+@pytest.fixture(autouse=True)
+def reclaim_at_once(monkeypatch):
+    monkeypatch.setattr(settings, "REDIS_STREAM_CLAIM_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(settings, "REDIS_STREAM_CLAIM_IDLE_MS", 60_000)
+
+def _consumer(redis, name):
+    return StreamQueueService(redis, stream="test:stream", group="workers", consumer=name)
+
+async def _pending(redis):
+    return (await redis.xpending("test:stream", "workers"))["pending"]
+
+def test_pop_reads_new_entries_for_the_group(redis):
+    async def scenario():
+        a, b = _consumer(redis, "a"), _consumer(redis, "b")
+        await a.push_events([make_event(str(i)) for i in range(3)])
+        first = await a.pop_events(max_count=2, timeout=0)
+        second = await b.pop_events(max_count=10, timeout=0)
+        assert [e.payload["text"] for e in first + second] == ["0", "1", "2"]
+        assert all(e._delivery_id for e in first + second)
+        assert await a.pop_events(max_count=10, timeout=0) == []
+        assert await a.depth() == 3
+    run(scenario())
+
+def test_ack_removes_entries_from_the_pending_list(redis):
+    async def scenario():
+        queue = _consumer(redis, "a")
+        await queue.push_events([make_event(str(i)) for i in range(3)])
+        events = await queue.pop_events(max_count=10, timeout=0)
+        await queue.ack(events[:2])
+        assert await _pending(redis) == 1
+        assert await queue.depth() == 1
+    run(scenario())
+
+def test_stale_entries_of_a_dead_consumer_are_reclaimed(redis, monkeypatch):
+    async def scenario():
+        dead, alive = _consumer(redis, "dead"), _consumer(redis, "alive")
+        await dead.push_event(make_event("orphan"))
+        [orphan] = await dead.pop_events(max_count=1, timeout=0)
+
+        # Not idle long enough yet
+        assert await alive.pop_events(max_count=10, timeout=0) == []
+
+        monkeypatch.setattr(settings, "REDIS_STREAM_CLAIM_IDLE_MS", 0)
+        [reclaimed] = await alive.pop_events(max_count=10, timeout=0)
+        assert reclaimed.payload["text"] == "orphan"
+        assert reclaimed._delivery_id == orphan._delivery_id
+        consumers = {c["name"]: c["pending"] for c in await redis.xinfo_consumers("test:stream", "workers")}
+        assert consumers[b"alive"] == 1 and consumers.get(b"dead", 0) == 0
+
+        await alive.ack([reclaimed])
+        assert await _pending(redis) == 0
+    run(scenario())
+
+def test_poison_entries_are_acked_and_skipped(redis):
+    async def scenario():
+        queue = _consumer(redis, "a")
+        await queue.ensure_group()
+        await redis.xadd("test:stream", {"event": b"\xc1\x01\x00not msgpack"})
+        await redis.xadd("test:stream", {"other": b"no event field"})
+        await queue.push_event(make_event("good"))
+        [event] = await queue.pop_events(max_count=10, timeout=0)
+        assert event.payload["text"] == "good"
+        # Only the good entry is still waiting for an ack
+        assert await _pending(redis) == 1
+    run(scenario())
+
+def test_ensure_group_is_idempotent(redis):
+    async def scenario():
+        await _consumer(redis, "a").ensure_group()
+        await _consumer(redis, "b").ensure_group()
+        assert len(await redis.xinfo_groups("test:stream")) == 1
+    run(scenario())
@@ -0,0 +1,60 @@
+from conftest import run
+from src.agent.nodes import workers
+from src.agent.nodes.supervisor import ready_steps
+from src.agent.state import merge_context
+
+def _state(plan, completed=(), dependencies=None):
+    return {"plan": plan, "completed_steps": list(completed), "dependencies": dependencies or {}}
+
+def test_independent_steps_are_ready_together():
+    assert ready_steps(_state(["data_node", "documentation_node"])) == ["data_node", "documentation_node"]
+
+def test_steps_wait_for_their_dependencies():
+    dependencies = {"analysis_node": ["data_node"], "documentation_node": ["analysis_node"]}
+    plan = ["data_node", "analysis_node", "documentation_node"]
+    assert ready_steps(_state(plan, dependencies=dependencies)) == ["data_node"]
+    assert ready_steps(_state(plan, ["data_node"], dependencies)) == ["analysis_node"]
+    assert ready_steps(_state(plan, ["data_node", "analysis_node"], dependencies)) == ["documentation_node"]
+    assert ready_steps(_state(plan, plan, dependencies)) == []
+
+def test_approval_steps_run_after_other_ready_work():
+    plan = ["communication_node", "data_node", "analysis_node"]
+    dependencies = {"analysis_node": ["data_node"]}
+    assert ready_steps(_state(plan, dependencies=dependencies)) == ["data_node"]
+    assert ready_steps(_state(plan, ["data_node"], dependencies)) == ["analysis_node"]
+    assert ready_steps(_state(plan, ["data_node", "analysis_node"], dependencies)) == ["communication_node"]
+
+def test_approval_step_alone_is_ready():
+    assert ready_steps(_state(["communication_node"])) == ["communication_node"]
+
+def test_merge_context_adds_and_overwrites_keys():
+    assert merge_context({"a": 1, "b": 2}, {"b": 3, "c": 4}) == {"a": 1, "b": 3, "c": 4}
+    assert merge_context(None, {"a": 1}) == {"a": 1}
+
+def test_merge_context_keeps_current_on_empty_update():
+    current = {"a": 1}
+    assert merge_context(current, {}) is current
+    assert merge_context(current, None) is current
+
+def test_communication_message_leaves_out_blob_refs(monkeypatch):
+    sent = []
+
+    class Slack:
+        async def send_message(self, channel, text):
+            sent.append(text)
+            return {"status": "success"}
+
+    class Audit:
+        async def log_entry(self, entry):
+            pass
+
+    monkeypatch.setattr(workers, "slack_tool", Slack())
+    monkeypatch.setattr(workers, "audit_service", Audit())
+    state = {
+        "workflow_id": "wf1",
+        "context": {"analysis_result": "Analyzed 2 records.", "data_result": {"$blob": "ab" * 32, "bytes": 123456}},
+    }
+    run(workers.communication_node(state, {"configurable": {"approved_by": "alice"}}))
+    [text] = sent
+    assert "Analyzed 2 records." in text
+    assert "$blob" not in text and "data_result" not in text
@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import make_event, run
+from src.agent.graph import agent_graph
+from src.agent.nodes import workers
+from src.services import worker
+from src.schemas.events import EventSource, IngestEvent
+from src.services.worker import WorkflowWorker, discard_workflow, process_event, workflow_id_for
+
+class RecordingAudit:
+    def __init__(self):
+        self.entries = []
+
+    async def log_entry(self, entry):
+        self.entries.append(entry)
+
+@pytest.fixture
+def audit(monkeypatch):
+    audit = RecordingAudit()
+    monkeypatch.setattr(workers, "audit_service", audit)
+    monkeypatch.setattr(worker, "audit_service", audit)
+    return audit
+
+@pytest.fixture
+def flaky_analysis(monkeypatch):
+    """analysis_node fails the first time it loads its input."""
+    resolve = workers.blob_store.resolve
+    calls = []
+
+    async def flaky(value):
+        calls.append(value)
+        if len(calls) == 1:
+            raise RuntimeError("blob store unavailable")
+        return await resolve(value)
+
+    monkeypatch.setattr(workers.blob_store, "resolve", flaky)
+
+def _state(event):
+    return run(agent_graph.aget_state({"configurable": {"thread_id": workflow_id_for(event)}}))
+
+def test_workflow_id_is_stable_across_retries():
+    event = make_event()
+    workflow_id = workflow_id_for(event)
+    assert event.request_id is not None
+    assert workflow_id_for(event.model_copy(update={"attempts": 1})) == workflow_id
+    assert workflow_id_for(make_event()) != workflow_id
+
+def test_retry_resumes_from_the_checkpoint(audit, flaky_analysis):
+    event = make_event("query the data and analyze it", request_id="r-resume")
+    with pytest.raises(RuntimeError):
+        run(process_event(event))
+    assert _state(event).next == ("analysis_node",)
+
+    run(process_event(event.model_copy(update={"attempts": 1})))
+    # data_node is not run again
+    assert [entry.action.agent_name for entry in audit.entries] == ["DataAgent", "AnalysisAgent"]
+    # Finished threads are compacted away
+    assert not _state(event).values
+
+def test_dead_lettered_workflow_is_discarded(audit, flaky_analysis):
+    event = make_event("query the data and analyze it", request_id="r-dead")
+    with pytest.raises(RuntimeError):
+        run(process_event(event))
+    run(discard_workflow(event))
+    assert not _state(event).values
+
+class ListQueue:
+    """In-memory stand-in for QueueService."""
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.acked = []
+
+    async def pop_events(self, max_count=None, timeout=None):
+        if not self.events:
+            await asyncio.sleep(timeout or 0.01)
+            return []
+        popped, self.events = self.events[:max_count], self.events[max_count:]
+        return popped
+
+    async def ack(self, events):
+        self.acked.extend(events)
+
+def _event(channel, text="hello"):
+    return IngestEvent(source=EventSource.SLACK, event_type="message", payload={"text": text, "channel": channel})
+
+def test_stop_reaches_drain_when_every_slot_is_busy(monkeypatch):
+    async def hang(event):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(worker, "process_event", hang)
+
+    async def scenario():
+        queue = ListQueue([_event(f"C{i}") for i in range(5)])
+        subject = WorkflowWorker(max_concurrency=2, drain_timeout=0.5, batch_size=2, queue=queue)
+        task = asyncio.create_task(subject.run())
+        await asyncio.sleep(0.1)
+        assert subject.in_flight == 2
+        started = time.monotonic()
+        subject.stop()
+        await asyncio.wait_for(task, timeout=2)
+        assert time.monotonic() - started < 1
+        assert subject.in_flight == 0
+    run(scenario())
+
+def test_busy_key_does_not_delay_other_keys(monkeypatch):
+    started = {}
+
+    async def slow(event):
+        started[event.payload["text"]] = time.monotonic()
+        await asyncio.sleep(0.1)
+
+    monkeypatch.setattr(worker, "process_event", slow)
+
+    async def scenario():
+        busy = [_event("C-busy", f"busy-{i}") for i in range(8)]
+        queue = ListQueue(busy + [_event("C-other", "other")])
+        subject = WorkflowWorker(max_concurrency=4, drain_timeout=5, batch_size=4, queue=queue)
+        begin = time.monotonic()
+        task = asyncio.create_task(subject.run())
+        while len(queue.acked) < 9:
+            await asyncio.sleep(0.01)
+        subject.stop()
+        await task
+
+        assert started["other"] - begin < 0.1
+        # The busy key still ran one event at a time, in order
+        times = [started[f"busy-{i}"] for i in range(8)]
+        assert times == sorted(times)
+        assert all(later - earlier >= 0.09 for earlier, later in zip(times, times[1:]))
+    run(scenario())
+
+def test_queued_events_are_bounded(monkeypatch):
+    async def hang(event):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(worker, "process_event", hang)
+
+    async def scenario():
+        queue = ListQueue([_event("C-busy", str(i)) for i in range(100)])
+        subject = WorkflowWorker(max_concurrency=4, drain_timeout=0.1, batch_size=4, queue=queue, max_waiting=10)
+        task = asyncio.create_task(subject.run())
+        await asyncio.sleep(0.2)
+        # One running, at most max_waiting waiting (plus the last batch)
+        assert 100 - len(queue.events) <= 1 + 10 + 4
+        subject.stop()
+        await task
+    run(scenario())